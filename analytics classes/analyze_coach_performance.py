@@ -1,36 +1,48 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+import argparse
 import os
+import sys
+import pandas as pd
+from charts import GRAPHICS_DIR, chart, render_charts
 
-def analyze_coach_performance():
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cleandata classes'))
+from datasets import add_filter_arguments
+from instrumentation import count_rows, lap, run_main
+from paths import data_path
+from match_days import DEFAULT_CHUNKSIZE, match_day_view
+from resampling import error_bars, resample_stats
+
+def analyze_coach_performance(season=None, competition=None, team=None,
+                              input_path=data_path('GPS_with_matches.parquet'), chunksize=DEFAULT_CHUNKSIZE):
     try:
-        # Read the data
+        # Match days (rows where Local is not empty, one per date), shared
+        # with the other match analyses
         print("Reading data...")
-        df = pd.read_csv('../DATA/GPS_with_matches.csv')
-        
-        # Filter only match days (where Local is not empty)
-        match_data = df[df['Local'].notna()].drop_duplicates(subset=['DATA'])
+        view = match_day_view(input_path, chunksize, season=season, competition=competition, club=team)
+        lap('read')
+        by_venue = view.summary(['Coach', 'Local'])['Win_Rate']
         
-        # Calculate metrics for each coach
+        # Calculate metrics for each coach, in order of their first match
         coach_metrics = {}
         
-        for coach in match_data['Coach'].unique():
-            coach_games = match_data[match_data['Coach'] == coach]
-            
+        for coach, coach_games in view.summary(['Coach']).iterrows():
             metrics = {
-                'Total Games': len(coach_games),
-                'Win Rate (%)': (coach_games['GP'] > coach_games['GC']).mean() * 100,
-                'Goals Scored (avg)': coach_games['GP'].mean(),
-                'Goals Conceded (avg)': coach_games['GC'].mean(),
-                'Ball Possession (avg)': coach_games['Posse'].mean(),
-                'Home Win Rate (%)': (coach_games[coach_games['Local'] == 'Em casa']['GP'] > 
-                                    coach_games[coach_games['Local'] == 'Em casa']['GC']).mean() * 100,
-                'Away Win Rate (%)': (coach_games[coach_games['Local'] == 'Visitante']['GP'] > 
-                                    coach_games[coach_games['Local'] == 'Visitante']['GC']).mean() * 100
+                'Total Games': coach_games['Games'],
+                'Win Rate (%)': coach_games['Win_Rate'],
+                'Goals Scored (avg)': coach_games['Goals_For_Avg'],
+                'Goals Conceded (avg)': coach_games['Goals_Against_Avg'],
+                'Ball Possession (avg)': coach_games['Possession_Avg'],
+                'Home Win Rate (%)': by_venue.get((coach, 'Em casa'), float('nan')),
+                'Away Win Rate (%)': by_venue.get((coach, 'Visitante'), float('nan'))
             }
             coach_metrics[coach] = metrics
         
+        # Bootstrap intervals and permutation p-values of every coach
+        uncertainty = resample_stats(view.games, ['Coach'], goals=('GP', 'GC')).set_index('Coach')
+        uncertainty = uncertainty.reindex(list(coach_metrics))
+        
+        lap('aggregate')
+        count_rows(rows_out=len(coach_metrics))
+        
         # Print results
         print("\nPerformance Analysis by Coach")
         print("=" * 80)
@@ -39,22 +51,17 @@ def analyze_coach_performance():
             print("-" * 40)
             for metric, value in metrics.items():
                 print(f"{metric}: {value:.2f}")
+        print("\nUncertainty (95% bootstrap interval, permutation p-value vs the other coaches):")
+        print(uncertainty.round(3).T.to_string())
         
         # Create visualizations
-        plt.figure(figsize=(15, 12))
-        
-        # 1. Win Rate Comparison
-        plt.subplot(2, 2, 1)
         win_rates = pd.DataFrame({
             'Coach': list(coach_metrics.keys()),
-            'Win Rate (%)': [metrics['Win Rate (%)'] for metrics in coach_metrics.values()]
+            'Win Rate (%)': [metrics['Win Rate (%)'] for metrics in coach_metrics.values()],
+            'Win_Rate_CI_Low': uncertainty['Win_Rate_CI_Low'].to_numpy(),
+            'Win_Rate_CI_High': uncertainty['Win_Rate_CI_High'].to_numpy()
         })
-        sns.barplot(data=win_rates, x='Coach', y='Win Rate (%)')
-        plt.xticks(rotation=45)
-        plt.title('Overall Win Rate by Coach')
         
-        # 2. Goals Scored and Conceded
-        plt.subplot(2, 2, 2)
         goals_data = []
         for coach, metrics in coach_metrics.items():
             goals_data.extend([
@@ -62,12 +69,7 @@ def analyze_coach_performance():
                 {'Coach': coach, 'Goals': metrics['Goals Conceded (avg)'], 'Type': 'Conceded'}
             ])
         goals_df = pd.DataFrame(goals_data)
-        sns.barplot(data=goals_df, x='Coach', y='Goals', hue='Type')
-        plt.xticks(rotation=45)
-        plt.title('Average Goals Scored and Conceded by Coach')
         
-        # 3. Home vs Away Win Rates
-        plt.subplot(2, 2, 3)
         location_data = []
         for coach, metrics in coach_metrics.items():
             location_data.extend([
@@ -75,28 +77,56 @@ def analyze_coach_performance():
                 {'Coach': coach, 'Win Rate (%)': metrics['Away Win Rate (%)'], 'Location': 'Away'}
             ])
         location_df = pd.DataFrame(location_data)
-        sns.barplot(data=location_df, x='Coach', y='Win Rate (%)', hue='Location')
-        plt.xticks(rotation=45)
-        plt.title('Home vs Away Win Rates by Coach')
         
-        # 4. Ball Possession
-        plt.subplot(2, 2, 4)
         possession_data = pd.DataFrame({
             'Coach': list(coach_metrics.keys()),
             'Ball Possession (%)': [metrics['Ball Possession (avg)'] for metrics in coach_metrics.values()]
         })
-        sns.barplot(data=possession_data, x='Coach', y='Ball Possession (%)')
-        plt.xticks(rotation=45)
-        plt.title('Average Ball Possession by Coach')
         
-        plt.tight_layout()
-        plt.savefig('../DATA/coach_performance_analysis.png')
-        plt.close()
+        render_charts([chart(os.path.join(GRAPHICS_DIR, 'coach_performance_analysis.png'),
+                             draw_coach_performance,
+                             {'win_rates': win_rates, 'goals_df': goals_df,
+                              'location_df': location_df, 'possession_data': possession_data})])
         
-        print("\nAnalysis completed successfully! Check DATA/coach_performance_analysis.png for visualizations.")
+        print("\nAnalysis completed successfully! Check graficos/coach_performance_analysis.png for visualizations.")
         
     except Exception as e:
         print(f"An error occurred: {str(e)}")
+        raise
+
+def draw_coach_performance(win_rates, goals_df, location_df, possession_data):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    
+    # 1. Win Rate Comparison
+    plt.subplot(2, 2, 1)
+    sns.barplot(data=win_rates, x='Coach', y='Win Rate (%)')
+    plt.errorbar(range(len(win_rates)), win_rates['Win Rate (%)'],
+                 yerr=error_bars(win_rates, 'Win_Rate', 'Win Rate (%)'), fmt='none', ecolor='black', capsize=4)
+    plt.xticks(rotation=45)
+    plt.title('Overall Win Rate by Coach (95% CI)')
+    
+    # 2. Goals Scored and Conceded
+    plt.subplot(2, 2, 2)
+    sns.barplot(data=goals_df, x='Coach', y='Goals', hue='Type')
+    plt.xticks(rotation=45)
+    plt.title('Average Goals Scored and Conceded by Coach')
+    
+    # 3. Home vs Away Win Rates
+    plt.subplot(2, 2, 3)
+    sns.barplot(data=location_df, x='Coach', y='Win Rate (%)', hue='Location')
+    plt.xticks(rotation=45)
+    plt.title('Home vs Away Win Rates by Coach')
+    
+    # 4. Ball Possession
+    plt.subplot(2, 2, 4)
+    sns.barplot(data=possession_data, x='Coach', y='Ball Possession (%)')
+    plt.xticks(rotation=45)
+    plt.title('Average Ball Possession by Coach')
 
 if __name__ == "__main__":
-    analyze_coach_performance() 
\ No newline at end of file
+    parser = add_filter_arguments(argparse.ArgumentParser(description="Match performance by coach"))
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help="GPS rows read at a time")
+    args = parser.parse_args()
+    run_main('coach_performance', analyze_coach_performance,
+             season=args.season, competition=args.competition, team=args.team, chunksize=args.chunksize) 
\ No newline at end of file
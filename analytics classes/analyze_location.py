@@ -1,85 +1,103 @@
+import argparse
+import os
+import sys
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+from charts import GRAPHICS_DIR, chart, render_charts
 
-def analyze_home_away_performance():
-    # Read the data
-    df = pd.read_csv('../DATA/GPS_with_matches.csv')
-    
-    # Filter only match days (where Local is not empty)
-    match_data = df[df['Local'].notna()].drop_duplicates(subset=['DATA'])
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cleandata classes'))
+from datasets import add_filter_arguments
+from instrumentation import count_rows, lap, run_main
+from paths import data_path
+from match_days import DEFAULT_CHUNKSIZE, match_day_view
+from resampling import error_bars, resample_stats
+
+def analyze_home_away_performance(season=None, competition=None, team=None,
+                                  input_path=data_path('GPS_with_matches.parquet'), chunksize=DEFAULT_CHUNKSIZE):
+    # Match days (rows where Local is not empty, one per date), shared with
+    # the other match analyses
+    view = match_day_view(input_path, chunksize, season=season, competition=competition, club=team)
+    lap('read')
+    venue = view.summary(['Local']).reindex(['Em casa', 'Visitante'])
+    home_games, away_games = venue.loc['Em casa'], venue.loc['Visitante']
     
-    # Calculate basic statistics for home and away games
-    home_games = match_data[match_data['Local'] == 'Em casa']
-    away_games = match_data[match_data['Local'] == 'Visitante']
+    # Bootstrap intervals and permutation p-values of home vs away
+    uncertainty = resample_stats(view.games, ['Local'], goals=('GP', 'GC')).set_index('Local')
+    uncertainty = uncertainty.reindex(['Em casa', 'Visitante'])
+    lap('aggregate')
     
     # Calculate performance metrics
     metrics = {
-        'Total Games': len(match_data),
-        'Home Games': len(home_games),
-        'Away Games': len(away_games),
-        'Home Win Rate': (home_games['GP'] > home_games['GC']).mean() * 100,
-        'Away Win Rate': (away_games['GP'] > away_games['GC']).mean() * 100,
-        'Home Goals Scored (avg)': home_games['GP'].mean(),
-        'Away Goals Scored (avg)': away_games['GP'].mean(),
-        'Home Goals Conceded (avg)': home_games['GC'].mean(),
-        'Away Goals Conceded (avg)': away_games['GC'].mean(),
-        'Home Ball Possession (avg)': home_games['Posse'].mean(),
-        'Away Ball Possession (avg)': away_games['Posse'].mean()
+        'Total Games': len(view),
+        'Home Games': 0 if pd.isna(home_games['Games']) else home_games['Games'],
+        'Away Games': 0 if pd.isna(away_games['Games']) else away_games['Games'],
+        'Home Win Rate': home_games['Win_Rate'],
+        'Away Win Rate': away_games['Win_Rate'],
+        'Home Goals Scored (avg)': home_games['Goals_For_Avg'],
+        'Away Goals Scored (avg)': away_games['Goals_For_Avg'],
+        'Home Goals Conceded (avg)': home_games['Goals_Against_Avg'],
+        'Away Goals Conceded (avg)': away_games['Goals_Against_Avg'],
+        'Home Ball Possession (avg)': home_games['Possession_Avg'],
+        'Away Ball Possession (avg)': away_games['Possession_Avg']
     }
+    count_rows(rows_out=len(view))
     
     # Print results
     print("\nPerformance Analysis - Home vs Away Games")
     print("=" * 50)
     for metric, value in metrics.items():
         print(f"{metric}: {value:.2f}")
+    print("\nUncertainty (95% bootstrap interval, permutation p-value):")
+    print(uncertainty.round(3).T.to_string())
     
     # Create visualizations
-    plt.figure(figsize=(15, 10))
-    
-    # 1. Goals Scored and Conceded
-    plt.subplot(2, 2, 1)
     goals_data = pd.DataFrame({
         'Location': ['Home', 'Away', 'Home', 'Away'],
-        'Goals': [home_games['GP'].mean(), away_games['GP'].mean(),
-                 home_games['GC'].mean(), away_games['GC'].mean()],
+        'Goals': [home_games['Goals_For_Avg'], away_games['Goals_For_Avg'],
+                 home_games['Goals_Against_Avg'], away_games['Goals_Against_Avg']],
         'Type': ['Scored', 'Scored', 'Conceded', 'Conceded']
     })
+    location_data = pd.DataFrame({
+        'Location': ['Home', 'Away'],
+        'Win Rate (%)': [metrics['Home Win Rate'], metrics['Away Win Rate']],
+        'Win_Rate_CI_Low': uncertainty['Win_Rate_CI_Low'].to_numpy(),
+        'Win_Rate_CI_High': uncertainty['Win_Rate_CI_High'].to_numpy(),
+        'Ball Possession (%)': [metrics['Home Ball Possession (avg)'], 
+                               metrics['Away Ball Possession (avg)']],
+        'Goal Difference': [home_games['Goals_For_Avg'] - home_games['Goals_Against_Avg'],
+                          away_games['Goals_For_Avg'] - away_games['Goals_Against_Avg']]
+    })
+    render_charts([chart(os.path.join(GRAPHICS_DIR, 'home_away_analysis.png'), draw_home_away_analysis,
+                         {'goals_data': goals_data, 'location_data': location_data}, figsize=(15, 10))])
+
+def draw_home_away_analysis(goals_data, location_data):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    
+    # 1. Goals Scored and Conceded
+    plt.subplot(2, 2, 1)
     sns.barplot(data=goals_data, x='Location', y='Goals', hue='Type')
     plt.title('Average Goals Scored and Conceded')
     
     # 2. Win Rate
     plt.subplot(2, 2, 2)
-    win_rate = pd.DataFrame({
-        'Location': ['Home', 'Away'],
-        'Win Rate (%)': [metrics['Home Win Rate'], metrics['Away Win Rate']]
-    })
-    sns.barplot(data=win_rate, x='Location', y='Win Rate (%)')
-    plt.title('Win Rate by Location')
+    sns.barplot(data=location_data, x='Location', y='Win Rate (%)')
+    plt.errorbar(range(len(location_data)), location_data['Win Rate (%)'],
+                 yerr=error_bars(location_data, 'Win_Rate', 'Win Rate (%)'), fmt='none', ecolor='black', capsize=4)
+    plt.title('Win Rate by Location (95% CI)')
     
     # 3. Ball Possession
     plt.subplot(2, 2, 3)
-    possession = pd.DataFrame({
-        'Location': ['Home', 'Away'],
-        'Ball Possession (%)': [metrics['Home Ball Possession (avg)'], 
-                               metrics['Away Ball Possession (avg)']]
-    })
-    sns.barplot(data=possession, x='Location', y='Ball Possession (%)')
+    sns.barplot(data=location_data, x='Location', y='Ball Possession (%)')
     plt.title('Average Ball Possession by Location')
     
     # 4. Goals Difference
     plt.subplot(2, 2, 4)
-    goals_diff = pd.DataFrame({
-        'Location': ['Home', 'Away'],
-        'Goal Difference': [home_games['GP'].mean() - home_games['GC'].mean(),
-                          away_games['GP'].mean() - away_games['GC'].mean()]
-    })
-    sns.barplot(data=goals_diff, x='Location', y='Goal Difference')
+    sns.barplot(data=location_data, x='Location', y='Goal Difference')
     plt.title('Average Goal Difference by Location')
-    
-    plt.tight_layout()
-    plt.savefig('../DATA/home_away_analysis.png')
-    plt.close()
 
 if __name__ == "__main__":
-    analyze_home_away_performance() 
\ No newline at end of file
+    parser = add_filter_arguments(argparse.ArgumentParser(description="Home vs away match performance"))
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help="GPS rows read at a time")
+    args = parser.parse_args()
+    run_main('location', analyze_home_away_performance,
+             season=args.season, competition=args.competition, team=args.team, chunksize=args.chunksize) 
\ No newline at end of file
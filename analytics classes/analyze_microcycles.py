@@ -1,63 +1,44 @@
+import argparse
+import os
 import pandas as pd
-import matplotlib.pyplot as plt
+from charts import GRAPHICS_DIR, chart, render_charts
 from datetime import datetime
+from fixtures import load_fixtures, team_matches, team_slug
+from datasets import add_filter_arguments
+from instrumentation import count_rows, lap, run_main, step
+from paths import data_path
+from resampling import error_bars, resample_stats
 
-def analyze_america_mg_microcycles():
+def analyze_microcycles(team='América (MG)', season=None, competition=None):
     try:
-        # Read the data
+        # Read the canonical fixtures table
         print("Reading match data...")
-        df = pd.read_csv('../DATA/allMatchs.csv')
+        with step('read'):
+            fixtures = load_fixtures(season, competition, team)
+        count_rows(rows_in=len(fixtures))
         
-        # Remove empty rows and duplicate headers
-        df = df.dropna(how='all')
-        df = df[df['Data'] != 'Data']
+        # The team's matches (both home and away) from its point of view
+        team_games = team_matches(fixtures, team)
         
-        # Convert date column to datetime
-        df['Data'] = pd.to_datetime(df['Data'])
-        
-        # Filter for América MG matches (both home and away)
-        america_mg = df[(df['Em casa'] == 'América (MG)') | (df['Visitante'] == 'América (MG)')].copy()
-        america_mg = america_mg.sort_values('Data')
+        slug = team_slug(team)
         
         # Calculate microcycles
-        america_mg['Next_Match_Date'] = america_mg['Data'].shift(-1)
-        america_mg['Microcycle'] = (america_mg['Next_Match_Date'] - america_mg['Data']).dt.days
+        team_games['Next_Match_Date'] = team_games['Data'].shift(-1)
+        team_games['Microcycle'] = (team_games['Next_Match_Date'] - team_games['Data']).dt.days
         
         # Remove the last row (which will have NaN for microcycle)
-        america_mg = america_mg.dropna(subset=['Microcycle'])
+        team_games = team_games.dropna(subset=['Microcycle'])
         
         # Remove World Cup break (36-day microcycle)
-        america_mg = america_mg[america_mg['Microcycle'] < 10]
-        
-        # Extract goals and calculate results
-        def extract_goals(result):
-            try:
-                # Handle different score formats
-                if 'x' in result:
-                    home, away = result.split('x')
-                elif '–' in result:
-                    home, away = result.split('–')
-                else:
-                    return 0, 0
-                return float(home.strip()), float(away.strip())
-            except:
-                return 0, 0
-        
-        america_mg[['Home_Goals', 'Away_Goals']] = america_mg['Resultado'].apply(lambda x: pd.Series(extract_goals(x)))
-        
-        # Calculate match results for América MG
-        america_mg['Is_Home'] = america_mg['Em casa'] == 'América (MG)'
-        america_mg['Goals_For'] = america_mg.apply(lambda x: x['Home_Goals'] if x['Is_Home'] else x['Away_Goals'], axis=1)
-        america_mg['Goals_Against'] = america_mg.apply(lambda x: x['Away_Goals'] if x['Is_Home'] else x['Home_Goals'], axis=1)
-        america_mg['Result'] = america_mg.apply(lambda x: 'W' if x['Goals_For'] > x['Goals_Against'] else ('D' if x['Goals_For'] == x['Goals_Against'] else 'L'), axis=1)
+        team_games = team_games[team_games['Microcycle'] < 10]
         
         # Create microcycle analysis
-        microcycle_stats = america_mg['Microcycle'].value_counts().sort_index()
+        microcycle_stats = team_games['Microcycle'].value_counts().sort_index()
         
         # Calculate performance metrics for each microcycle length
         performance_by_microcycle = []
-        for microcycle in america_mg['Microcycle'].unique():
-            matches = america_mg[america_mg['Microcycle'] == microcycle]
+        for microcycle in team_games['Microcycle'].unique():
+            matches = team_games[team_games['Microcycle'] == microcycle]
             total_matches = len(matches)
             wins = len(matches[matches['Result'] == 'W'])
             draws = len(matches[matches['Result'] == 'D'])
@@ -83,72 +64,84 @@ def analyze_america_mg_microcycles():
         performance_df = pd.DataFrame(performance_by_microcycle)
         performance_df = performance_df.sort_values('Microcycle')
         
+        # Bootstrap intervals and permutation p-values of every microcycle length
+        performance_df = performance_df.merge(resample_stats(team_games, ['Microcycle']), on='Microcycle')
+        
+        lap('aggregate')
+        
         # Create visualizations
-        plt.figure(figsize=(15, 10))
-        
-        # Win Rate by Microcycle
-        plt.subplot(2, 2, 1)
-        plt.bar(performance_df['Microcycle'], performance_df['Win_Rate'])
-        plt.title('Win Rate by Microcycle Length')
-        plt.xlabel('Days Between Matches')
-        plt.ylabel('Win Rate (%)')
-        plt.grid(True, alpha=0.3)
-        
-        # Points per Match by Microcycle
-        plt.subplot(2, 2, 2)
-        plt.bar(performance_df['Microcycle'], performance_df['Points_Per_Match'])
-        plt.title('Points per Match by Microcycle Length')
-        plt.xlabel('Days Between Matches')
-        plt.ylabel('Points per Match')
-        plt.grid(True, alpha=0.3)
-        
-        # Goals per Match by Microcycle
-        plt.subplot(2, 2, 3)
-        plt.bar(performance_df['Microcycle'], performance_df['Goals_For_Per_Match'], label='Goals For')
-        plt.bar(performance_df['Microcycle'], -performance_df['Goals_Against_Per_Match'], label='Goals Against')
-        plt.title('Goals per Match by Microcycle Length')
-        plt.xlabel('Days Between Matches')
-        plt.ylabel('Goals per Match')
-        plt.legend()
-        plt.grid(True, alpha=0.3)
-        
-        # Goal Difference by Microcycle
-        plt.subplot(2, 2, 4)
-        plt.bar(performance_df['Microcycle'], performance_df['Goal_Difference'])
-        plt.title('Goal Difference by Microcycle Length')
-        plt.xlabel('Days Between Matches')
-        plt.ylabel('Goal Difference')
-        plt.grid(True, alpha=0.3)
-        
-        plt.tight_layout()
-        plt.savefig('../DATA/america_mg_microcycle_performance.png', dpi=300, bbox_inches='tight')
-        plt.close()
+        render_charts([chart(os.path.join(GRAPHICS_DIR, f'{slug}_microcycle_performance.png'), draw_microcycle_performance,
+                             {'performance_df': performance_df},
+                             figsize=(15, 10), dpi=300, bbox_inches='tight')])
         
         # Print analysis
-        print("\nAmérica MG Performance Analysis by Microcycle (excluding World Cup break)")
+        print(f"\n{team} Performance Analysis by Microcycle (excluding World Cup break)")
         print("=" * 80)
         print("\nPerformance by Microcycle Length:")
         print(performance_df.to_string(index=False))
         
         # Save detailed analysis to CSV
-        performance_df.to_csv('../DATA/america_mg_microcycle_performance.csv', index=False)
+        with step('write'):
+            performance_df.to_csv(data_path(f'{slug}_microcycle_performance.csv'), index=False)
+        count_rows(rows_out=len(performance_df))
         
         # Print match schedule with results
         print("\nMatch Schedule with Results and Microcycles:")
         print("=" * 80)
-        for _, row in america_mg.iterrows():
-            opponent = row['Visitante'] if row['Em casa'] == 'América (MG)' else row['Em casa']
-            home_away = "Home" if row['Em casa'] == 'América (MG)' else "Away"
+        for _, row in team_games.iterrows():
+            opponent = row['Opponent']
+            home_away = "Home" if row['Is_Home'] else "Away"
             result = f"{row['Goals_For']}-{row['Goals_Against']} ({row['Result']})"
             print(f"Date: {row['Data'].strftime('%Y-%m-%d')} | {home_away} vs {opponent} | {result} | Microcycle: {row['Microcycle']} days")
         
-        print("\nDetailed analysis saved to america_mg_microcycle_performance.csv")
-        print("Visualization saved to america_mg_microcycle_performance.png")
+        print(f"\nDetailed analysis saved to {slug}_microcycle_performance.csv")
+        print(f"Visualization saved to {slug}_microcycle_performance.png")
         
     except Exception as e:
         print(f"An error occurred: {e}")
-        import traceback
-        traceback.print_exc()
+        raise
+
+def draw_microcycle_performance(performance_df):
+    import matplotlib.pyplot as plt
+    
+    # Win Rate by Microcycle
+    plt.subplot(2, 2, 1)
+    plt.bar(performance_df['Microcycle'], performance_df['Win_Rate'],
+            yerr=error_bars(performance_df, 'Win_Rate'), capsize=4)
+    plt.title('Win Rate by Microcycle Length')
+    plt.xlabel('Days Between Matches')
+    plt.ylabel('Win Rate (%)')
+    plt.grid(True, alpha=0.3)
+    
+    # Points per Match by Microcycle
+    plt.subplot(2, 2, 2)
+    plt.bar(performance_df['Microcycle'], performance_df['Points_Per_Match'],
+            yerr=error_bars(performance_df, 'Points_Per_Match'), capsize=4)
+    plt.title('Points per Match by Microcycle Length')
+    plt.xlabel('Days Between Matches')
+    plt.ylabel('Points per Match')
+    plt.grid(True, alpha=0.3)
+    
+    # Goals per Match by Microcycle
+    plt.subplot(2, 2, 3)
+    plt.bar(performance_df['Microcycle'], performance_df['Goals_For_Per_Match'], label='Goals For')
+    plt.bar(performance_df['Microcycle'], -performance_df['Goals_Against_Per_Match'], label='Goals Against')
+    plt.title('Goals per Match by Microcycle Length')
+    plt.xlabel('Days Between Matches')
+    plt.ylabel('Goals per Match')
+    plt.legend()
+    plt.grid(True, alpha=0.3)
+    
+    # Goal Difference by Microcycle
+    plt.subplot(2, 2, 4)
+    plt.bar(performance_df['Microcycle'], performance_df['Goal_Difference'],
+            yerr=error_bars(performance_df, 'Goal_Difference'), capsize=4)
+    plt.title('Goal Difference by Microcycle Length')
+    plt.xlabel('Days Between Matches')
+    plt.ylabel('Goal Difference')
+    plt.grid(True, alpha=0.3)
 
 if __name__ == "__main__":
-    analyze_america_mg_microcycles() 
\ No newline at end of file
+    parser = add_filter_arguments(argparse.ArgumentParser(description="Team performance by microcycle length"), team='América (MG)')
+    args = parser.parse_args()
+    run_main('microcycles', analyze_microcycles, team=args.team, season=args.season, competition=args.competition) 
\ No newline at end of file
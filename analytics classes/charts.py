@@ -0,0 +1,106 @@
+import hashlib
+import inspect
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cleandata classes'))
+from instrumentation import step
+from paths import GRAPHICS_DIR
+
+CACHE_DIR_NAME = '.chart_cache'
+# Set to a non-empty value to skip drawing altogether (benchmarks, batch runs)
+NO_PLOTS_ENV = 'NO_PLOTS'
+
+# A chart spec is a dict describing one PNG:
+#   'output':  path of the PNG to write
+#   'draw':    module-level function drawing on the current figure with pyplot
+#   'data':    dict of (aggregated) DataFrames/Series passed to draw as keywords
+#   'kwargs':  other keyword arguments for draw (optional)
+#   'figsize', 'dpi', 'bbox_inches': figure options (optional)
+# Plotting libraries are only imported inside the worker that draws, and a
+# chart whose data, options and draw code are unchanged is not drawn again.
+
+def chart(output, draw, data=None, figsize=(15, 12), dpi=100, bbox_inches=None, **kwargs):
+    return {'output': output, 'draw': draw, 'data': data or {}, 'kwargs': kwargs,
+            'figsize': figsize, 'dpi': dpi, 'bbox_inches': bbox_inches}
+
+def _hash_value(digest, value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        digest.update(repr(list(value.columns) if isinstance(value, pd.DataFrame) else value.name).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    else:
+        digest.update(repr(value).encode())
+
+def spec_hash(spec):
+    digest = hashlib.sha256()
+    draw = spec['draw']
+    digest.update(f"{draw.__module__}.{draw.__qualname__}".encode())
+    digest.update(inspect.getsource(draw).encode())
+    for key in ['figsize', 'dpi', 'bbox_inches']:
+        digest.update(repr(spec[key]).encode())
+    for name in sorted(spec['data']):
+        digest.update(name.encode())
+        _hash_value(digest, spec['data'][name])
+    for name in sorted(spec['kwargs']):
+        digest.update(name.encode())
+        _hash_value(digest, spec['kwargs'][name])
+    return digest.hexdigest()
+
+def _hash_path(output):
+    folder, name = os.path.split(output)
+    return os.path.join(folder, CACHE_DIR_NAME, name + '.sha256')
+
+def is_current(spec, digest):
+    hash_path = _hash_path(spec['output'])
+    if not (os.path.exists(spec['output']) and os.path.exists(hash_path)):
+        return False
+    with open(hash_path) as f:
+        return f.read().strip() == digest
+
+def render_chart(spec):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=spec['figsize'])
+    spec['draw'](**spec['data'], **spec['kwargs'])
+    plt.tight_layout()
+    os.makedirs(os.path.dirname(os.path.abspath(spec['output'])), exist_ok=True)
+    plt.savefig(spec['output'], dpi=spec['dpi'], bbox_inches=spec['bbox_inches'])
+    plt.close('all')
+    return spec['output']
+
+def render_charts(specs, workers=None, force=False):
+    with step('plot'):
+        return _render_charts(specs, workers, force)
+
+def _render_charts(specs, workers=None, force=False):
+    # Draw every outdated chart, in parallel when there is more than one
+    if os.environ.get(NO_PLOTS_ENV):
+        print(f"Plotting disabled, {len(specs)} chart(s) skipped")
+        return []
+
+    pending = []
+    for spec in specs:
+        digest = spec_hash(spec)
+        if force or not is_current(spec, digest):
+            pending.append((spec, digest))
+        else:
+            print(f"Chart up to date: {os.path.basename(spec['output'])}")
+
+    if len(pending) == 1:
+        render_chart(pending[0][0])
+    elif pending:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(render_chart, [spec for spec, _ in pending]))
+
+    for spec, digest in pending:
+        hash_path = _hash_path(spec['output'])
+        os.makedirs(os.path.dirname(hash_path), exist_ok=True)
+        with open(hash_path, 'w') as f:
+            f.write(digest)
+        print(f"Chart saved: {os.path.basename(spec['output'])}")
+
+    return [spec['output'] for spec, _ in pending]
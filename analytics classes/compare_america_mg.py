@@ -1,141 +1,220 @@
+import argparse
+import os
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+from charts import GRAPHICS_DIR, chart, render_charts
+from fixtures import team_slug
+from instrumentation import count_rows, run_main, step
+from paths import data_path
 
-def compare_america_mg():
+# Metrics compared with the league average, with their display names.
+# For the LOWER_IS_BETTER ones rank 1 and percentile 100 mean the fewest.
+METRICS = {
+    'Home_Win_Rate': 'Home Win Rate (%)',
+    'Away_Win_Rate': 'Away Win Rate (%)',
+    'Away_Goals_Scored': 'Away Goals Scored',
+    'Away_Goals_Conceded': 'Away Goals Conceded',
+    'Goal_Difference': 'Goal Difference',
+    'Away_Losses': 'Away Losses'
+}
+LOWER_IS_BETTER = ['Away_Goals_Conceded', 'Away_Losses']
+
+def league_comparison(df, metrics=METRICS):
+    # Every team's value, the league average, the difference, the rank and
+    # the percentile of every metric, one row per team and metric
+    values = df[list(metrics)]
+    league_avg = values.mean()
+    # Rank and percentile on values oriented so that higher is better
+    oriented = values.copy()
+    flip = [col for col in oriented.columns if col in LOWER_IS_BETTER]
+    oriented[flip] = -oriented[flip]
+    table = pd.concat({
+        'Value': values,
+        'League Average': pd.DataFrame([league_avg] * len(values), index=values.index),
+        'Difference': values - league_avg,
+        'Rank': oriented.rank(ascending=False, method='min'),
+        'Percentile': oriented.rank(pct=True) * 100,
+    }, axis=1)
+    table = table.stack(level=1, future_stack=True).rename_axis(['Team', 'Metric']).reset_index()
+    table['Metric'] = pd.Categorical(table['Metric'].map(metrics), categories=list(metrics.values()))
+    table['Rank'] = table['Rank'].astype(int)
+    # The average's last digits depend on the summation order; rounded, the
+    # CSVs come out the same on every run
+    table = table.round({'Value': 4, 'League Average': 4, 'Difference': 4, 'Percentile': 4})
+    return table.sort_values(['Team', 'Metric'], kind='stable').reset_index(drop=True)
+
+def read_team_stats():
+    print("Reading match data...")
+    with step('read'):
+        df = pd.read_csv(data_path('team_performance_stats.csv'), index_col=0)
+    count_rows(rows_in=len(df))
+    return df
+
+def compare_america_mg(team='América (MG)'):
     try:
         # Read the data
-        print("Reading match data...")
-        df = pd.read_csv('../DATA/team_performance_stats.csv', index_col=0)
-        
-        # Set América MG as the reference team
-        america_mg = df.loc['América (MG)']
-        
-        # Create separate figures for each visualization
-        # 1. Home vs Away Win Rate Comparison
-        plt.figure(figsize=(12, 8))
-        home_away_rates = df[['Home_Win_Rate', 'Away_Win_Rate']].sort_values('Home_Win_Rate', ascending=True)
-        home_away_rates.plot(kind='barh')
-        plt.title('Home vs Away Win Rates by Team', fontsize=14, pad=20)
-        plt.xlabel('Win Rate (%)')
-        plt.legend(['Home Win Rate', 'Away Win Rate'])
-        
-        # Highlight América MG
-        america_idx = home_away_rates.index.get_loc('América (MG)')
-        plt.axhline(y=america_idx, color='r', linestyle='--', alpha=0.3)
-        
-        plt.tight_layout()
-        plt.savefig('../DATA/america_mg_win_rates.png', dpi=300, bbox_inches='tight')
-        plt.close()
-        
-        # 2. Away Goals Scored vs Conceded
-        plt.figure(figsize=(12, 8))
-        away_goals = pd.DataFrame({
-            'Team': df.index,
-            'Goals_Scored': df['Away_Goals_Scored'],
-            'Goals_Conceded': df['Away_Goals_Conceded']
-        }).sort_values('Goals_Scored', ascending=True)
-        away_goals.plot(x='Team', kind='barh')
-        plt.title('Away Goals Scored vs Conceded', fontsize=14, pad=20)
-        plt.xlabel('Number of Goals')
-        
-        # Highlight América MG
-        america_idx = away_goals.index.get_loc('América (MG)')
-        plt.axhline(y=america_idx, color='r', linestyle='--', alpha=0.3)
-        
-        plt.tight_layout()
-        plt.savefig('../DATA/america_mg_away_goals.png', dpi=300, bbox_inches='tight')
-        plt.close()
-        
-        # 3. Goal Difference
-        plt.figure(figsize=(12, 8))
-        goal_diff = df['Goal_Difference'].sort_values(ascending=True)
-        goal_diff.plot(kind='barh')
-        plt.title('Goal Difference by Team', fontsize=14, pad=20)
-        plt.xlabel('Goal Difference')
-        
-        # Highlight América MG
-        america_idx = goal_diff.index.get_loc('América (MG)')
-        plt.axhline(y=america_idx, color='r', linestyle='--', alpha=0.3)
-        
-        plt.tight_layout()
-        plt.savefig('../DATA/america_mg_goal_difference.png', dpi=300, bbox_inches='tight')
-        plt.close()
-        
-        # 4. Away Losses
-        plt.figure(figsize=(12, 8))
-        away_losses = df['Away_Losses'].sort_values(ascending=True)
-        away_losses.plot(kind='barh')
-        plt.title('Number of Away Losses by Team', fontsize=14, pad=20)
-        plt.xlabel('Number of Losses')
-        
-        # Highlight América MG
-        america_idx = away_losses.index.get_loc('América (MG)')
-        plt.axhline(y=america_idx, color='r', linestyle='--', alpha=0.3)
-        
-        plt.tight_layout()
-        plt.savefig('../DATA/america_mg_away_losses.png', dpi=300, bbox_inches='tight')
-        plt.close()
+        df = read_team_stats()
+        if team not in df.index:
+            raise KeyError(f"{team} is not in team_performance_stats.csv")
+        slug = team_slug(team)
+        
+        # Create separate figures for each visualization, rendered in parallel
+        render_charts([
+            # 1. Home vs Away Win Rate Comparison
+            chart(os.path.join(GRAPHICS_DIR, f'{slug}_win_rates.png'), draw_win_rates,
+                  {'df': df[['Home_Win_Rate', 'Away_Win_Rate']]},
+                  figsize=(12, 8), dpi=300, bbox_inches='tight', team=team),
+            # 2. Away Goals Scored vs Conceded
+            chart(os.path.join(GRAPHICS_DIR, f'{slug}_away_goals.png'), draw_away_goals,
+                  {'df': df[['Away_Goals_Scored', 'Away_Goals_Conceded']]},
+                  figsize=(12, 8), dpi=300, bbox_inches='tight', team=team),
+            # 3. Goal Difference
+            chart(os.path.join(GRAPHICS_DIR, f'{slug}_goal_difference.png'), draw_goal_difference,
+                  {'df': df[['Goal_Difference']]},
+                  figsize=(12, 8), dpi=300, bbox_inches='tight', team=team),
+            # 4. Away Losses
+            chart(os.path.join(GRAPHICS_DIR, f'{slug}_away_losses.png'), draw_away_losses,
+                  {'df': df[['Away_Losses']]},
+                  figsize=(12, 8), dpi=300, bbox_inches='tight', team=team)
+        ])
         
         # Create comparison DataFrame
-        league_avg = df.mean()
-        comparison_data = {
-            'Metric': [
-                'Home Win Rate (%)',
-                'Away Win Rate (%)',
-                'Away Goals Scored',
-                'Away Goals Conceded',
-                'Goal Difference',
-                'Away Losses'
-            ],
-            'América MG': [
-                america_mg['Home_Win_Rate'],
-                america_mg['Away_Win_Rate'],
-                america_mg['Away_Goals_Scored'],
-                america_mg['Away_Goals_Conceded'],
-                america_mg['Goal_Difference'],
-                america_mg['Away_Losses']
-            ],
-            'League Average': [
-                league_avg['Home_Win_Rate'],
-                league_avg['Away_Win_Rate'],
-                league_avg['Away_Goals_Scored'],
-                league_avg['Away_Goals_Conceded'],
-                league_avg['Goal_Difference'],
-                league_avg['Away_Losses']
-            ],
-            'Difference': [
-                america_mg['Home_Win_Rate'] - league_avg['Home_Win_Rate'],
-                america_mg['Away_Win_Rate'] - league_avg['Away_Win_Rate'],
-                america_mg['Away_Goals_Scored'] - league_avg['Away_Goals_Scored'],
-                america_mg['Away_Goals_Conceded'] - league_avg['Away_Goals_Conceded'],
-                america_mg['Goal_Difference'] - league_avg['Goal_Difference'],
-                america_mg['Away_Losses'] - league_avg['Away_Losses']
-            ]
-        }
-        
-        comparison_df = pd.DataFrame(comparison_data)
+        with step('aggregate'):
+            league = league_comparison(df)
+            comparison_df = (league[league['Team'] == team]
+                             .loc[:, ['Metric', 'Value', 'League Average', 'Difference']]
+                             .rename(columns={'Value': team}))
+            comparison_df['Metric'] = comparison_df['Metric'].astype(str)
         
         # Save comparison to CSV
-        comparison_df.to_csv('../DATA/america_mg_comparison.csv', index=False)
+        with step('write'):
+            comparison_df.to_csv(data_path(f'{slug}_comparison.csv'), index=False)
+        count_rows(rows_out=len(comparison_df))
         
         # Print detailed comparison
-        print("\nAmérica MG Comparison with League Average")
+        print(f"\n{team} Comparison with League Average")
         print("=" * 80)
-        print("\nDetailed comparison saved to america_mg_comparison.csv")
+        print(f"\nDetailed comparison saved to {slug}_comparison.csv")
         print("\nVisualizations saved as separate files:")
-        print("- america_mg_win_rates.png")
-        print("- america_mg_away_goals.png")
-        print("- america_mg_goal_difference.png")
-        print("- america_mg_away_losses.png")
+        print(f"- {slug}_win_rates.png")
+        print(f"- {slug}_away_goals.png")
+        print(f"- {slug}_goal_difference.png")
+        print(f"- {slug}_away_losses.png")
         
         print("\nKey Statistics:")
         print(comparison_df.to_string(index=False))
         
     except Exception as e:
         print(f"An error occurred: {e}")
-        import traceback
-        traceback.print_exc()
+        raise
+
+def compare_all_teams(plots=True, workers=None):
+    # Batch mode for scouting: every team against the league average in one
+    # table, plus one small percentile profile per team
+    try:
+        df = read_team_stats()
+        
+        with step('aggregate'):
+            league = league_comparison(df)
+        
+        with step('write'):
+            league.to_csv(data_path('league_comparison.csv'), index=False)
+        count_rows(rows_out=len(league))
+        print(f"Comparison of {len(df)} teams saved to league_comparison.csv")
+        
+        if plots:
+            output_dir = os.path.join(GRAPHICS_DIR, 'league_comparison')
+            written = render_charts([
+                chart(os.path.join(output_dir, f'{team_slug(team)}.png'), draw_team_profile,
+                      {'profile': profile.set_index('Metric')[['Value', 'League Average', 'Percentile']]},
+                      figsize=(10, 5), team=team)
+                for team, profile in league.groupby('Team', sort=True)
+            ], workers=workers)
+            print(f"{len(written)} team profiles rendered in {output_dir}")
+        
+        # Best and worst team of every metric
+        print("\nLeague leaders:")
+        leaders = league[league['Rank'] == 1].groupby('Metric', observed=True)['Team'].agg(', '.join)
+        print(leaders.to_string())
+        
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        raise
+
+def draw_win_rates(df, team):
+    import matplotlib.pyplot as plt
+    
+    home_away_rates = df[['Home_Win_Rate', 'Away_Win_Rate']].sort_values('Home_Win_Rate', ascending=True)
+    home_away_rates.plot(kind='barh')
+    plt.title('Home vs Away Win Rates by Team', fontsize=14, pad=20)
+    plt.xlabel('Win Rate (%)')
+    plt.legend(['Home Win Rate', 'Away Win Rate'])
+    
+    # Highlight the reference team
+    team_idx = home_away_rates.index.get_loc(team)
+    plt.axhline(y=team_idx, color='r', linestyle='--', alpha=0.3)
+
+def draw_away_goals(df, team):
+    import matplotlib.pyplot as plt
+    
+    away_goals = pd.DataFrame({
+        'Team': df.index,
+        'Goals_Scored': df['Away_Goals_Scored'],
+        'Goals_Conceded': df['Away_Goals_Conceded']
+    }).sort_values('Goals_Scored', ascending=True)
+    away_goals.plot(x='Team', kind='barh')
+    plt.title('Away Goals Scored vs Conceded', fontsize=14, pad=20)
+    plt.xlabel('Number of Goals')
+    
+    # Highlight the reference team
+    team_idx = away_goals.index.get_loc(team)
+    plt.axhline(y=team_idx, color='r', linestyle='--', alpha=0.3)
+
+def draw_goal_difference(df, team):
+    import matplotlib.pyplot as plt
+    
+    goal_diff = df['Goal_Difference'].sort_values(ascending=True)
+    goal_diff.plot(kind='barh')
+    plt.title('Goal Difference by Team', fontsize=14, pad=20)
+    plt.xlabel('Goal Difference')
+    
+    # Highlight the reference team
+    team_idx = goal_diff.index.get_loc(team)
+    plt.axhline(y=team_idx, color='r', linestyle='--', alpha=0.3)
+
+def draw_away_losses(df, team):
+    import matplotlib.pyplot as plt
+    
+    away_losses = df['Away_Losses'].sort_values(ascending=True)
+    away_losses.plot(kind='barh')
+    plt.title('Number of Away Losses by Team', fontsize=14, pad=20)
+    plt.xlabel('Number of Losses')
+    
+    # Highlight the reference team
+    team_idx = away_losses.index.get_loc(team)
+    plt.axhline(y=team_idx, color='r', linestyle='--', alpha=0.3)
+
+def draw_team_profile(profile, team):
+    import matplotlib.pyplot as plt
+    
+    # Percentile of every metric (100 = best in the league), with the value
+    # and the league average next to each bar
+    profile = profile.iloc[::-1]
+    colors = ['tab:green' if p >= 50 else 'tab:red' for p in profile['Percentile']]
+    plt.barh(profile.index.astype(str), profile['Percentile'], color=colors)
+    plt.axvline(x=50, color='grey', linestyle='--', alpha=0.5)
+    for i, (value, avg) in enumerate(zip(profile['Value'], profile['League Average'])):
+        plt.text(101, i, f"{value:.1f} (avg {avg:.1f})", va='center', fontsize=9)
+    plt.xlim(0, 130)
+    plt.title(f'{team} - Percentile in the League', fontsize=14)
+    plt.xlabel('Percentile')
 
 if __name__ == "__main__":
-    compare_america_mg() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Compare a team with the league average")
+    parser.add_argument('--team', default='América (MG)', help="club to compare (default: América (MG))")
+    parser.add_argument('--all-teams', action='store_true', help="compare every team and write league_comparison.csv")
+    parser.add_argument('--workers', type=int, help="processes drawing the team profiles")
+    args = parser.parse_args()
+    if args.all_teams:
+        run_main('compare_league', compare_all_teams, workers=args.workers)
+    else:
+        run_main('compare_america_mg', compare_america_mg, team=args.team)
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import re
+import sys
+import unicodedata
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cleandata classes'))
+from datasets import FIXTURES_DATASET, partition_dir, partition_filters, read_partitions, write_atomically
+from instrumentation import count_rows, run_main, step
+from paths import DATA_DIR
+
+DEFAULT_SOURCE = os.path.join(DATA_DIR, 'allMatchs.csv')
+# One row per fixtures CSV: file (relative to DATA), season, competition
+FIXTURE_SOURCES = os.path.join(DATA_DIR, 'fixture_sources.csv')
+TEAM_COLUMNS = ['Em casa', 'Visitante']
+# Content hash of the CSV every partition was parsed from, kept in the
+# dataset (hidden, so dataset readers skip it)
+SOURCE_HASHES = '.sources.json'
+
+# Result codes from the home team's point of view
+HOME_WIN, DRAW, AWAY_WIN = 'H', 'D', 'A'
+
+def parse_fixtures(df):
+    # Remove empty rows and duplicate headers
+    df = df.dropna(how='all')
+    df = df[df['Data'] != 'Data'].copy()
+
+    # Convert date and round columns
+    df['Data'] = pd.to_datetime(df['Data'])
+    df['Sem'] = pd.to_numeric(df['Sem'], errors='coerce').astype('Int64')
+
+    # Scores come as '2–1' or '2 x 1'; anything else (postponed, not played)
+    # is left without goals
+    goals = df['Resultado'].str.extract(r'^\s*(\d+)\s*[x–-]\s*(\d+)\s*$')
+    df['Home_Goals'] = goals[0].astype(float)
+    df['Away_Goals'] = goals[1].astype(float)
+
+    margin = np.sign(df['Home_Goals'] - df['Away_Goals'])
+    df['Result'] = pd.Series(np.select([margin > 0, margin == 0, margin < 0],
+                                       [HOME_WIN, DRAW, AWAY_WIN], default=''),
+                             index=df.index).replace('', np.nan)
+
+    df = share_team_categories(df)
+    return df.sort_values('Data', kind='stable').reset_index(drop=True)
+
+def share_team_categories(df):
+    # Both team columns share one category set so they can be compared and stacked
+    teams = sorted(set(df['Em casa'].dropna().astype(str)) | set(df['Visitante'].dropna().astype(str)))
+    for col in TEAM_COLUMNS:
+        df[col] = pd.Categorical(df[col].astype(object), categories=teams)
+    return df
+
+def team_slug(team):
+    # 'América (MG)' -> 'america_mg', used to name per-team output files
+    ascii_name = unicodedata.normalize('NFKD', team).encode('ascii', 'ignore').decode()
+    return re.sub(r'[^a-z0-9]+', '_', ascii_name.lower()).strip('_')
+
+def content_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def write_json(path, value):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(value, f, ensure_ascii=False, indent=1, sort_keys=True)
+
+def update_fixtures_dataset(sources=FIXTURE_SOURCES, dataset=FIXTURES_DATASET):
+    # Parse every listed CSV into its Season/Competition partition, again only
+    # when the CSV's content differs from the one the partition was parsed from
+    listed = pd.read_csv(sources)
+    hashes_path = os.path.join(dataset, SOURCE_HASHES)
+    hashes = {}
+    if os.path.exists(hashes_path):
+        with open(hashes_path, encoding='utf-8') as f:
+            hashes = json.load(f)
+    written = []
+    for _, row in listed.iterrows():
+        source = os.path.join(os.path.dirname(os.path.abspath(sources)), row['file'])
+        folder = partition_dir(dataset, Season=int(row['season']), Competition=row['competition'])
+        path = os.path.join(folder, 'fixtures.parquet')
+        key = os.path.relpath(path, dataset)
+        digest = content_hash(source)
+        if os.path.exists(path) and hashes.get(key) == digest:
+            continue
+        fixtures = parse_fixtures(pd.read_csv(source))
+        fixtures[TEAM_COLUMNS] = fixtures[TEAM_COLUMNS].astype(object)
+        os.makedirs(folder, exist_ok=True)
+        written.append(write_atomically(path, lambda tmp: fixtures.to_parquet(tmp, index=False)))
+        hashes[key] = digest
+    if written:
+        write_atomically(hashes_path, lambda tmp: write_json(tmp, hashes))
+    return written
+
+def build_fixtures_dataset(sources=FIXTURE_SOURCES, dataset=FIXTURES_DATASET):
+    # Pipeline stage: refresh the dataset once, before the scripts reading it
+    # run side by side
+    try:
+        with step('write'):
+            written = update_fixtures_dataset(sources, dataset)
+        count_rows(rows_out=len(written))
+        print(f"Updated {len(written)} fixtures partition(s) in {dataset}")
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        raise
+
+def load_fixtures(season=None, competition=None, team=None, columns=None, dataset=FIXTURES_DATASET):
+    # Typed fixtures of the requested seasons/competitions, optionally only
+    # the ones involving team. Only the matching partitions are read; the
+    # dataset itself is only written by the fixtures stage.
+    if not os.path.isdir(dataset):
+        raise FileNotFoundError(f"{dataset} does not exist; run fixtures.py to build the fixtures dataset")
+    filters = partition_filters(season, competition)
+    if team is not None:
+        # Pushed down as (partition filters AND home) OR (partition filters AND away)
+        filters = [filters + [(col, '==', team)] for col in TEAM_COLUMNS]
+    if columns is not None:
+        columns = list(dict.fromkeys(['Data'] + TEAM_COLUMNS + list(columns)))
+    fixtures = read_partitions(dataset, columns=columns, filters=filters)
+    fixtures['Data'] = fixtures['Data'].astype('datetime64[ns]')
+    fixtures = share_team_categories(fixtures)
+    return fixtures.sort_values('Data', kind='stable').reset_index(drop=True)
+
+def team_matches(fixtures, team=None):
+    # One row per team per match (home and away perspective), in date order
+    played = fixtures['Home_Goals'].notna()
+    common = {'Fixture': fixtures.index, 'Data': fixtures['Data'], 'Sem': fixtures['Sem'],
+              'Played': played}
+    home = pd.DataFrame({**common,
+                         'Team': fixtures['Em casa'], 'Opponent': fixtures['Visitante'],
+                         'Is_Home': True,
+                         'Goals_For': fixtures['Home_Goals'], 'Goals_Against': fixtures['Away_Goals']})
+    away = pd.DataFrame({**common,
+                         'Team': fixtures['Visitante'], 'Opponent': fixtures['Em casa'],
+                         'Is_Home': False,
+                         'Goals_For': fixtures['Away_Goals'], 'Goals_Against': fixtures['Home_Goals']})
+    matches = pd.concat([home, away], ignore_index=True)
+
+    if team is not None:
+        matches = matches[matches['Team'] == team]
+
+    margin = np.sign(matches['Goals_For'] - matches['Goals_Against'])
+    matches['Result'] = pd.Series(np.select([margin > 0, margin == 0, margin < 0], ['W', 'D', 'L'], default=''),
+                                  index=matches.index).replace('', np.nan)
+    matches['Points'] = np.select([margin > 0, margin == 0], [3, 1], default=0)
+
+    return matches.sort_values(['Team', 'Data'], kind='stable').reset_index(drop=True)
+
+if __name__ == "__main__":
+    run_main('fixtures', build_fixtures_dataset)
@@ -0,0 +1,252 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cleandata classes'))
+from datasets import add_filter_arguments, write_atomically
+from gps_store import LOAD_COLUMNS, load_gps_store
+from instrumentation import count_rows, run_main, step
+from paths import data_path
+
+# Rollup cube of the GPS load: one cell per combination of the DIMENSIONS
+# (training sessions have no coach/venue, and keep them as missing), holding
+# for every metric the count, sum and sum of squared deviations from the
+# cell mean (M2). Any slice's total, mean and std is then a merge of cells,
+# and merging with M2 instead of raw sums of squares keeps the variance
+# exact even for large, nearly constant loads.
+# The state keeps a content hash of every date's sessions and DAY_CELLS_DIR
+# the cells of every date, one file per season. An update takes the old cells
+# of the dates that changed (late sessions, corrections, coach relabels) or
+# are gone out of the cube, running the merge backwards, and merges the new
+# cells of the changed dates into the cube keys they touch; every other
+# cell is left as it is.
+DIMENSIONS = ['ATLETA', 'Posicao', 'Coach', 'Local', 'days_until_match']
+METRICS = [col for col in LOAD_COLUMNS if col != 'days_until_match']
+CUBE_PATH = data_path('load_cube.parquet')
+DAY_CELLS_DIR = data_path('load_cube_days')
+STATE_PATH = data_path('load_cube.json')
+
+def cell_key(sessions, col):
+    if col == 'DATA':
+        return sessions[col]
+    if col == 'days_until_match':
+        return sessions[col].astype('float64')
+    return sessions[col].astype(object)
+
+def build_cells(sessions, metrics=METRICS, dimensions=DIMENSIONS):
+    # Cells of the sessions, straight from one grouped aggregation
+    keys = [cell_key(sessions, col) for col in dimensions]
+    values = sessions[metrics].astype('float64')
+    grouped = values.groupby(keys, dropna=False, sort=False)
+    count = grouped.count()
+    cells = pd.DataFrame(index=count.index)
+    for metric in metrics:
+        cells[f'{metric}_Count'] = count[metric]
+        cells[f'{metric}_Sum'] = grouped[metric].sum()
+        cells[f'{metric}_M2'] = grouped[metric].var(ddof=0).fillna(0) * count[metric]
+    cells.index.names = dimensions
+    return cells.reset_index()
+
+def rollup(cells, by, metrics=METRICS):
+    # Merge the cells into one row per value of the by columns (every cell
+    # together when by is empty). Within a group, the merged M2 is the sum of
+    # the cells' M2 plus each cell's count x (cell mean - group mean)^2.
+    keys = [cells[col] for col in by] if by else np.zeros(len(cells), dtype=int)
+    merged = pd.DataFrame()
+    for metric in metrics:
+        count, total, m2 = (cells[f'{metric}_{part}'] for part in ['Count', 'Sum', 'M2'])
+        grouped_count = count.groupby(keys, dropna=False).transform('sum')
+        grouped_mean = (total.groupby(keys, dropna=False).transform('sum') / grouped_count).fillna(0)
+        cell_mean = (total / count).where(count > 0, 0)
+        spread = m2 + count * (cell_mean - grouped_mean) ** 2
+        parts = pd.DataFrame({f'{metric}_Count': count, f'{metric}_Sum': total, f'{metric}_M2': spread})
+        merged = pd.concat([merged, parts.groupby(keys, dropna=False).sum()], axis=1)
+    if by:
+        merged.index.names = by
+        return merged.reset_index()
+    return merged.reset_index(drop=True)
+
+def date_hashes(sessions):
+    # {date: hash of that date's sessions}, independent of the row order
+    rows = pd.util.hash_pandas_object(sessions, index=False).to_numpy()
+    dates = sessions['DATA'].dt.strftime('%Y-%m-%d').to_numpy()
+    sums = pd.Series(rows).groupby(dates).sum()
+    counts = pd.Series(dates).value_counts()
+    return {date: f'{int(total):016x}-{counts[date]}' for date, total in sums.items()}
+
+def session_dates(sessions):
+    return sessions['DATA'].dt.strftime('%Y-%m-%d')
+
+def key_hashes(cells):
+    # One number per cell identifying its DIMENSIONS values (missing ones included)
+    keys = pd.DataFrame({col: cell_key(cells, col) for col in DIMENSIONS})
+    for col in DIMENSIONS[:-1]:
+        keys[col] = keys[col].where(keys[col].notna(), None)
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy()
+
+def remove_cells(cube, cells, metrics=METRICS):
+    # The cube without cells (of sessions already merged into it): the
+    # parallel-variance merge run backwards on the keys they belong to.
+    # Cells left with no values are dropped.
+    removed = rollup(cells, DIMENSIONS, metrics)
+    positions = pd.Index(key_hashes(cube)).get_indexer(key_hashes(removed))
+    if (positions < 0).any():
+        raise ValueError("The cube does not hold the cells being replaced; run with --rebuild")
+    cube = cube.copy()
+    for metric in metrics:
+        columns = [f'{metric}_{part}' for part in ['Count', 'Sum', 'M2']]
+        n, total, m2 = (cube[col].to_numpy(dtype='float64')[positions] for col in columns)
+        n_out, total_out, m2_out = (removed[col].to_numpy(dtype='float64') for col in columns)
+        n_left = n - n_out
+        total_left = np.where(n_left > 0, total - total_out, 0)
+        mean_left = total_left / np.maximum(n_left, 1)
+        mean_out = total_out / np.maximum(n_out, 1)
+        m2_left = m2 - m2_out - n_left * n_out / np.maximum(n, 1) * (mean_left - mean_out) ** 2
+        for col, values in zip(columns, [n_left, total_left, np.where(n_left > 0, np.maximum(m2_left, 0), 0)]):
+            cube[col] = cube[col].astype('float64')
+            cube.iloc[positions, cube.columns.get_loc(col)] = values
+    empty = np.zeros(len(cube), dtype=bool)
+    empty[positions] = (cube.iloc[positions][[f'{metric}_Count' for metric in metrics]] == 0).all(axis=1)
+    return cube[~empty].reset_index(drop=True)
+
+def add_cells(cube, cells, metrics=METRICS):
+    # The cube with cells merged into it; only the keys they touch are merged
+    touched = np.isin(key_hashes(cube), key_hashes(cells))
+    merged = rollup(pd.concat([cube[touched], cells], ignore_index=True), DIMENSIONS, metrics)
+    return pd.concat([cube[~touched], merged], ignore_index=True)
+
+def season_path(day_dir, season):
+    return os.path.join(day_dir, f'{season}.parquet')
+
+def read_day_cells(dates, day_dir=DAY_CELLS_DIR):
+    # The stored cells of dates, reading only the seasons they fall in
+    frames = []
+    for season in sorted({date[:4] for date in dates}):
+        path = season_path(day_dir, season)
+        if os.path.exists(path):
+            cells = pd.read_parquet(path)
+            frames.append(cells[session_dates(cells).isin(dates)])
+    return pd.concat(frames, ignore_index=True) if frames else None
+
+def write_day_cells(cells, dates, day_dir=DAY_CELLS_DIR):
+    # Replace the stored cells of dates (changed or removed) with cells,
+    # rewriting only the seasons they fall in
+    os.makedirs(day_dir, exist_ok=True)
+    for season in sorted({date[:4] for date in dates}):
+        path = season_path(day_dir, season)
+        parts = [cells[cells['DATA'].dt.year == int(season)]]
+        if os.path.exists(path):
+            stored = pd.read_parquet(path)
+            parts.insert(0, stored[~session_dates(stored).isin(dates)])
+        kept = pd.concat(parts, ignore_index=True)
+        if len(kept):
+            write_atomically(path, lambda tmp: kept.to_parquet(tmp, index=False))
+        elif os.path.exists(path):
+            os.remove(path)
+
+def update_cube(cube, sessions, changed, removed, day_dir=DAY_CELLS_DIR, metrics=METRICS):
+    # (cube, new day cells) with the dates in changed built again from
+    # sessions and the dates in removed taken out
+    day_cells = build_cells(sessions[session_dates(sessions).isin(changed)], metrics, ['DATA'] + DIMENSIONS)
+    if cube is None:
+        return rollup(day_cells, DIMENSIONS, metrics), day_cells
+    old = read_day_cells(changed + removed, day_dir)
+    if old is not None:
+        cube = remove_cells(cube, old, metrics)
+    if len(day_cells):
+        cube = add_cells(cube, rollup(day_cells, DIMENSIONS, metrics), metrics)
+    return cube, day_cells
+
+def slice_stats(cube, by=(), metrics=METRICS, **where):
+    # Count, total, mean and std (ddof=1, as pandas) of every metric over the
+    # cells matching where (column=value or column=[values]), per by group
+    cells = cube
+    for col, value in where.items():
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        cells = cells[cells[col].isin(values)]
+    merged = rollup(cells, list(by), metrics)
+    stats = merged[list(by)].copy()
+    for metric in metrics:
+        count = merged[f'{metric}_Count']
+        stats[f'{metric}_Count'] = count
+        stats[f'{metric}_Sum'] = merged[f'{metric}_Sum']
+        stats[f'{metric}_Mean'] = merged[f'{metric}_Sum'] / count.where(count > 0)
+        stats[f'{metric}_Std'] = np.sqrt(merged[f'{metric}_M2'] / (count - 1).where(count > 1))
+    return stats
+
+def load_cube(path=CUBE_PATH):
+    if not os.path.exists(path):
+        return None
+    return pd.read_parquet(path)
+
+def load_state(path=STATE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def write_json(path, value):
+    with open(path, 'w') as f:
+        json.dump(value, f)
+
+def build_load_cube(input_path=data_path('GPS_with_matches.parquet'), output_path=CUBE_PATH, state_path=STATE_PATH,
+                    day_dir=DAY_CELLS_DIR, season=None, competition=None, team=None, rebuild=False):
+    try:
+        print("Reading data...")
+        with step('read'):
+            sessions = load_gps_store(input_path, columns=['DATA'] + DIMENSIONS + METRICS,
+                                      season=season, competition=competition, club=team)
+            sessions = sessions[sessions['ATLETA'].notna()]
+        if sessions.empty:
+            print("No GPS sessions match the selected season/competition/team")
+            return
+
+        # Only the dates whose sessions changed since the last build; a cube
+        # built with other filters (or missing its files) is built again
+        filters = {'season': season, 'competition': competition, 'team': team}
+        state = {} if rebuild else load_state(state_path)
+        cube = load_cube(output_path) if os.path.isdir(day_dir) else None
+        if state.get('filters') != filters or cube is None:
+            state, cube = {'filters': filters}, None
+            shutil.rmtree(day_dir, ignore_errors=True)
+        previous = state.get('dates', {})
+        with step('transform'):
+            hashes = date_hashes(sessions)
+        changed = sorted(date for date, digest in hashes.items() if previous.get(date) != digest)
+        removed = sorted(set(previous) - set(hashes))
+        count_rows(rows_in=int(session_dates(sessions).isin(changed).sum()))
+
+        if changed or removed:
+            with step('aggregate'):
+                cube, day_cells = update_cube(cube, sessions, changed, removed, day_dir)
+            with step('write'):
+                write_day_cells(day_cells, changed + removed, day_dir)
+                write_atomically(output_path, lambda tmp: cube.to_parquet(tmp, index=False))
+        state['dates'] = hashes
+        state['sessions'] = len(sessions)
+        write_atomically(state_path, lambda tmp: write_json(tmp, state))
+        count_rows(rows_out=len(cube))
+
+        print(f"Rebuilt {len(changed)} date(s), removed {len(removed)}; "
+              f"{state['sessions']} sessions in {len(cube)} cells")
+        print("\nTrimp per match day by position and venue (mean ± std):")
+        stats = slice_stats(cube, ['Posicao', 'Local'], ['Trimp'], days_until_match=0).dropna(subset=['Local'])
+        stats['Trimp'] = stats['Trimp_Mean'].round(1).astype(str) + ' ± ' + stats['Trimp_Std'].round(1).astype(str)
+        print(stats.pivot(index='Posicao', columns='Local', values='Trimp').to_string())
+        print(f"\nLoad cube saved to {output_path}")
+        return cube
+
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        raise
+
+if __name__ == "__main__":
+    parser = add_filter_arguments(argparse.ArgumentParser(description="Rollup cube of the GPS load"))
+    parser.add_argument('--rebuild', action='store_true', help="build the cube again from every session")
+    args = parser.parse_args()
+    run_main('load_cube', build_load_cube, season=args.season, competition=args.competition, team=args.team,
+             rebuild=args.rebuild)
@@ -0,0 +1,178 @@
+import hashlib
+import os
+import sys
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cleandata classes'))
+from datasets import GPS_DATASET, partition_filters, write_atomically
+from gps_store import DEFAULT_STORE, apply_schema
+from instrumentation import count_rows
+from paths import data_path
+
+# Match days are a few dozen rows among thousands of GPS sessions. The GPS
+# data is read in bounded chunks and only the first row of each match date is
+# kept, so memory does not grow with the number of sessions in the file. The
+# resulting match days are cached on disk, keyed on the source files' hash.
+MATCH_DAY_COLUMNS = ['DATA', 'Local', 'GP', 'GC', 'Posse', 'Coach']
+DEFAULT_CHUNKSIZE = 50_000
+CACHE_DIR = data_path('.match_day_cache')
+
+SUM_COLUMNS = ['Games', 'Wins', 'Draws', 'Losses', 'Goals_For', 'Goals_For_Count',
+               'Goals_Against', 'Goals_Against_Count', 'Possession', 'Possession_Count']
+
+_views = {}
+
+def iter_chunks(path=DEFAULT_STORE, columns=None, chunksize=DEFAULT_CHUNKSIZE,
+                season=None, competition=None, club=None):
+    # Typed chunks of at most chunksize rows from the partitioned dataset
+    # (when filtering, or when path is a directory), a Parquet file or a CSV
+    filters = partition_filters(season, competition, club)
+    if filters or os.path.isdir(path):
+        import pyarrow.dataset as ds
+        import pyarrow.parquet as pq
+        root = path if os.path.isdir(path) else GPS_DATASET
+        dataset = ds.dataset(root, format='parquet', partitioning='hive')
+        expression = pq.filters_to_expression(filters) if filters else None
+        batches = dataset.to_batches(columns=columns, filter=expression, batch_size=chunksize)
+        chunks = (batch.to_pandas() for batch in batches)
+    elif path.endswith('.parquet') and os.path.exists(path):
+        import pyarrow.parquet as pq
+        batches = pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns)
+        chunks = (batch.to_pandas() for batch in batches)
+    else:
+        csv_path = os.path.splitext(path)[0] + '.csv'
+        chunks = pd.read_csv(csv_path, usecols=columns, chunksize=chunksize)
+
+    for chunk in chunks:
+        count_rows(rows_in=len(chunk))
+        yield apply_schema(chunk)
+
+def iter_match_days(path=DEFAULT_STORE, columns=MATCH_DAY_COLUMNS, chunksize=DEFAULT_CHUNKSIZE, **filters):
+    # New match-day rows of every chunk: rows with a venue, first row per
+    # date, dates already seen in earlier chunks left out
+    seen = set()
+    for chunk in iter_chunks(path, columns, chunksize, **filters):
+        rows = chunk[chunk['Local'].notna()].drop_duplicates(subset=['DATA'])
+        rows = rows[~rows['DATA'].isin(seen)]
+        if rows.empty:
+            continue
+        seen.update(rows['DATA'])
+        yield rows
+
+def match_totals(rows, by):
+    # Counts and sums of match rows per group
+    values = pd.DataFrame({
+        'Games': 1,
+        'Wins': (rows['GP'] > rows['GC']).astype(int),
+        'Draws': (rows['GP'] == rows['GC']).astype(int),
+        'Losses': (rows['GP'] < rows['GC']).astype(int),
+        'Goals_For': rows['GP'].astype('float64').fillna(0),
+        'Goals_For_Count': rows['GP'].notna().astype(int),
+        'Goals_Against': rows['GC'].astype('float64').fillna(0),
+        'Goals_Against_Count': rows['GC'].notna().astype(int),
+        'Possession': rows['Posse'].astype('float64').fillna(0),
+        'Possession_Count': rows['Posse'].notna().astype(int),
+        'First_Date': rows['DATA'],
+    }, index=rows.index)
+    keys = [rows[col].astype(object).rename(col) for col in by]
+    return values.groupby(keys).agg({**{col: 'sum' for col in SUM_COLUMNS}, 'First_Date': 'min'})
+
+def summarize(totals):
+    # Rates and averages from the totals, groups in order of their first match
+    totals = totals.sort_values('First_Date', kind='stable')
+    summary = pd.DataFrame(index=totals.index)
+    summary['Games'] = totals['Games']
+    summary['Wins'] = totals['Wins']
+    summary['Draws'] = totals['Draws']
+    summary['Losses'] = totals['Losses']
+    summary['Win_Rate'] = totals['Wins'] / totals['Games'] * 100
+    summary['Goals_For_Avg'] = totals['Goals_For'] / totals['Goals_For_Count']
+    summary['Goals_Against_Avg'] = totals['Goals_Against'] / totals['Goals_Against_Count']
+    summary['Possession_Avg'] = totals['Possession'] / totals['Possession_Count']
+    return summary
+
+class MatchDayView:
+    # The match days (first row of every date with a venue) and their
+    # per-grouping summaries, computed once and shared by the analyses
+    def __init__(self, games):
+        self.games = games.sort_values('DATA', kind='stable').reset_index(drop=True)
+        self._summaries = {}
+
+    def __len__(self):
+        return len(self.games)
+
+    def summary(self, by):
+        # Games, results, goals and possession per value of the by columns
+        # (e.g. ['Local'] or ['Coach', 'Local']), computed once per grouping
+        key = tuple(by)
+        if key not in self._summaries:
+            rows = self.games.dropna(subset=list(by))
+            totals = match_totals(rows, by) if len(rows) else pd.DataFrame(columns=SUM_COLUMNS + ['First_Date'])
+            self._summaries[key] = summarize(totals)
+        return self._summaries[key]
+
+def source_files(path=DEFAULT_STORE, season=None, competition=None, club=None):
+    # Files the match days of these filters are read from, as iter_chunks picks them
+    if partition_filters(season, competition, club) or os.path.isdir(path):
+        root = path if os.path.isdir(path) else GPS_DATASET
+        return sorted(os.path.join(folder, name) for folder, _, names in os.walk(root)
+                      for name in names if name.endswith('.parquet'))
+    if path.endswith('.parquet') and os.path.exists(path):
+        return [path]
+    return [os.path.splitext(path)[0] + '.csv']
+
+def source_hash(files, filters):
+    digest = hashlib.sha256(repr(sorted(filters.items())).encode())
+    for path in files:
+        digest.update(os.path.basename(path).encode())
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+def build_match_days(path=DEFAULT_STORE, chunksize=DEFAULT_CHUNKSIZE, **filters):
+    # Stream the GPS data in chunks, keeping only the match-day rows
+    frames = list(iter_match_days(path, chunksize=chunksize, **filters))
+    if not frames:
+        return apply_schema(pd.DataFrame(columns=MATCH_DAY_COLUMNS))
+    return pd.concat(frames, ignore_index=True)
+
+def cached_digest(cache_path, hash_path):
+    if not (os.path.exists(cache_path) and os.path.exists(hash_path)):
+        return None
+    with open(hash_path) as f:
+        return f.read().strip()
+
+def write_text(path, text):
+    with open(path, 'w') as f:
+        f.write(text)
+
+def match_day_view(path=DEFAULT_STORE, chunksize=DEFAULT_CHUNKSIZE, cache_dir=CACHE_DIR, **filters):
+    # The MatchDayView of path and the season/competition/club filters. It is
+    # built once per process, and its match days are kept in cache_dir next
+    # to the hash of the source files they came from, so later runs skip the
+    # GPS read until the data changes.
+    filters = {k: v for k, v in filters.items() if v is not None}
+    files = source_files(path, **filters)
+    signature = tuple((f, os.stat(f).st_mtime_ns, os.stat(f).st_size) for f in files if os.path.exists(f))
+    key = (os.path.abspath(path), repr(sorted(filters.items())), signature)
+    if key in _views:
+        return _views[key]
+
+    slot = hashlib.sha256(repr(key[:2]).encode()).hexdigest()[:16]
+    cache_path = os.path.join(cache_dir, slot + '.parquet')
+    hash_path = os.path.join(cache_dir, slot + '.sha256')
+    digest = source_hash([f for f, _, _ in signature], filters)
+    if cached_digest(cache_path, hash_path) == digest:
+        games = apply_schema(pd.read_parquet(cache_path))
+        count_rows(rows_in=len(games))
+    else:
+        # Analyses running side by side may build the same slot; each one
+        # writes through its own temp file
+        games = build_match_days(path, chunksize, **filters)
+        os.makedirs(cache_dir, exist_ok=True)
+        write_atomically(cache_path, lambda tmp: games.to_parquet(tmp, index=False))
+        write_atomically(hash_path, lambda tmp: write_text(tmp, digest))
+
+    view = _views[key] = MatchDayView(games)
+    return view
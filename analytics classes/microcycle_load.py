@@ -0,0 +1,136 @@
+import argparse
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cleandata classes'))
+from datasets import add_filter_arguments
+from gps_store import load_gps_store
+from instrumentation import count_rows, run_main, step
+from paths import DATA_DIR, data_path
+from star import STAR_DIR, load_matches
+
+LOAD_METRICS = ['Trimp', 'PSEXMIN', 'Disttotalm', 'Distaltaintensidadem', 'DES', 'ACE', 'MinutosTotais']
+VENUES = {'Em casa': 'Home', 'Visitante': 'Away'}
+
+def md_label(days):
+    # 0 -> 'MD', 3 -> 'MD-3'
+    days = np.asarray(days, dtype=int)
+    return np.where(days == 0, 'MD', np.char.add('MD-', days.astype(str)))
+
+def load_sessions(path=data_path('GPS_with_matches.parquet'), season=None, competition=None, team=None):
+    columns = ['ATLETA', 'Posicao', 'DATA', 'days_until_match'] + LOAD_METRICS
+    df = load_gps_store(path, columns=columns, season=season, competition=competition, club=team)
+    df = df[df['ATLETA'].notna() & df['days_until_match'].notna()]
+    df[LOAD_METRICS] = df[LOAD_METRICS].astype('float64')
+    return df
+
+def match_table(df, star_dir=STAR_DIR):
+    # One row per match day seen in the GPS data (from the match dimension),
+    # with its result, venue and the number of days since the previous match
+    # (the microcycle length)
+    matches = load_matches(star_dir)
+    matches = matches[matches['DATA'].isin(df['DATA'].unique())]
+    matches = pd.DataFrame({
+        'Match_Date': matches['DATA'].to_numpy(),
+        'Opponent': matches['Oponente'].astype(str).to_numpy(),
+        'Venue': matches['Local'].astype(str).map(VENUES).to_numpy(),
+        'Goals_For': matches['GP'].astype('float64').to_numpy(),
+        'Goals_Against': matches['GC'].astype('float64').to_numpy(),
+    })
+    matches['Result'] = np.select([matches['Goals_For'] > matches['Goals_Against'],
+                                   matches['Goals_For'] < matches['Goals_Against']], ['W', 'L'], 'D')
+    matches.loc[matches['Goals_For'].isna() | matches['Goals_Against'].isna(), 'Result'] = None
+    matches['Points'] = matches['Result'].map({'W': 3, 'D': 1, 'L': 0})
+    matches['Microcycle'] = matches['Match_Date'].diff().dt.days
+    return matches
+
+def assign_microcycles(df, matches):
+    # Every session belongs to the microcycle ending on the match it prepares:
+    # its own date plus days_until_match. Sessions after the last match have
+    # their blank days_until_match cleaned to 0, which points at no match;
+    # only sessions whose Match_Date is in matches are kept.
+    df = df.copy()
+    df['Days_To_Match'] = df['days_until_match'].astype(int)
+    df['Match_Date'] = df['DATA'] + pd.to_timedelta(df['Days_To_Match'], unit='D')
+    df = df[df['Match_Date'].isin(matches['Match_Date'])]
+    df['MD'] = md_label(df['Days_To_Match'])
+    return df
+
+def athlete_microcycle_load(sessions):
+    # Load per athlete per day-to-match of every microcycle
+    load = sessions.groupby(['Match_Date', 'ATLETA', 'Days_To_Match'], observed=True)[LOAD_METRICS].sum()
+    load['Sessions'] = sessions.groupby(['Match_Date', 'ATLETA', 'Days_To_Match'], observed=True).size()
+    load = load.reset_index()
+    load['ATLETA'] = load['ATLETA'].astype(str)
+    load['MD'] = md_label(load['Days_To_Match'])
+    return load
+
+def squad_microcycle_load(athlete_load):
+    # Squad average and total per day-to-match of every microcycle
+    grouped = athlete_load.groupby(['Match_Date', 'Days_To_Match', 'MD'])
+    squad = grouped[LOAD_METRICS].mean().add_suffix('_Mean')
+    squad = squad.join(grouped[LOAD_METRICS].sum().add_suffix('_Total'))
+    squad['Athletes'] = grouped.size()
+    return squad.reset_index()
+
+def microcycle_shape(squad_load, matches, metric='Trimp'):
+    # One row per match: squad mean load on each day before it, next to the
+    # match outcome, venue and microcycle length
+    shape = squad_load.pivot_table(index='Match_Date', columns='Days_To_Match',
+                                   values=f'{metric}_Mean', aggfunc='sum')
+    shape = shape.reindex(columns=sorted(shape.columns, reverse=True))
+    shape.columns = md_label(shape.columns)
+    shape[f'{metric}_Microcycle_Total'] = shape.sum(axis=1, min_count=1)
+    return matches.merge(shape.reset_index(), on='Match_Date', how='left')
+
+def analyze_microcycle_load(input_path=data_path('GPS_with_matches.parquet'), output_dir=DATA_DIR,
+                            season=None, competition=None, team=None):
+    try:
+        print("Reading GPS sessions...")
+        with step('read'):
+            df = load_sessions(input_path, season, competition, team)
+        count_rows(rows_in=len(df))
+        if df.empty:
+            print("No GPS sessions match the selected season/competition/team")
+            return
+
+        print("Assigning sessions to microcycles...")
+        with step('transform'):
+            matches = match_table(df)
+            sessions = assign_microcycles(df, matches)
+        if len(sessions) < len(df):
+            print(f"Left out {len(df) - len(sessions)} session(s) not followed by a match")
+
+        with step('aggregate'):
+            athlete_load = athlete_microcycle_load(sessions)
+            athlete_load = athlete_load.merge(matches, on='Match_Date', how='left')
+            squad_load = squad_microcycle_load(athlete_load).merge(matches, on='Match_Date', how='left')
+            shape = microcycle_shape(squad_load, matches)
+
+        with step('write'):
+            athlete_load.to_parquet(os.path.join(output_dir, 'microcycle_load_athletes.parquet'), index=False)
+            squad_load.to_csv(os.path.join(output_dir, 'microcycle_load_squad.csv'), index=False)
+            shape.to_csv(os.path.join(output_dir, 'microcycle_load_shape.csv'), index=False)
+        count_rows(rows_out=len(athlete_load))
+
+        # Squad load on each day before the match, by result
+        by_result = squad_load[squad_load['Days_To_Match'] <= 5].pivot_table(
+            index='Result', columns='MD', values='Trimp_Mean', aggfunc='mean')
+        print("\nAverage squad Trimp by day to match and result:")
+        print(by_result.round(1).to_string())
+
+        print(f"\nMicrocycles: {len(matches)}")
+        print(f"Athlete-day rows: {len(athlete_load)}")
+        print("Microcycle load saved to microcycle_load_athletes.parquet, "
+              "microcycle_load_squad.csv and microcycle_load_shape.csv")
+
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        raise
+
+if __name__ == "__main__":
+    parser = add_filter_arguments(argparse.ArgumentParser(description="Training load by microcycle and day to match"))
+    args = parser.parse_args()
+    run_main('microcycle_load', analyze_microcycle_load, season=args.season, competition=args.competition, team=args.team)
@@ -0,0 +1,191 @@
+import argparse
+import os
+import sys
+import numpy as np
+import pandas as pd
+from charts import GRAPHICS_DIR, chart, render_charts
+from player_report import METRICS
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cleandata classes'))
+from datasets import add_filter_arguments
+from gps_store import load_gps_store
+from instrumentation import count_rows, run_main, step
+from paths import DATA_DIR, data_path
+
+# Player profiles: one row per athlete (or athlete-season) of standardized
+# load features, clustered with k-means, projected with PCA and matched to
+# the most similar teammate of the same position. Every step works on the
+# whole float32 matrix at once.
+SPLITS = ['All', 'Home', 'Away', 'MD-1', 'MD-3']
+VENUES = {'Em casa': 'Home', 'Visitante': 'Away'}
+MIN_SESSIONS = 20
+DEFAULT_CLUSTERS = 4
+
+def split_labels(df):
+    # The feature splits every session counts in, as a long (row, split) table:
+    # all sessions, home/away match days and the sessions one and three days
+    # before a match
+    days = df['days_until_match'].to_numpy()
+    venue = df['Local'].astype(object).map(VENUES).to_numpy()
+    rows = np.arange(len(df))
+    match_day = (days == 0) & pd.notna(venue)
+    return pd.DataFrame({
+        'row': np.concatenate([rows, rows[match_day], rows[days == 1], rows[days == 3]]),
+        'split': np.concatenate([np.full(len(df), 'All', dtype=object), venue[match_day],
+                                 np.full((days == 1).sum(), 'MD-1', dtype=object),
+                                 np.full((days == 3).sum(), 'MD-3', dtype=object)]),
+    })
+
+def feature_matrix(df, by_season=False, metrics=METRICS, min_sessions=MIN_SESSIONS):
+    # (X, profiles, features): X is the standardized float32 matrix, one row per
+    # entry of profiles (ATLETA[, Season], Posicao, Sessions), one column per
+    # metric x split mean. Missing splits are imputed with the column mean (0
+    # once standardized).
+    keys = ['ATLETA', 'Season'] if by_season else ['ATLETA']
+    df = df.assign(ATLETA=df['ATLETA'].astype(str), Season=df['DATA'].dt.year).reset_index(drop=True)
+    sessions = df.groupby(keys).size().rename('Sessions')
+    sessions = sessions[sessions >= min_sessions]
+    df = df[df.set_index(keys).index.isin(sessions.index)].reset_index(drop=True)
+
+    labels = split_labels(df)
+    long = df.loc[labels['row'], keys + list(metrics)].reset_index(drop=True)
+    long['split'] = labels['split'].to_numpy()
+    means = long.groupby(keys + ['split'])[list(metrics)].mean().unstack('split')
+    features = pd.MultiIndex.from_product([metrics, SPLITS])
+    means = means.reindex(index=sessions.index, columns=features)
+
+    values = means.to_numpy(dtype=np.float64)
+    center = np.nanmean(values, axis=0)
+    scale = np.nanstd(values, axis=0)
+    X = np.nan_to_num((values - center) / np.where(scale > 0, scale, 1)).astype(np.float32)
+
+    # Position: the one the athlete played most sessions in
+    position = (df.groupby(keys + ['Posicao'], observed=True).size().sort_values(ascending=False)
+                .reset_index().drop_duplicates(keys).set_index(keys)['Posicao'].astype(object))
+    profiles = sessions.to_frame().join(position.rename('Posicao')).reset_index()
+    profiles = profiles[keys + ['Posicao', 'Sessions']]
+    return X, profiles, [f'{metric}_{split}' for metric, split in features]
+
+def squared_distances(X, Y):
+    # (len(X), len(Y)) squared Euclidean distances from the Gram matrix
+    # (Y may be batched: (runs, k, d) gives (runs, len(X), k))
+    x2 = np.einsum('nd,nd->n', X, X)
+    y2 = np.einsum('...kd,...kd->...k', Y, Y)
+    cross = np.einsum('nd,...kd->...nk', X, Y)
+    return np.maximum(x2[:, None] - 2 * cross + y2[..., None, :], 0)
+
+def kmeans(X, k=DEFAULT_CLUSTERS, runs=10, iterations=100, seed=0):
+    # Lloyd's k-means, all runs (different random starting centers) advanced
+    # together as one batch. Returns the labels, centers and inertia of the
+    # run with the lowest inertia.
+    rng = np.random.default_rng(seed)
+    n = len(X)
+    k = min(k, n)
+    starts = np.stack([rng.choice(n, k, replace=False) for _ in range(runs)])
+    centers = X[starts].astype(np.float64)
+    labels = np.full((runs, n), -1)
+    for _ in range(iterations):
+        new_labels = squared_distances(X, centers).argmin(axis=2)
+        if (new_labels == labels).all():
+            break
+        labels = new_labels
+        members = (labels[..., None] == np.arange(k)).astype(np.float64)
+        counts = members.sum(axis=1)
+        sums = np.einsum('rnk,nd->rkd', members, X)
+        centers = np.where(counts[..., None] > 0, sums / np.maximum(counts, 1)[..., None], centers)
+
+    inertia = np.take_along_axis(squared_distances(X, centers), labels[..., None], axis=2)[..., 0].sum(axis=1)
+    best = inertia.argmin()
+    return labels[best], centers[best], inertia[best]
+
+def pca(X, components=2):
+    # Scores on the first principal components and their share of the variance
+    centered = X - X.mean(axis=0)
+    u, s, _ = np.linalg.svd(centered, full_matrices=False)
+    explained = s ** 2 / max((s ** 2).sum(), np.finfo(float).tiny)
+    return u[:, :components] * s[:components], explained[:components]
+
+def nearest_neighbours(X, groups=None):
+    # Index of every row's nearest other row (only within its group when
+    # groups is given) and the distance to it; -1 and NaN when there is none
+    distances = squared_distances(X, X[None])[0]
+    np.fill_diagonal(distances, np.inf)
+    if groups is not None:
+        groups = np.asarray(groups, dtype=object)
+        same = (groups[:, None] == groups[None, :]) & pd.notna(groups)[:, None]
+        distances[~same] = np.inf
+    nearest = distances.argmin(axis=1)
+    best = distances[np.arange(len(X)), nearest]
+    found = np.isfinite(best)
+    return np.where(found, nearest, -1), np.where(found, np.sqrt(best), np.nan)
+
+def draw_profiles(profiles, explained):
+    import matplotlib.pyplot as plt
+
+    for cluster, group in profiles.groupby('Cluster'):
+        plt.scatter(group['PC1'], group['PC2'], label=f'Cluster {cluster}', s=60)
+    for _, row in profiles.iterrows():
+        plt.annotate(row['Label'], (row['PC1'], row['PC2']), fontsize=7, alpha=0.8)
+    plt.xlabel(f'PC1 ({explained[0]:.0%} of variance)')
+    plt.ylabel(f'PC2 ({explained[1]:.0%} of variance)')
+    plt.title('Player Load Profiles (k-means clusters on standardized features)')
+    plt.legend()
+    plt.grid(True, alpha=0.3)
+
+def build_player_profiles(input_path=data_path('GPS_with_matches.parquet'), output_dir=DATA_DIR,
+                          clusters=DEFAULT_CLUSTERS, by_season=False, plots=True,
+                          season=None, competition=None, team=None):
+    try:
+        print("Reading data...")
+        with step('read'):
+            df = load_gps_store(input_path, columns=['ATLETA', 'Posicao', 'DATA', 'days_until_match', 'Local'] + METRICS,
+                                season=season, competition=competition, club=team)
+            df = df[df['ATLETA'].notna()]
+        count_rows(rows_in=len(df))
+
+        print("Building the feature matrix...")
+        with step('transform'):
+            X, profiles, features = feature_matrix(df, by_season)
+        if len(profiles) < 2:
+            print(f"Not enough athletes with {MIN_SESSIONS} sessions to profile")
+            return
+        print(f"{X.shape[0]} profiles x {X.shape[1]} features")
+
+        with step('aggregate'):
+            labels, _, inertia = kmeans(X, clusters)
+            scores, explained = pca(X)
+            nearest, distance = nearest_neighbours(X, profiles['Posicao'])
+
+        profiles['Cluster'] = labels
+        profiles['PC1'] = scores[:, 0]
+        profiles['PC2'] = scores[:, 1]
+        label = profiles['ATLETA'] + ((' ' + profiles['Season'].astype(str)) if by_season else '')
+        profiles['Most_Similar_Teammate'] = np.where(nearest >= 0, label.to_numpy()[nearest], None)
+        profiles['Similarity_Distance'] = distance
+
+        output_path = os.path.join(output_dir, 'player_profiles.csv')
+        with step('write'):
+            profiles.to_csv(output_path, index=False)
+        count_rows(rows_out=len(profiles))
+
+        print(f"\nk-means with {clusters} clusters (inertia {inertia:.1f}); "
+              f"PC1 and PC2 explain {explained.sum():.0%} of the variance")
+        print(profiles.sort_values(['Cluster', 'Posicao']).round(2).to_string(index=False))
+        print(f"\nProfiles saved to {output_path}")
+
+        if plots:
+            render_charts([chart(os.path.join(GRAPHICS_DIR, 'player_profiles_clusters.png'), draw_profiles,
+                                 {'profiles': profiles[['PC1', 'PC2', 'Cluster']].assign(Label=label)},
+                                 figsize=(14, 10), explained=list(explained))])
+
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        raise
+
+if __name__ == "__main__":
+    parser = add_filter_arguments(argparse.ArgumentParser(description="Player load profiles and clusters"))
+    parser.add_argument('--clusters', type=int, default=DEFAULT_CLUSTERS, help="number of k-means clusters")
+    parser.add_argument('--by-season', action='store_true', help="one profile per athlete and season")
+    args = parser.parse_args()
+    run_main('player_profiles', build_player_profiles, clusters=args.clusters, by_season=args.by_season,
+             season=args.season, competition=args.competition, team=args.team)
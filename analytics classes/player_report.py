@@ -0,0 +1,272 @@
+import argparse
+import json
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cleandata classes'))
+from datasets import add_filter_arguments
+from gps_store import load_gps_store
+from instrumentation import count_rows, run_main, step
+from paths import DATA_DIR, data_path
+from charts import GRAPHICS_DIR, chart, render_charts
+
+METRICS = ['Disttotalm', 'Distaltaintensidadem', 'MinutosTotais', 'DES', 'ACE', 'Trimp', 'PSEXMIN']
+VENUES = {'Em casa': 'Home', 'Visitante': 'Away'}
+
+def load_match_days(path=data_path('GPS_with_matches.parquet'), season=None, competition=None, team=None):
+    # Every athlete's rows on match days, in date order
+    df = load_gps_store(path, columns=['ATLETA', 'Posicao', 'DATA', 'Local', 'Coach'] + METRICS,
+                        season=season, competition=competition, club=team)
+    df = df[df['Local'].notna()].sort_values('DATA', kind='stable')
+    df['ATLETA'] = df['ATLETA'].astype(str)
+    df['Venue'] = df['Local'].astype(str).map(VENUES)
+    return df
+
+def percent_change(diff, base):
+    # Relative change, reported as 0% when there is nothing to compare with
+    base = np.asarray(base, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(base != 0, np.asarray(diff, dtype=float) / base * 100, 0.0)
+
+def build_player_stats(df):
+    # Every athlete x metric x (overall, venue, coach) statistic, each table
+    # coming from a single grouped aggregation over the match-day rows
+    by_player = df.groupby('ATLETA', sort=True)
+    overall = by_player[METRICS].agg(['mean', 'std'])
+
+    counts = df.pivot_table(index='ATLETA', columns='Venue', values='DATA', aggfunc='size',
+                            fill_value=0).reindex(columns=['Home', 'Away'], fill_value=0)
+    counts['Total'] = by_player.size()
+
+    venue = df.groupby(['ATLETA', 'Venue'])[METRICS].mean().unstack('Venue')
+    venue = venue.reindex(columns=pd.MultiIndex.from_product([METRICS, ['Home', 'Away']]))
+
+    first = df.drop_duplicates('ATLETA', keep='first').set_index('ATLETA')
+    last = df.drop_duplicates('ATLETA', keep='last').set_index('ATLETA')
+
+    # Coaches listed in the order they took over
+    coach_order = df.groupby('Coach', observed=True)['DATA'].min().sort_values()
+    by_coach = df.groupby(['ATLETA', 'Coach'], observed=True)
+    coach = by_coach[METRICS].agg(['mean', 'std'])
+    coach.columns = [f"{metric}_{stat}" for metric, stat in coach.columns]
+    coach['Games'] = by_coach.size()
+    coach = coach.reset_index()
+    coach['Coach'] = coach['Coach'].astype(str)
+    coach['Order'] = coach['Coach'].map(coach_order.rename(index=str).rank())
+    coach = coach.sort_values(['ATLETA', 'Order'])
+
+    return {
+        'overall': overall,
+        'counts': counts,
+        'venue': venue,
+        'position': first['Posicao'].astype(object),
+        'first': first[METRICS],
+        'last': last[METRICS],
+        'coach': coach,
+    }
+
+def build_team_stats(df):
+    venue = df.groupby('Venue')[METRICS].mean().reindex(['Home', 'Away'])
+    position = df.groupby('Posicao', observed=True)[METRICS].mean()
+    position.index = position.index.astype(str)
+    position.index.name = 'Posicao'
+    return {
+        'venue': venue,
+        'position': position,
+        'minutes': df['MinutosTotais'].mean(),
+    }
+
+def render_venue_block(lines, home, away):
+    diff = home - away
+    pct = percent_change(diff, away)
+    for i, metric in enumerate(METRICS):
+        lines.append(f"{metric}:")
+        lines.append(f"  Home: {home[i]:.2f}")
+        lines.append(f"  Away: {away[i]:.2f}")
+        lines.append(f"  Difference: {diff[i]:.2f} ({pct[i]:+.1f}%)")
+
+def render_report(stats, team):
+    lines = ["PLAYER PERFORMANCE ANALYSIS REPORT", "=" * 80, ""]
+    coach_groups = dict(tuple(stats['coach'].groupby('ATLETA', sort=False)))
+
+    for player in stats['overall'].index:
+        counts = stats['counts'].loc[player]
+        lines += [f"Player: {player}", "-" * 40,
+                  f"Position: {stats['position'][player]}",
+                  f"Total Games: {counts['Total']}",
+                  f"Home Games: {counts['Home']}",
+                  f"Away Games: {counts['Away']}",
+                  "", "Overall Performance (Mean ± Std):"]
+        overall = stats['overall'].loc[player]
+        for metric in METRICS:
+            lines.append(f"{metric}: {overall[(metric, 'mean')]:.2f} ± {overall[(metric, 'std')]:.2f}")
+
+        lines += ["", "Home vs Away Performance:"]
+        venue = stats['venue'].loc[player]
+        render_venue_block(lines,
+                           venue[[(m, 'Home') for m in METRICS]].to_numpy(),
+                           venue[[(m, 'Away') for m in METRICS]].to_numpy())
+
+        lines += ["", "Performance Under Different Coaches:"]
+        for _, row in coach_groups.get(player, pd.DataFrame()).iterrows():
+            lines += ["", f"Coach: {row['Coach']} ({row['Games']} games)"]
+            for metric in METRICS:
+                lines.append(f"{metric}: {row[f'{metric}_mean']:.2f} ± {row[f'{metric}_std']:.2f}")
+
+        lines += ["", "Performance Trends:"]
+        first = stats['first'].loc[player].to_numpy()
+        last = stats['last'].loc[player].to_numpy()
+        diff = last - first
+        pct = percent_change(diff, first)
+        for i, metric in enumerate(METRICS):
+            lines.append(f"{metric}: {diff[i]:+.2f} ({pct[i]:+.1f}%)")
+        lines += ["", "=" * 80, ""]
+
+    lines += ["", "TEAM OVERALL STATISTICS", "=" * 80, "", "Team Home vs Away Performance:"]
+    render_venue_block(lines, team['venue'].loc['Home'].to_numpy(), team['venue'].loc['Away'].to_numpy())
+    lines += ["", "Average Performance by Position:", team['position'].to_string(),
+              f"Average minutes played in match days: {team['minutes']:.2f} minutes",
+              "", "Average minutes played by position in match days:"]
+    for position, minutes in team['position']['MinutosTotais'].sort_values(ascending=False).items():
+        lines.append(f"{position}: {minutes:.2f} minutes")
+    return "\n".join(lines) + "\n"
+
+def report_to_json(stats, team):
+    # Machine-readable twin of the text report
+    def clean(value):
+        return None if pd.isna(value) else float(value)
+
+    players = {}
+    for player in stats['overall'].index:
+        overall = stats['overall'].loc[player]
+        venue = stats['venue'].loc[player]
+        counts = stats['counts'].loc[player]
+        coaches = stats['coach'][stats['coach']['ATLETA'] == player]
+        position = stats['position'][player]
+        players[player] = {
+            'position': None if pd.isna(position) else position,
+            'games': {'total': int(counts['Total']), 'home': int(counts['Home']), 'away': int(counts['Away'])},
+            'metrics': {
+                metric: {
+                    'mean': clean(overall[(metric, 'mean')]),
+                    'std': clean(overall[(metric, 'std')]),
+                    'home': clean(venue[(metric, 'Home')]),
+                    'away': clean(venue[(metric, 'Away')]),
+                    'first': clean(stats['first'].loc[player, metric]),
+                    'last': clean(stats['last'].loc[player, metric]),
+                } for metric in METRICS
+            },
+            'coaches': {
+                row['Coach']: {
+                    'games': int(row['Games']),
+                    **{metric: {'mean': clean(row[f'{metric}_mean']), 'std': clean(row[f'{metric}_std'])}
+                       for metric in METRICS}
+                } for _, row in coaches.iterrows()
+            },
+        }
+    return {
+        'players': players,
+        'team': {
+            'venue': {venue: {m: clean(v) for m, v in row.items()} for venue, row in team['venue'].iterrows()},
+            'position': {pos: {m: clean(v) for m, v in row.items()} for pos, row in team['position'].iterrows()},
+            'minutes': clean(team['minutes']),
+        },
+    }
+
+def draw_player_figure(player, load):
+    import matplotlib.pyplot as plt
+
+    x = np.arange(len(METRICS))
+    plt.bar(x - 0.2, load['Home'], 0.4, label='Home', color='blue')
+    plt.bar(x + 0.2, load['Away'], 0.4, label='Away', color='red')
+    plt.xticks(x, METRICS, rotation=45)
+    plt.yscale('symlog')
+    plt.title(f'{player}: Home vs Away Match-Day Load')
+    plt.legend()
+    plt.grid(True, alpha=0.3)
+
+def draw_squad_figure(distance, top_players, venue_difference):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    # 1. Distribution of total distance
+    plt.subplot(2, 2, 1)
+    sns.boxplot(data=distance, y='Disttotalm')
+    plt.title('Distribution of Total Distance')
+
+    # 2. Total distance at home and away
+    plt.subplot(2, 2, 2)
+    sns.boxplot(data=distance.rename(columns={'Venue': 'Location', 'Disttotalm': 'Distance'}),
+                x='Location', y='Distance', order=['Home', 'Away'])
+    plt.title('Total Distance: Home vs Away')
+
+    # 3. Heatmap of the ten players covering the most distance
+    plt.subplot(2, 2, 3)
+    sns.heatmap(top_players, annot=True, fmt='.0f', cmap='YlOrRd')
+    plt.title('Performance Heatmap for Top 10 Players')
+
+    # 4. Average home - away difference per metric
+    plt.subplot(2, 2, 4)
+    venue_difference.plot(kind='bar')
+    plt.xticks(rotation=45)
+    plt.title('Average Performance Differences (Home - Away)')
+
+def player_chart_specs(df, stats, output_dir):
+    # Squad overview plus one home/away chart per athlete
+    means = stats['overall'].xs('mean', axis=1, level=1)
+    top_players = means.nlargest(10, 'Disttotalm')
+    top_players.index.name = 'ATLETA'
+    venue = stats['venue']
+    venue_difference = pd.Series({m: (venue[(m, 'Home')] - venue[(m, 'Away')]).mean() for m in METRICS})
+
+    specs = [chart(os.path.join(output_dir, 'player_profiles_analysis.png'), draw_squad_figure,
+                   {'distance': df[['Disttotalm', 'Venue']].reset_index(drop=True),
+                    'top_players': top_players, 'venue_difference': venue_difference},
+                   figsize=(20, 15), bbox_inches='tight')]
+    for player in venue.index:
+        load = pd.DataFrame({'Home': venue.loc[player, [(m, 'Home') for m in METRICS]].to_numpy(),
+                             'Away': venue.loc[player, [(m, 'Away') for m in METRICS]].to_numpy()},
+                            index=METRICS)
+        specs.append(chart(os.path.join(output_dir, 'players', f"{player}.png"), draw_player_figure,
+                           {'load': load}, figsize=(10, 5), player=player))
+    return specs
+
+def generate_player_report(input_path=data_path('GPS_with_matches.parquet'), output_dir=DATA_DIR,
+                           figures_dir=GRAPHICS_DIR, plots=True, workers=None,
+                           season=None, competition=None, team=None):
+    try:
+        print("Reading data...")
+        with step('read'):
+            df = load_match_days(input_path, season, competition, team)
+        count_rows(rows_in=len(df))
+
+        print("Computing player statistics...")
+        with step('aggregate'):
+            stats = build_player_stats(df)
+            team_stats = build_team_stats(df)
+
+        report_path = os.path.join(output_dir, 'player_performance_report.txt')
+        json_path = os.path.join(output_dir, 'player_performance_report.json')
+        with step('write'):
+            with open(report_path, 'w') as f:
+                f.write(render_report(stats, team_stats))
+            with open(json_path, 'w') as f:
+                json.dump(report_to_json(stats, team_stats), f, indent=2, ensure_ascii=False)
+        count_rows(rows_out=len(stats['overall']))
+        print(f"Report saved to {report_path} and {json_path}")
+
+        if plots:
+            written = render_charts(player_chart_specs(df, stats, figures_dir), workers=workers)
+            print(f"{len(written)} charts rendered in {figures_dir}")
+
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        raise
+
+if __name__ == "__main__":
+    parser = add_filter_arguments(argparse.ArgumentParser(description="Player performance report"))
+    args = parser.parse_args()
+    run_main('player_report', generate_player_report,
+             season=args.season, competition=args.competition, team=args.team)
@@ -0,0 +1,278 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+import numpy as np
+import pandas as pd
+from fixtures import load_fixtures, team_matches
+from load_cube import CUBE_PATH, DIMENSIONS, load_cube, slice_stats
+from match_days import CACHE_DIR, match_day_view, match_totals, source_files, summarize
+from player_report import METRICS, load_match_days
+from session_index import SessionIndex
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cleandata classes'))
+from datasets import FIXTURES_DATASET
+from gps_store import DEFAULT_STORE, load_gps_store
+from instrumentation import run_main
+
+# Local HTTP service answering the match, microcycle, player, session and
+# load cube queries from a Snapshot of the stores kept in memory. Every request is a
+# GET with the filters as query parameters and gets a JSON reply. The
+# stores are checked every refresh seconds; when they change a new Snapshot
+# is built in a worker thread and swapped in whole, so a query always sees
+# one consistent version of the data, and the answers cached on it never
+# go stale.
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_REFRESH = 30
+DEFAULT_TEAM = 'América (MG)'
+VENUES = {'home': 'Em casa', 'away': 'Visitante'}
+# Filtered answers kept per snapshot before the oldest are dropped
+MAX_CACHED = 1000
+# Longest gap between matches counted as a microcycle (leaves out the World Cup break)
+MAX_MICROCYCLE = 10
+
+def data_signature(gps_path=DEFAULT_STORE, fixtures_path=FIXTURES_DATASET, cube_path=CUBE_PATH):
+    # mtime/size of every file the snapshot is read from
+    fixture_files = sorted(os.path.join(folder, name) for folder, _, names in os.walk(fixtures_path)
+                           for name in names if name.endswith('.parquet'))
+    files = source_files(gps_path) + fixture_files + [cube_path]
+    return tuple((f, os.stat(f).st_mtime_ns, os.stat(f).st_size) for f in files if os.path.exists(f))
+
+class Snapshot:
+    # Everything the queries are answered from, loaded once: the match days,
+    # every team's matches with their microcycle, the athletes' match-day
+    # rows, the per-athlete session index and the load cube (load_cube.py)
+    def __init__(self, gps_path=DEFAULT_STORE, fixtures_path=FIXTURES_DATASET, cube_path=CUBE_PATH,
+                 cache_dir=CACHE_DIR):
+        self.signature = data_signature(gps_path, fixtures_path, cube_path)
+        self.loaded_at = pd.Timestamp.now().isoformat(timespec='seconds')
+        self.games = match_day_view(gps_path, cache_dir=cache_dir).games
+        self.players = load_match_days(gps_path)
+        self.index = SessionIndex(load_gps_store(gps_path, columns=['ATLETA', 'Posicao', 'DATA'] + METRICS))
+        self.cube = load_cube(cube_path)
+
+        matches = team_matches(load_fixtures(dataset=fixtures_path))
+        matches['Team'] = matches['Team'].astype(str)
+        matches = matches.sort_values(['Team', 'Data'], kind='stable')
+        next_match = matches.groupby('Team')['Data'].shift(-1)
+        matches['Microcycle'] = (next_match - matches['Data']).dt.days
+        self.matches = matches.reset_index(drop=True)
+
+        # Answers already computed from this snapshot, per query and parameters;
+        # the unfiltered ones are computed up front (the load one only once
+        # there is a cube). Queries run in worker threads, so the cache is
+        # only changed under the lock.
+        self.results = {}
+        self.lock = threading.Lock()
+        for path in QUERIES:
+            if path != '/load' or self.cube is not None:
+                self.answer(path, {})
+
+    def answer(self, path, params):
+        key = (path, tuple(sorted(params.items())))
+        with self.lock:
+            if key in self.results:
+                return self.results[key]
+        table = QUERIES[path](self, params)
+        rows = json.loads(table.reset_index().to_json(orient='records', date_format='iso')) if len(table) else []
+        with self.lock:
+            if len(self.results) >= MAX_CACHED:
+                self.results.pop(next(iter(self.results)))
+            self.results[key] = rows
+        return rows
+
+def between(dates, params):
+    # Rows whose date is within the start/end parameters (both inclusive)
+    mask = np.ones(len(dates), dtype=bool)
+    if 'start' in params:
+        mask &= (dates >= pd.Timestamp(params['start'])).to_numpy()
+    if 'end' in params:
+        mask &= (dates <= pd.Timestamp(params['end'])).to_numpy()
+    return mask
+
+def venue_value(params):
+    venue = params['venue'].lower()
+    if venue not in VENUES:
+        raise ValueError(f"venue must be one of: {', '.join(VENUES)}")
+    return VENUES[venue]
+
+def filter_games(games, params):
+    mask = between(games['DATA'], params)
+    if 'venue' in params:
+        mask &= (games['Local'].astype(object) == venue_value(params)).to_numpy()
+    if 'coach' in params:
+        mask &= (games['Coach'].astype(object) == params['coach']).to_numpy()
+    return games[mask]
+
+def query_venue(snapshot, params):
+    # Home vs away results (analyze_location), optionally for one coach
+    games = filter_games(snapshot.games, params).dropna(subset=['Local'])
+    return summarize(match_totals(games, ['Local'])) if len(games) else pd.DataFrame()
+
+def query_coaches(snapshot, params):
+    # Results per coach (analyze_coach_performance), optionally home or away only
+    games = filter_games(snapshot.games, params).dropna(subset=['Coach'])
+    return summarize(match_totals(games, ['Coach'])) if len(games) else pd.DataFrame()
+
+def query_microcycles(snapshot, params):
+    # A team's results by days until its next match (analyze_microcycles)
+    matches = snapshot.matches
+    mask = (matches['Team'] == params.get('team', DEFAULT_TEAM)).to_numpy() & between(matches['Data'], params)
+    if 'venue' in params:
+        mask &= (matches['Is_Home'] == (venue_value(params) == VENUES['home'])).to_numpy()
+    matches = matches[mask & (matches['Microcycle'] < MAX_MICROCYCLE).to_numpy()]
+    grouped = matches.assign(Wins=matches['Result'] == 'W', Draws=matches['Result'] == 'D',
+                             Losses=matches['Result'] == 'L').groupby('Microcycle')
+    table = grouped.agg(Total_Matches=('Data', 'size'), Wins=('Wins', 'sum'), Draws=('Draws', 'sum'),
+                        Losses=('Losses', 'sum'), Goals_For=('Goals_For', 'sum'),
+                        Goals_Against=('Goals_Against', 'sum'))
+    table['Win_Rate'] = table['Wins'] / table['Total_Matches'] * 100
+    table['Points_Per_Match'] = (table['Wins'] * 3 + table['Draws']) / table['Total_Matches']
+    table['Goal_Difference'] = table['Goals_For'] - table['Goals_Against']
+    return table
+
+def query_players(snapshot, params):
+    # Mean and std of every load metric on match days per athlete (player_report)
+    players = snapshot.players
+    mask = between(players['DATA'], params)
+    if 'athlete' in params:
+        mask &= players['ATLETA'].isin(params['athlete'].split(',')).to_numpy()
+    if 'venue' in params:
+        mask &= (players['Local'].astype(object) == venue_value(params)).to_numpy()
+    if 'coach' in params:
+        mask &= (players['Coach'].astype(object) == params['coach']).to_numpy()
+    grouped = players[mask].groupby('ATLETA', sort=True)
+    table = grouped[METRICS].agg(['mean', 'std'])
+    table.columns = [f'{metric}_{stat}' for metric, stat in table.columns]
+    table.insert(0, 'Games', grouped.size())
+    return table
+
+def query_sessions(snapshot, params):
+    # Sessions and summed load per athlete between start and end (session_index)
+    index = snapshot.index
+    athletes = params['athlete'].split(',') if 'athlete' in params else list(index.athletes)
+    return index.window_totals(METRICS, athletes, params.get('start'), params.get('end')).set_index('ATLETA')
+
+def query_load(snapshot, params):
+    # Count, mean and std of the load per by dimensions (comma separated),
+    # merged from the load cube; days is the days until the next match
+    if snapshot.cube is None:
+        raise KeyError("No load cube; run load_cube.py first")
+    by = params['by'].split(',') if params.get('by') else []
+    unknown = [col for col in by if col not in DIMENSIONS]
+    if unknown:
+        raise ValueError(f"by must be among: {', '.join(DIMENSIONS)}")
+    where = {}
+    if 'athlete' in params:
+        where['ATLETA'] = params['athlete'].split(',')
+    if 'venue' in params:
+        where['Local'] = venue_value(params)
+    if 'coach' in params:
+        where['Coach'] = params['coach']
+    if 'days' in params:
+        where['days_until_match'] = [float(day) for day in params['days'].split(',')]
+    table = slice_stats(snapshot.cube, by, METRICS, **where)
+    return table.set_index(by) if by else table
+
+QUERIES = {
+    '/venue': query_venue,
+    '/coaches': query_coaches,
+    '/microcycles': query_microcycles,
+    '/players': query_players,
+    '/sessions': query_sessions,
+    '/load': query_load,
+}
+
+class QueryServer:
+    def __init__(self, gps_path=DEFAULT_STORE, fixtures_path=FIXTURES_DATASET, refresh=DEFAULT_REFRESH,
+                 cube_path=CUBE_PATH, cache_dir=CACHE_DIR):
+        self.paths = (gps_path, fixtures_path, cube_path)
+        self.cache_dir = cache_dir
+        self.refresh = refresh
+        print("Loading data...")
+        self.snapshot = Snapshot(*self.paths, cache_dir)
+
+    def respond(self, method, path, params):
+        # (status, payload) of one request
+        if method != 'GET':
+            return 405, {'error': f"{method} not supported"}
+        snapshot = self.snapshot
+        if path == '/':
+            return 200, {'loaded_at': snapshot.loaded_at, 'queries': sorted(QUERIES),
+                         'params': ['start', 'end', 'venue', 'coach', 'team', 'athlete', 'by', 'days']}
+        if path not in QUERIES:
+            return 404, {'error': f"Unknown query {path}"}
+        try:
+            started = time.perf_counter()
+            rows = snapshot.answer(path, params)
+            elapsed = (time.perf_counter() - started) * 1000
+        except KeyError as e:
+            return 404, {'error': str(e).strip("'\"")}
+        except ValueError as e:
+            return 400, {'error': str(e)}
+        return 200, {'query': path, 'params': params, 'loaded_at': snapshot.loaded_at,
+                     'elapsed_ms': round(elapsed, 2), 'rows': rows}
+
+    async def handle(self, reader, writer):
+        try:
+            request = (await reader.readline()).decode('latin-1').split()
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+            if len(request) < 2:
+                status, payload = 400, {'error': "Malformed request"}
+            else:
+                url = urlsplit(request[1])
+                params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                # Answered in a worker thread, so a slow uncached query does
+                # not hold up the other connections
+                status, payload = await asyncio.to_thread(self.respond, request[0], url.path.rstrip('/') or '/',
+                                                          params)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            status, payload = 500, {'error': str(e)}
+
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        writer.write(f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                     f"Content-Type: application/json; charset=utf-8\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode('latin-1') + body)
+        await writer.drain()
+        writer.close()
+
+    async def watch(self):
+        # Rebuild the snapshot off the event loop whenever the stores change
+        while True:
+            await asyncio.sleep(self.refresh)
+            try:
+                if data_signature(*self.paths) == self.snapshot.signature:
+                    continue
+                print("Data changed, reloading...")
+                self.snapshot = await asyncio.to_thread(Snapshot, *self.paths, self.cache_dir)
+                print(f"Reloaded at {self.snapshot.loaded_at}")
+            except Exception as e:
+                print(f"An error occurred: {e}")
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"Serving {', '.join(sorted(QUERIES))} on http://{host}:{port}")
+        async with server:
+            await asyncio.gather(server.serve_forever(), self.watch())
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, refresh=DEFAULT_REFRESH, input_path=DEFAULT_STORE):
+    try:
+        asyncio.run(QueryServer(input_path, refresh=refresh).serve(host, port))
+    except KeyboardInterrupt:
+        print("Server stopped")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local JSON query server over the GPS and fixtures data")
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f"address to listen on (default: {DEFAULT_HOST})")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"port (default: {DEFAULT_PORT})")
+    parser.add_argument('--refresh', type=float, default=DEFAULT_REFRESH,
+                        help=f"seconds between checks for changed data (default: {DEFAULT_REFRESH})")
+    args = parser.parse_args()
+    run_main('serve', serve, host=args.host, port=args.port, refresh=args.refresh)
@@ -0,0 +1,210 @@
+import argparse
+import json
+import os
+import sys
+import numpy as np
+import pandas as pd
+from fixtures import load_fixtures, team_matches, team_slug
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cleandata classes'))
+from datasets import write_atomically
+from instrumentation import count_rows, run_main, step
+from paths import data_path
+
+# Elo ratings over the fixtures history, in date order. Every played match
+# moves both teams by K x margin weight x (result - expected result), the
+# home side playing with HOME_ADVANTAGE extra points when the expectation is
+# computed. The ratings and the fixtures already rated are kept in
+# STATE_PATH and every rating change in HISTORY_PATH, so later runs only
+# rate the fixtures appended since. The state records the K and home
+# advantage it was rated with, and is rated again when they change.
+BASE_RATING = 1500.0
+K_FACTOR = 20.0
+HOME_ADVANTAGE = 60.0
+STATE_PATH = data_path('elo_state.json')
+HISTORY_PATH = data_path('elo_history.parquet')
+
+HISTORY_COLUMNS = ['Data', 'Season', 'Competition', 'Team', 'Opponent', 'Is_Home', 'Goals_For',
+                   'Goals_Against', 'Rating_Before', 'Opponent_Rating_Before', 'Expected', 'Rating_After']
+
+def margin_weight(margin):
+    # 1 for a draw or one-goal game, 1.5 for two goals, (11 + N) / 8 beyond
+    margin = np.abs(np.asarray(margin, dtype=float))
+    return np.select([margin <= 1, margin == 2], [1.0, 1.5], (11 + margin) / 8)
+
+def expected_home(home_rating, away_rating, home_advantage=HOME_ADVANTAGE):
+    return 1 / (1 + 10 ** ((away_rating - home_rating - home_advantage) / 400))
+
+def fixture_keys(fixtures):
+    # Identifies a fixture across runs: date, home team and away team
+    return (fixtures['Data'].dt.strftime('%Y-%m-%d') + '|' + fixtures['Em casa'].astype(str)
+            + '|' + fixtures['Visitante'].astype(str))
+
+def rate_fixtures(fixtures, ratings, k_factor=K_FACTOR, home_advantage=HOME_ADVANTAGE):
+    # Rate played fixtures in date order, updating ratings (team -> rating)
+    # in place. A team plays at most once a day, so each date is one
+    # vectorized update. Returns two history rows (home and away view) per fixture.
+    fixtures = fixtures.sort_values('Data', kind='stable')
+    frames = []
+    for date, day in fixtures.groupby('Data', sort=True):
+        home = day['Em casa'].astype(str).to_numpy()
+        away = day['Visitante'].astype(str).to_numpy()
+        home_before = np.array([ratings.get(team, BASE_RATING) for team in home])
+        away_before = np.array([ratings.get(team, BASE_RATING) for team in away])
+        home_goals = day['Home_Goals'].to_numpy(dtype=float)
+        away_goals = day['Away_Goals'].to_numpy(dtype=float)
+
+        expected = expected_home(home_before, away_before, home_advantage)
+        score = np.select([home_goals > away_goals, home_goals == away_goals], [1.0, 0.5], 0.0)
+        change = k_factor * margin_weight(home_goals - away_goals) * (score - expected)
+        ratings.update(zip(home, home_before + change))
+        ratings.update(zip(away, away_before - change))
+
+        common = {'Data': date, 'Season': day['Season'].to_numpy(), 'Competition': day['Competition'].to_numpy()}
+        frames.append(pd.DataFrame({**common, 'Team': home, 'Opponent': away, 'Is_Home': True,
+                                    'Goals_For': home_goals, 'Goals_Against': away_goals,
+                                    'Rating_Before': home_before, 'Opponent_Rating_Before': away_before,
+                                    'Expected': expected, 'Rating_After': home_before + change}))
+        frames.append(pd.DataFrame({**common, 'Team': away, 'Opponent': home, 'Is_Home': False,
+                                    'Goals_For': away_goals, 'Goals_Against': home_goals,
+                                    'Rating_Before': away_before, 'Opponent_Rating_Before': home_before,
+                                    'Expected': 1 - expected, 'Rating_After': away_before - change}))
+    if not frames:
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
+    return pd.concat(frames, ignore_index=True)[HISTORY_COLUMNS]
+
+def state_paths(season=None, competition=None):
+    # Ratings over a subset of the fixtures are kept apart from the full history
+    if season is None and competition is None:
+        return STATE_PATH, HISTORY_PATH
+    suffix = team_slug(f'{season or "all"} {competition or "all"}')
+    return data_path(f'elo_state_{suffix}.json'), data_path(f'elo_history_{suffix}.parquet')
+
+def empty_state(k_factor=K_FACTOR, home_advantage=HOME_ADVANTAGE):
+    return {'ratings': {}, 'rated': [], 'last_date': None, 'k_factor': k_factor, 'home_advantage': home_advantage}
+
+def load_state(path=STATE_PATH):
+    if not os.path.exists(path):
+        return empty_state()
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def write_json(path, value):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(value, f, ensure_ascii=False)
+
+def save_state(state, path=STATE_PATH):
+    write_atomically(path, lambda tmp: write_json(tmp, state))
+
+def load_history(path=HISTORY_PATH):
+    if not os.path.exists(path):
+        return None
+    return pd.read_parquet(path)
+
+def update_ratings(fixtures, state_path=STATE_PATH, history_path=HISTORY_PATH, rebuild=False,
+                   k_factor=K_FACTOR, home_advantage=HOME_ADVANTAGE):
+    # Rate the played fixtures not rated yet and append them to the history.
+    # A new fixture dated before the last rated one cannot be rated in order,
+    # and ratings made with another K or home advantage do not carry over,
+    # so the whole history is rebuilt instead.
+    state = empty_state(k_factor, home_advantage) if rebuild else load_state(state_path)
+    if (state.get('k_factor'), state.get('home_advantage')) != (k_factor, home_advantage):
+        print("The rating parameters changed; rebuilding the ratings")
+        return update_ratings(fixtures, state_path, history_path, True, k_factor, home_advantage)
+    played = fixtures[fixtures['Home_Goals'].notna() & fixtures['Away_Goals'].notna()]
+    keys = fixture_keys(played)
+    new = played[~keys.isin(set(state['rated']))]
+
+    if state['last_date'] is not None and len(new) and new['Data'].min() <= pd.Timestamp(state['last_date']):
+        print("Fixtures older than the last rated date were added; rebuilding the ratings")
+        return update_ratings(fixtures, state_path, history_path, True, k_factor, home_advantage)
+
+    history = rate_fixtures(new, state['ratings'], k_factor, home_advantage)
+    previous = None if rebuild else load_history(history_path)
+    if previous is not None and len(previous):
+        history = pd.concat([previous, history], ignore_index=True) if len(history) else previous
+    write_atomically(history_path, lambda tmp: history.to_parquet(tmp, index=False))
+
+    state['rated'] = state['rated'] + fixture_keys(new).tolist()
+    if len(new):
+        state['last_date'] = new['Data'].max().strftime('%Y-%m-%d')
+    save_state(state, state_path)
+    return history, len(new)
+
+def ratings_as_of(history, teams, dates, strict=True):
+    # Rating of every (team, date) pair from the history: the rating after
+    # the team's last match before date (on or before, when strict is
+    # False), BASE_RATING before its first. One sorted as-of join for all pairs.
+    query = pd.DataFrame({'Team': pd.Series(np.asarray(teams, dtype=object)).astype(str),
+                          'Data': pd.to_datetime(np.asarray(dates)).astype('datetime64[ns]'),
+                          '_row': np.arange(len(teams))})
+    known = history[['Team', 'Data', 'Rating_After']].copy()
+    known['Rating_After'] = known['Rating_After'].astype(float)
+    known['Team'] = known['Team'].astype(str)
+    known['Data'] = known['Data'].astype('datetime64[ns]')
+    joined = pd.merge_asof(query.dropna(subset=['Data']).sort_values('Data'), known.sort_values('Data'),
+                           on='Data', by='Team', allow_exact_matches=not strict)
+    rating = pd.Series(BASE_RATING, index=query['_row'])
+    rating.loc[joined['_row']] = joined['Rating_After'].fillna(BASE_RATING).to_numpy()
+    rating[query['Data'].isna().to_numpy()] = np.nan
+    return rating.to_numpy()
+
+def label_opponent_strength(df, history, date_column='DATA', opponent_column='Oponente'):
+    # Add Opponent_Elo: the opponent's rating going into the match
+    df = df.copy()
+    opponent = df[opponent_column].astype(object)
+    df['Opponent_Elo'] = ratings_as_of(history, opponent.fillna(''), df[date_column])
+    df.loc[opponent.isna().to_numpy(), 'Opponent_Elo'] = np.nan
+    return df
+
+def compute_ratings(season=None, competition=None, team='América (MG)', rebuild=False):
+    try:
+        print("Reading fixtures...")
+        with step('read'):
+            fixtures = load_fixtures(season, competition)
+        count_rows(rows_in=len(fixtures))
+
+        state_path, history_path = state_paths(season, competition)
+        with step('aggregate'):
+            history, rated = update_ratings(fixtures, state_path, history_path, rebuild)
+        print(f"Rated {rated} new fixture(s); {len(history) // 2} in the history")
+
+        # Current table: every team's latest rating
+        latest = history.sort_values('Data', kind='stable').groupby('Team').tail(1)
+        table = (latest[['Team', 'Data', 'Rating_After']]
+                 .rename(columns={'Data': 'Last_Match', 'Rating_After': 'Elo'})
+                 .sort_values('Elo', ascending=False).reset_index(drop=True))
+
+        # The team's matches with the opponent's strength going into them
+        slug = team_slug(team)
+        with step('transform'):
+            played = team_matches(fixtures, team)
+            if played.empty:
+                raise ValueError(f"{team} has no fixtures in the selected season/competition")
+            matches = pd.DataFrame({'DATA': played['Data'], 'Oponente': played['Opponent'].astype(str),
+                                    'Local': np.where(played['Is_Home'], 'Em casa', 'Visitante'),
+                                    'GP': played['Goals_For'], 'GC': played['Goals_Against']})
+            matches = label_opponent_strength(matches, history)
+
+        with step('write'):
+            table.to_csv(data_path('elo_ratings.csv'), index=False)
+            matches.to_csv(data_path(f'{slug}_opponent_strength.csv'), index=False)
+        count_rows(rows_out=len(table))
+
+        print("\nCurrent ratings:")
+        print(table.round({'Elo': 1}).to_string(index=False))
+        print(f"\nRatings saved to elo_ratings.csv, {team}'s opponents to {slug}_opponent_strength.csv")
+
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        raise
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Elo ratings over the fixtures history")
+    parser.add_argument('--season', help="season or range of seasons, e.g. 2018 or 2018-2019")
+    parser.add_argument('--competition', help="competition name(s), comma separated")
+    parser.add_argument('--team', default='América (MG)', help="club whose matches are labelled (default: América (MG))")
+    parser.add_argument('--rebuild', action='store_true', help="rate the whole history again")
+    args = parser.parse_args()
+    run_main('ratings', compute_ratings, season=args.season, competition=args.competition,
+             team=args.team, rebuild=args.rebuild)
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+# Bootstrap confidence intervals and permutation p-values for the small
+# match groups of the analyses (microcycle length, venue, coach). All the
+# resamples of a group are drawn at once as an index matrix, one row per
+# resample, so 10,000 resamples cost a few array operations per group.
+DEFAULT_RESAMPLES = 10_000
+CONFIDENCE = 0.95
+STATISTICS = ['Win_Rate', 'Points_Per_Match', 'Goal_Difference']
+# Reported as a total over the group's matches, like the Goal_Difference
+# columns; the others are per-match averages
+SUMMED = ['Goal_Difference']
+
+def match_values(goals_for, goals_against):
+    # Per-match value of every statistic: win (as %), points, goal margin.
+    # Matches without a score count as not won, no points, no margin.
+    goals_for = np.asarray(goals_for, dtype=float)
+    goals_against = np.asarray(goals_against, dtype=float)
+    return np.column_stack([
+        (goals_for > goals_against) * 100.0,
+        np.select([goals_for > goals_against, goals_for == goals_against], [3.0, 1.0], 0.0),
+        np.nan_to_num(goals_for - goals_against),
+    ])
+
+def bootstrap_ci(values, resamples=DEFAULT_RESAMPLES, confidence=CONFIDENCE, rng=None):
+    # Percentile interval of every column's statistic over bootstrap
+    # resamples of the rows of values (matches x statistics)
+    rng = np.random.default_rng(rng)
+    n = len(values)
+    index = rng.integers(0, n, size=(resamples, n))
+    stats = values[index].mean(axis=1)
+    summed = [STATISTICS.index(name) for name in SUMMED]
+    stats[:, summed] *= n
+    tail = (1 - confidence) / 2
+    return np.quantile(stats, [tail, 1 - tail], axis=0)
+
+def permutation_pvalues(values, codes, resamples=DEFAULT_RESAMPLES, rng=None):
+    # Two-sided p-value of the difference between each group's mean and the
+    # mean of all other matches, every group tested on the same shuffles of
+    # the group labels. Returns a (groups x statistics) array.
+    rng = np.random.default_rng(rng)
+    n = len(codes)
+    shuffled = rng.permuted(np.tile(codes, (resamples, 1)), axis=1)
+    total = values.sum(axis=0)
+    pvalues = np.full((codes.max() + 1, values.shape[1]), np.nan)
+    for code in range(codes.max() + 1):
+        k = int((codes == code).sum())
+        if k == n:
+            continue
+        observed = values[codes == code].sum(axis=0)
+        observed = observed / k - (total - observed) / (n - k)
+        sums = (shuffled == code).astype(float) @ values
+        diffs = sums / k - (total - sums) / (n - k)
+        extreme = np.abs(diffs) >= np.abs(observed) - 1e-9
+        pvalues[code] = (extreme.sum(axis=0) + 1) / (resamples + 1)
+    return pvalues
+
+def resample_stats(matches, by, goals=('Goals_For', 'Goals_Against'),
+                   resamples=DEFAULT_RESAMPLES, confidence=CONFIDENCE, seed=0):
+    # One row per group of the by columns: bootstrap interval and permutation
+    # p-value of every statistic, e.g. Win_Rate_CI_Low, Win_Rate_CI_High and
+    # Win_Rate_P_Value. The seed keeps the written outputs reproducible.
+    columns = list(by) + [f'{name}_{part}' for name in STATISTICS for part in ['CI_Low', 'CI_High', 'P_Value']]
+    matches = matches.dropna(subset=list(by))
+    if matches.empty:
+        return pd.DataFrame(columns=columns)
+    values = match_values(matches[goals[0]], matches[goals[1]])
+    codes = matches.groupby([matches[col].astype(object) for col in by], sort=True).ngroup().to_numpy()
+    rng = np.random.default_rng(seed)
+
+    pvalues = permutation_pvalues(values, codes, resamples, rng)
+    rows = []
+    for code in range(codes.max() + 1):
+        positions = np.flatnonzero(codes == code)
+        low, high = bootstrap_ci(values[positions], resamples, confidence, rng)
+        row = {col: matches[col].iloc[positions[0]] for col in by}
+        for i, name in enumerate(STATISTICS):
+            row[f'{name}_CI_Low'] = low[i]
+            row[f'{name}_CI_High'] = high[i]
+            row[f'{name}_P_Value'] = pvalues[code, i]
+        rows.append(row)
+    return pd.DataFrame(rows, columns=columns)
+
+def error_bars(df, name, value_column=None):
+    # Distances from each value (df[name] unless value_column is given) to
+    # the ends of its name_CI_Low/name_CI_High interval, for matplotlib's yerr
+    values = df[value_column or name]
+    return np.vstack([(values - df[f'{name}_CI_Low']).clip(lower=0),
+                      (df[f'{name}_CI_High'] - values).clip(lower=0)])
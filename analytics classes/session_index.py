@@ -0,0 +1,147 @@
+import argparse
+import os
+import sys
+import numpy as np
+import pandas as pd
+from match_days import source_files
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cleandata classes'))
+from datasets import add_filter_arguments
+from gps_store import DEFAULT_STORE, load_gps_store
+from instrumentation import count_rows, lap, run_main
+from paths import data_path
+
+# Per-process memo of built indexes, keyed on path, filters and the
+# mtime/size of the source files
+_indexes = {}
+
+class SessionIndex:
+    # GPS sessions sorted by (ATLETA, DATA) once, so an athlete's sessions
+    # are one contiguous block (offsets[i]:offsets[i + 1]) and a date range
+    # inside it is found by binary search. Windows are row slices of the
+    # sorted frame or of its column arrays, never copies.
+    def __init__(self, df):
+        df = df[df['ATLETA'].notna()]
+        athletes = df['ATLETA'].astype('category').cat.remove_unused_categories()
+        codes = athletes.cat.codes.to_numpy()
+        dates = df['DATA'].to_numpy(dtype='datetime64[ns]')
+        order = np.lexsort((dates, codes))
+
+        self.sessions = df.iloc[order].reset_index(drop=True)
+        self.athletes = athletes.cat.categories
+        self.codes = codes[order]
+        self.dates = dates[order]
+        self.offsets = np.searchsorted(self.codes, np.arange(len(self.athletes) + 1))
+        self.arrays = {col: self.sessions[col].to_numpy() for col in self.sessions.columns
+                       if pd.api.types.is_numeric_dtype(self.sessions[col])
+                       or pd.api.types.is_datetime64_any_dtype(self.sessions[col])}
+
+        # One sort key over both levels: athlete code x (distinct days + 1) +
+        # rank of the date, so all the bulk queries are a single searchsorted
+        self.days = np.unique(self.dates)
+        self._stride = len(self.days) + 1
+        self._keys = self.codes.astype(np.int64) * self._stride + np.searchsorted(self.days, self.dates)
+        self._prefix = {}
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def athlete_codes(self, athletes):
+        athletes = np.atleast_1d(np.asarray(athletes, dtype=object))
+        codes = self.athletes.get_indexer(athletes)
+        if (codes < 0).any():
+            raise KeyError(f"Unknown athlete(s): {', '.join(map(str, athletes[codes < 0]))}")
+        return codes
+
+    def query_dates(self, dates, n):
+        # One date for every query, from a single date or one per query
+        dates = pd.to_datetime(np.atleast_1d(np.asarray(dates, dtype=object)))
+        return np.broadcast_to(dates.to_numpy(dtype='datetime64[ns]'), (n,))
+
+    def bounds(self, athletes, start=None, end=None):
+        # Row ranges [lo, hi) of every athlete's sessions between start and end
+        # (both inclusive, None for open-ended). start/end may be one date for
+        # all athletes or one date per athlete.
+        codes = self.athlete_codes(athletes).astype(np.int64)
+        first = np.zeros(len(codes), dtype=np.int64) if start is None else \
+            np.searchsorted(self.days, self.query_dates(start, len(codes)), side='left')
+        last = np.full(len(codes), len(self.days), dtype=np.int64) if end is None else \
+            np.searchsorted(self.days, self.query_dates(end, len(codes)), side='right')
+        lo = np.searchsorted(self._keys, codes * self._stride + first, side='left')
+        hi = np.searchsorted(self._keys, codes * self._stride + np.maximum(last, first), side='left')
+        return lo, hi
+
+    def window(self, athlete, start=None, end=None, column=None):
+        # One athlete's sessions between start and end: a slice of the sorted
+        # frame, or of one column's array when column is given
+        lo, hi = self.bounds([athlete], start, end)
+        if column is not None:
+            return self.arrays[column][lo[0]:hi[0]]
+        return self.sessions.iloc[lo[0]:hi[0]]
+
+    def windows(self, athletes, start=None, end=None, column=None):
+        # Bulk version of window: {athlete: slice}, from one vectorized lookup
+        lo, hi = self.bounds(athletes, start, end)
+        source = self.sessions.iloc if column is None else self.arrays[column]
+        return {athlete: source[a:b] for athlete, a, b in zip(np.atleast_1d(athletes), lo, hi)}
+
+    def window_totals(self, columns, athletes, start=None, end=None):
+        # Sessions and summed load of every athlete's window, from cumulative
+        # sums of the sorted columns: two lookups per window, no scan
+        lo, hi = self.bounds(athletes, start, end)
+        totals = pd.DataFrame({'ATLETA': np.atleast_1d(athletes), 'Sessions': hi - lo})
+        for col in columns:
+            if col not in self._prefix:
+                values = np.nan_to_num(self.arrays[col].astype(np.float64))
+                self._prefix[col] = np.concatenate([[0.0], np.cumsum(values)])
+            totals[col] = self._prefix[col][hi] - self._prefix[col][lo]
+        return totals
+
+def session_index(path=DEFAULT_STORE, columns=None, **filters):
+    # The SessionIndex of path and the season/competition/club filters, built
+    # once per process until the source files change
+    filters = {k: v for k, v in filters.items() if v is not None}
+    files = source_files(path, **filters)
+    signature = tuple((f, os.stat(f).st_mtime_ns, os.stat(f).st_size) for f in files if os.path.exists(f))
+    key = (os.path.abspath(path), repr(columns), repr(sorted(filters.items())), signature)
+    if key not in _indexes:
+        if columns is not None:
+            columns = list(dict.fromkeys(['ATLETA', 'DATA'] + list(columns)))
+        _indexes[key] = SessionIndex(load_gps_store(path, columns=columns, **filters))
+    return _indexes[key]
+
+def query_sessions(athletes=None, days=28, end=None, metrics=('Trimp', 'PSEXMIN', 'Disttotalm'),
+                   input_path=data_path('GPS_with_matches.parquet'), season=None, competition=None, team=None):
+    try:
+        index = session_index(input_path, columns=list(metrics), season=season, competition=competition, club=team)
+        count_rows(rows_in=len(index))
+        lap('read')
+        if len(index) == 0:
+            print("No GPS sessions match the selected season/competition/team")
+            return
+
+        # Last days days up to end (default: the last session in the data)
+        end = pd.Timestamp(end) if end is not None else pd.Timestamp(index.days[-1])
+        start = end - pd.Timedelta(days=days - 1)
+        athletes = list(index.athletes) if not athletes else athletes
+        totals = index.window_totals(list(metrics), athletes, start, end)
+        lap('aggregate')
+        count_rows(rows_out=len(totals))
+
+        print(f"\nSessions and load from {start.date()} to {end.date()}")
+        print("=" * 50)
+        print(totals.round(1).to_string(index=False))
+        return totals
+
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        raise
+
+if __name__ == "__main__":
+    parser = add_filter_arguments(argparse.ArgumentParser(description="Per-athlete load over a date window"))
+    parser.add_argument('--athlete', action='append', dest='athletes', help="athlete (repeat for several; default: all)")
+    parser.add_argument('--days', type=int, default=28, help="window length in days (default: 28)")
+    parser.add_argument('--end', help="last day of the window (default: last session)")
+    args = parser.parse_args()
+    run_main('sessions', query_sessions, athletes=args.athletes, days=args.days, end=args.end,
+             season=args.season, competition=args.competition, team=args.team)
@@ -0,0 +1,96 @@
+import argparse
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cleandata classes'))
+from datasets import add_filter_arguments
+from gps_store import load_gps_store
+from instrumentation import count_rows, run_main, step
+from paths import data_path
+
+LOAD_METRICS = ['Trimp', 'PSEXMIN', 'Disttotalm', 'Distaltaintensidadem', 'DES', 'ACE']
+ACUTE_DAYS = 7
+CHRONIC_DAYS = 28
+
+def active_days(df):
+    # Calendar day x athlete mask of the days between each athlete's first
+    # and last session
+    first = df.groupby('ATLETA', observed=True)['DATA'].min()
+    last = df.groupby('ATLETA', observed=True)['DATA'].max()
+    calendar = pd.date_range(first.min(), last.max(), freq='D')
+    dates = calendar.to_numpy()[:, None]
+    active = (dates >= first.to_numpy()[None, :]) & (dates <= last.to_numpy()[None, :])
+    return pd.DataFrame(active, index=calendar, columns=first.index)
+
+def daily_load(daily, metric, active):
+    # Total load of one metric per athlete per calendar day (daily holds the
+    # totals per DATA and ATLETA), as a date x athlete matrix. Days without a
+    # session between an athlete's first and last session count as zero
+    # load; days outside that span are NaN.
+    wide = daily[metric].unstack('ATLETA').reindex(index=active.index, columns=active.columns)
+    return wide.fillna(0).where(active)
+
+def workload_table(df, metrics=LOAD_METRICS, acute=ACUTE_DAYS, chronic=CHRONIC_DAYS):
+    # Rolling-average and EWMA acute/chronic loads and their ratios for every
+    # athlete and day, computed on whole date x athlete matrices at once.
+    # One metric's matrices are alive at a time: each is cut down to the
+    # athletes' active days, athlete by athlete (the table's order), into one
+    # preallocated float32 block as soon as it is computed.
+    daily = df.groupby(['DATA', 'ATLETA'], observed=True)[metrics].sum()
+    active = active_days(df)
+    mask = active.to_numpy().T
+    athletes, dates = np.nonzero(mask)
+    names = [f'{metric}{suffix}' for metric in metrics for suffix in
+             ['', '_Acute_RA', '_Chronic_RA', '_ACWR_RA', '_Acute_EWMA', '_Chronic_EWMA', '_ACWR_EWMA']]
+    values = np.empty((len(names), len(dates)), dtype=np.float32)
+    for i, metric in enumerate(metrics):
+        wide = daily_load(daily, metric, active)
+        acute_ra = wide.rolling(acute, min_periods=acute).mean()
+        chronic_ra = wide.rolling(chronic, min_periods=chronic).mean()
+        acute_ewma = wide.ewm(alpha=2 / (acute + 1), adjust=False, ignore_na=True).mean().where(wide.notna())
+        chronic_ewma = wide.ewm(alpha=2 / (chronic + 1), adjust=False, ignore_na=True).mean().where(wide.notna())
+        columns = [wide, acute_ra, chronic_ra, (acute_ra / chronic_ra).replace([np.inf, -np.inf], np.nan),
+                   acute_ewma, chronic_ewma, (acute_ewma / chronic_ewma).replace([np.inf, -np.inf], np.nan)]
+        for j, matrix in enumerate(columns):
+            values[i * len(columns) + j] = matrix.to_numpy(dtype=np.float32).T[mask]
+
+    table = pd.DataFrame(values.T, columns=names, copy=False)
+    table.insert(0, 'ATLETA', active.columns[athletes])
+    table.insert(0, 'DATA', active.index[dates])
+    return table
+
+def compute_workload(input_path=data_path('GPS_with_matches.parquet'), output_path=data_path('workload_daily.parquet'),
+                     season=None, competition=None, team=None):
+    try:
+        print("Reading data...")
+        with step('read'):
+            df = load_gps_store(input_path, columns=['ATLETA', 'DATA'] + LOAD_METRICS,
+                                season=season, competition=competition, club=team)
+            df = df[df['ATLETA'].notna()]
+        count_rows(rows_in=len(df))
+        if df.empty:
+            print("No GPS sessions match the selected season/competition/team")
+            return
+
+        print("Computing acute:chronic workload...")
+        with step('aggregate'):
+            table = workload_table(df)
+        with step('write'):
+            table.to_parquet(output_path, index=False)
+        count_rows(rows_out=len(table))
+
+        print(f"Athletes: {table['ATLETA'].nunique()}")
+        print(f"Athlete-days: {len(table)}")
+        print(f"Daily workload table saved to {output_path}")
+        return table
+
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        raise
+
+if __name__ == "__main__":
+    parser = add_filter_arguments(argparse.ArgumentParser(description="Daily acute:chronic workload per athlete"))
+    args = parser.parse_args()
+    run_main('workload', compute_workload, season=args.season, competition=args.competition, team=args.team)
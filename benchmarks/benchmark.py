@@ -0,0 +1,166 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.append(ROOT)
+from pipeline import STAGES
+from synthetic import generate_dataset
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+CODE_DIRS = ['cleandata classes', 'analytics classes']
+MODES = ['no_plots', 'plots']
+
+# A result regresses when it is both TIME_THRESHOLD (MEMORY_THRESHOLD) times
+# the baseline and more than the absolute noise floor above it
+TIME_THRESHOLD = 1.25
+MEMORY_THRESHOLD = 1.25
+MIN_SECONDS = 0.5
+MIN_MEMORY_MB = 20
+
+def prepare_tree(workdir, scale, seed):
+    # Copy of the code next to a synthetic DATA directory, so every stage
+    # runs with the relative paths it expects
+    for name in CODE_DIRS:
+        shutil.copytree(os.path.join(ROOT, name), os.path.join(workdir, name),
+                        ignore=shutil.ignore_patterns('__pycache__'))
+    os.makedirs(os.path.join(workdir, 'graficos'))
+    return generate_dataset(os.path.join(workdir, 'DATA'), scale, seed)
+
+def measure(command, cwd, env):
+    # Wall time and peak RSS of one child process; a stage that fails exits
+    # with a non-zero status
+    with tempfile.TemporaryFile() as log:
+        start = time.perf_counter()
+        process = subprocess.Popen(command, cwd=cwd, env=env, stdout=log, stderr=subprocess.STDOUT)
+        _, status, usage = os.wait4(process.pid, 0)
+        seconds = time.perf_counter() - start
+        process.returncode = os.waitstatus_to_exitcode(status)
+        log.seek(0)
+        output = log.read().decode(errors='replace')
+    return {'seconds': round(seconds, 3), 'peak_rss_mb': round(usage.ru_maxrss / 1024, 1),
+            'ok': process.returncode == 0}, output
+
+def run_stage(stage, workdir, plots):
+    env = dict(os.environ)
+    # The copied scripts must use the synthetic DATA next to them
+    for name in ['NO_PLOTS', 'DATA_DIR', 'GRAPHICS_DIR']:
+        env.pop(name, None)
+    if not plots:
+        env['NO_PLOTS'] = '1'
+    script = os.path.join(workdir, os.path.relpath(stage['script'], ROOT))
+    cwd = os.path.join(workdir, os.path.relpath(stage['cwd'], ROOT))
+    return measure([sys.executable, script] + stage.get('args', []), cwd, env)
+
+def run_scale(scale, stages, modes, seed=0, keep=False, verbose=False):
+    # Every stage in pipeline order on a fresh synthetic tree, once per mode
+    results = {}
+    workdir = tempfile.mkdtemp(prefix=f'bench_{scale:g}x_')
+    try:
+        print(f"\n== {scale:g}x ==")
+        start = time.perf_counter()
+        sizes = prepare_tree(workdir, scale, seed)
+        print(f"Generated {sizes['gps_rows']} GPS rows, {sizes['matches']} matches and "
+              f"{sizes['fixtures']} fixtures in {time.perf_counter() - start:.1f}s")
+
+        for mode in modes:
+            shutil.rmtree(os.path.join(workdir, 'graficos'))
+            os.makedirs(os.path.join(workdir, 'graficos'))
+            for stage in stages:
+                result, output = run_stage(stage, workdir, plots=(mode == 'plots'))
+                key = f"{scale:g}x/{mode}/{stage['name']}"
+                results[key] = result
+                status = 'ok' if result['ok'] else 'FAILED'
+                print(f"{key:45s} {result['seconds']:9.2f}s {result['peak_rss_mb']:9.1f} MB  {status}")
+                if verbose or not result['ok']:
+                    print(output)
+    finally:
+        if keep:
+            print(f"Benchmark tree kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+def compare(results, baseline, time_threshold=TIME_THRESHOLD, memory_threshold=MEMORY_THRESHOLD):
+    # (regression messages, results with no baseline to compare with)
+    problems, missing = [], []
+    for key, result in results.items():
+        if not result['ok']:
+            problems.append(f"{key}: failed")
+            continue
+        base = baseline.get(key)
+        if base is None:
+            missing.append(key)
+            continue
+        if (result['seconds'] > base['seconds'] * time_threshold
+                and result['seconds'] - base['seconds'] > MIN_SECONDS):
+            problems.append(f"{key}: {result['seconds']:.2f}s vs {base['seconds']:.2f}s baseline")
+        if (result['peak_rss_mb'] > base['peak_rss_mb'] * memory_threshold
+                and result['peak_rss_mb'] - base['peak_rss_mb'] > MIN_MEMORY_MB):
+            problems.append(f"{key}: {result['peak_rss_mb']:.1f} MB vs {base['peak_rss_mb']:.1f} MB baseline")
+    return problems, missing
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {'machine': None, 'results': {}}
+    with open(path) as f:
+        return json.load(f)
+
+def save_baseline(path, results):
+    baseline = load_baseline(path)
+    baseline['machine'] = {'python': platform.python_version(), 'platform': platform.platform(),
+                           'cpus': os.cpu_count()}
+    baseline['results'].update(results)
+    baseline['results'] = dict(sorted(baseline['results'].items()))
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2)
+        f.write('\n')
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time every pipeline stage on synthetic data")
+    parser.add_argument('--scale', type=float, nargs='+', default=[10], help="data sizes, e.g. 10 100 1000")
+    parser.add_argument('--stages', nargs='+', help="only these stages (default: all)")
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--update-baseline', action='store_true', help="store these results as the new baseline")
+    parser.add_argument('--time-threshold', type=float, default=TIME_THRESHOLD)
+    parser.add_argument('--memory-threshold', type=float, default=MEMORY_THRESHOLD)
+    parser.add_argument('--output', help="also write the results to this JSON file")
+    parser.add_argument('--keep', action='store_true', help="keep the generated trees")
+    parser.add_argument('--verbose', action='store_true', help="show the output of every stage")
+    args = parser.parse_args()
+
+    stages = [s for s in STAGES if not args.stages or s['name'] in args.stages]
+    results = {}
+    for scale in args.scale:
+        results.update(run_scale(scale, stages, args.modes, args.seed, args.keep, args.verbose))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        save_baseline(args.baseline, results)
+        print(f"\nBaseline updated: {args.baseline}")
+        sys.exit(0 if all(r['ok'] for r in results.values()) else 1)
+
+    problems, missing = compare(results, load_baseline(args.baseline)['results'],
+                                args.time_threshold, args.memory_threshold)
+    if missing:
+        print(f"\nNo baseline for {len(missing)} result(s), not compared (run with --update-baseline):")
+        for key in missing:
+            print(f"- {key}")
+    if problems:
+        print("\nRegressions:")
+        for problem in problems:
+            print(f"- {problem}")
+        sys.exit(1)
+    print(f"\nNo regressions against the baseline ({len(results) - len(missing)} result(s) compared)")
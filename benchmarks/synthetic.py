@@ -0,0 +1,192 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+
+# Seeded generator of GPS_cleaned.csv, matches_clean.csv and the fixtures
+# CSVs, shaped like the real 2018 files (one Série A season, ~32 athletes a
+# day, ~7,200 GPS rows, 380 fixtures). A scale of N means N times today's
+# row counts: up to MAX_SEASONS seasons, then more athletes per session and
+# more leagues in the fixtures files.
+CLUB = 'América (MG)'
+MAX_SEASONS = 20
+SQUAD_SIZE = 32
+LEAGUE_SIZE = 20
+FIRST_SEASON = 2018
+
+POSITIONS = ['ATACANTE', 'VOLANTE', 'ZAGUEIRO', 'LATERAL', 'MEIA', 'GOLEIRO']
+POSITION_WEIGHTS = [0.24, 0.2, 0.18, 0.15, 0.15, 0.08]
+PRESENCE = ['PRESENTE', 'DM', 'G1', 'G2', 'FOLGA', 'TRANSIÇÃO', None]
+PRESENCE_WEIGHTS = [0.66, 0.1, 0.05, 0.05, 0.04, 0.02, 0.08]
+KICKOFFS = ['16:00', '19:00', '20:00', '17:00', '21:00', '11:00']
+WEEKDAYS = ['seg', 'ter', 'qua', 'qui', 'sex', 'sáb', 'dom']
+
+# Mean load by days to the next match (6 = six or more), from the 2018 data:
+# Disttotalm, Distaltaintensidadem, MinutosTotais, PSE, DES, ACE
+LOAD_PROFILE = np.array([
+    [3296.3, 151.7, 54.7, 5.7, 35.4, 11.3],
+    [1904.8, 48.5, 51.3, 3.9, 17.2, 6.1],
+    [2774.4, 86.2, 64.5, 4.6, 34.2, 11.2],
+    [3046.6, 111.9, 63.3, 5.0, 34.0, 11.5],
+    [2892.3, 108.7, 61.8, 4.9, 34.0, 11.1],
+    [1595.9, 70.8, 45.4, 5.2, 18.7, 7.0],
+    [1583.5, 74.6, 52.0, 5.4, 18.0, 6.0],
+])
+
+def scale_plan(scale):
+    seasons = int(min(scale, MAX_SEASONS))
+    return {
+        'seasons': seasons,
+        'athletes': int(round(SQUAD_SIZE * scale / seasons)),
+        'leagues': max(1, int(round(scale / seasons))),
+    }
+
+def round_robin(teams):
+    # Double round robin by the circle method: list of rounds, each a list of
+    # (home, away) pairs; the second half mirrors the first with venues swapped
+    teams = list(teams)
+    n = len(teams)
+    rounds = []
+    for r in range(n - 1):
+        pairs = []
+        for i in range(n // 2):
+            home, away = teams[i], teams[n - 1 - i]
+            pairs.append((home, away) if (r + i) % 2 == 0 else (away, home))
+        rounds.append(pairs)
+        teams = [teams[0]] + [teams[-1]] + teams[1:-1]
+    return rounds + [[(away, home) for home, away in pairs] for pairs in rounds]
+
+def match_calendar(rng, season, rounds):
+    # Round dates: mid April to December, three to seven days apart
+    gaps = rng.choice([3, 4, 7, 7], size=rounds - 1)
+    start = pd.Timestamp(f'{season}-04-14') + pd.Timedelta(days=int(rng.integers(0, 3)))
+    return start + pd.to_timedelta(np.concatenate([[0], np.cumsum(gaps)]), unit='D')
+
+def generate_fixtures(rng, season, leagues):
+    # allMatchs-style rows of every league of one season; league 0 holds CLUB
+    round_dates = None
+    frames = []
+    for league in range(leagues):
+        teams = [f"Time {league:02d}-{i:02d}" for i in range(LEAGUE_SIZE)]
+        if league == 0:
+            teams[0] = CLUB
+        rounds = round_robin(teams)
+        if round_dates is None:
+            round_dates = match_calendar(rng, season, len(rounds))
+        rows = [(r + 1, home, away) for r, pairs in enumerate(rounds) for home, away in pairs]
+        fixtures = pd.DataFrame(rows, columns=['Sem', 'Em casa', 'Visitante'])
+        dates = round_dates[fixtures['Sem'] - 1] + pd.to_timedelta(rng.integers(-1, 2, len(fixtures)), unit='D')
+        home_goals = rng.poisson(1.4, len(fixtures))
+        away_goals = rng.poisson(1.0, len(fixtures))
+        fixtures.insert(1, 'Dia', [WEEKDAYS[d] for d in dates.dayofweek])
+        fixtures.insert(2, 'Data', dates.strftime('%Y-%m-%d'))
+        fixtures.insert(3, 'Horário', rng.choice(KICKOFFS, len(fixtures)))
+        fixtures.insert(5, 'Resultado', [f"{h}–{a}" for h, a in zip(home_goals, away_goals)])
+        fixtures['Público'] = [f"{p / 1000:.3f}" for p in rng.integers(3000, 45000, len(fixtures))]
+        fixtures['Local'] = 'Estádio ' + fixtures['Em casa']
+        frames.append(fixtures)
+    return pd.concat(frames, ignore_index=True)
+
+def club_matches(rng, fixtures):
+    # matches_clean-style rows: CLUB's matches from its own point of view
+    own = fixtures[(fixtures['Em casa'] == CLUB) | (fixtures['Visitante'] == CLUB)].copy()
+    goals = own['Resultado'].str.split('–', expand=True).astype(int)
+    home = own['Em casa'] == CLUB
+    return pd.DataFrame({
+        'Data': own['Data'],
+        'Horário': own['Horário'],
+        'Dia': own['Dia'],
+        'Local': np.where(home, 'Em casa', 'Visitante'),
+        'GP': np.where(home, goals[0], goals[1]),
+        'GC': np.where(home, goals[1], goals[0]),
+        'Oponente': np.where(home, own['Visitante'], own['Em casa']),
+        'Posse': np.clip(np.round(rng.normal(47.5, 8.3, len(own))), 27, 70).astype(int),
+        'Rodada': own['Sem'],
+    }).sort_values('Data').drop_duplicates('Data').reset_index(drop=True)
+
+def generate_gps(rng, matches, athletes):
+    # One row per athlete per training day, from a week before the first
+    # match to the last one; about one day in eight is a day off
+    match_dates = pd.to_datetime(matches['Data']).to_numpy()
+    days = pd.date_range(match_dates[0] - np.timedelta64(6, 'D'), match_dates[-1], freq='D').to_numpy()
+    days = days[np.isin(days, match_dates) | (rng.random(len(days)) > 0.12)]
+    next_match = match_dates[np.searchsorted(match_dates, days, side='left')]
+    to_match = ((next_match - days) // np.timedelta64(1, 'D')).astype(int)
+
+    n = len(days) * athletes
+    athlete_ids = np.tile(np.arange(athletes), len(days))
+    positions = np.random.default_rng(athletes).choice(POSITIONS, size=athletes, p=POSITION_WEIGHTS)
+    profile = LOAD_PROFILE[np.minimum(np.repeat(to_match, athletes), 6)]
+
+    # Gamma-distributed load around the day's mean, with some absent rows
+    load = rng.gamma(1.5, profile / 1.5)
+    load[:, 3] = np.clip(np.round(profile[:, 3] + rng.normal(0, 1.5, n)), 1, 10)
+    load[rng.random(n) < 0.05] = 0
+    minutes = np.round(load[:, 2], 2)
+    psexmin = np.round(load[:, 3] * minutes, 2)
+
+    ef = rng.choice(['1', '2', '3', '4', '5', '6'], size=n, p=[0.02, 0.03, 0.3, 0.3, 0.3, 0.05]).astype(object)
+    ef[rng.random(n) < 0.43] = None
+    return pd.DataFrame({
+        'Posicao': positions[athlete_ids],
+        'ATLETA': np.char.add('ATLETA ', np.char.zfill(athlete_ids.astype(str), 5)),
+        'Presenca': rng.choice(np.array(PRESENCE, dtype=object), size=n, p=PRESENCE_WEIGHTS),
+        'DATA': pd.DatetimeIndex(np.repeat(days, athletes)).strftime('%Y-%m-%d'),
+        'EF': ef,
+        'Disttotalm': np.round(load[:, 0]),
+        'Distaltaintensidadem': np.round(load[:, 1]),
+        'MinutosTotais': minutes,
+        'PSE': load[:, 3],
+        'PSEXMIN': psexmin,
+        'DES': np.round(load[:, 4]),
+        'ACE': np.round(load[:, 5]),
+        'Trimp': np.round(psexmin * rng.uniform(0.25, 0.45, n), 4),
+        'days_until_match': np.repeat(to_match, athletes).astype(float),
+    })
+
+def coach_tenures(seasons):
+    # Two coaches a season, covering every day
+    rows = []
+    for season in seasons:
+        rows.append((f"Treinador {season}A", CLUB, f"{season}-01-01", f"{season}-06-30"))
+        rows.append((f"Treinador {season}B", CLUB, f"{season}-07-01", f"{season}-12-31"))
+    return pd.DataFrame(rows, columns=['coach', 'club', 'start', 'end'])
+
+def generate_dataset(output_dir, scale=1, seed=0):
+    # Write a complete DATA directory for the given scale; returns row counts
+    plan = scale_plan(scale)
+    rng = np.random.default_rng(seed)
+    os.makedirs(output_dir, exist_ok=True)
+
+    seasons = list(range(FIRST_SEASON, FIRST_SEASON + plan['seasons']))
+    matches, sources = [], []
+    gps_path = os.path.join(output_dir, 'GPS_cleaned.csv')
+    gps_rows = fixture_rows = 0
+    for i, season in enumerate(seasons):
+        fixtures = generate_fixtures(rng, season, plan['leagues'])
+        name = f'allMatchs_{season}.csv'
+        fixtures.to_csv(os.path.join(output_dir, name), index=False)
+        sources.append((name, season, 'Série A'))
+        fixture_rows += len(fixtures)
+
+        season_matches = club_matches(rng, fixtures)
+        matches.append(season_matches)
+        gps = generate_gps(rng, season_matches, plan['athletes'])
+        gps.to_csv(gps_path, index=False, mode='w' if i == 0 else 'a', header=i == 0)
+        gps_rows += len(gps)
+
+    matches = pd.concat(matches, ignore_index=True)
+    matches.to_csv(os.path.join(output_dir, 'matches_clean.csv'), index=False)
+    pd.DataFrame(sources, columns=['file', 'season', 'competition']).to_csv(
+        os.path.join(output_dir, 'fixture_sources.csv'), index=False)
+    coach_tenures(seasons).to_csv(os.path.join(output_dir, 'coach_tenures.csv'), index=False)
+
+    return {'scale': scale, 'gps_rows': gps_rows, 'matches': len(matches), 'fixtures': fixture_rows, **plan}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic GPS and fixtures data")
+    parser.add_argument('output_dir', help="directory to write the CSV files to")
+    parser.add_argument('--scale', type=float, default=10, help="multiple of today's data size")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    print(generate_dataset(args.output_dir, args.scale, args.seed))
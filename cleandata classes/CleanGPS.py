@@ -1,49 +1,186 @@
 # clean_gps.py
+import argparse
+import glob
+import json
+import os
+from datetime import datetime
 import pandas as pd
+from datasets import partition_dir, write_atomically
+from gps_store import CATEGORY_COLUMNS, apply_schema
+from instrumentation import count_rows, run_main, step
+from paths import data_path
 
-def clean_gps_data():
+COLUMNS_TO_KEEP = [
+    'Posicao',
+    'ATLETA',
+    'Presenca',
+    'DATA',
+    'EF',
+    'Disttotalm',
+    'Distaltaintensidadem',
+    'MinutosTotais',
+    'PSE',
+    'PSEXMIN',
+    'DES',
+    'ACE',
+    'Trimp',
+    'days_until_match'
+]
+
+# A session is identified by athlete, date and training block
+SESSION_KEY = ['ATLETA', 'DATA', 'EF']
+
+SESSION_STORE = data_path('gps_sessions')
+WATERMARK_FILE = '_watermark.json'
+
+def select_columns(df):
+    # Create new dataframe with only the selected columns
+    cleaned_df = df[COLUMNS_TO_KEEP].copy()
+
+    # Fill blank values in days_until_match with 0
+    cleaned_df['days_until_match'] = cleaned_df['days_until_match'].fillna(0)
+    return cleaned_df
+
+def clean_gps_data(input_path=data_path('GPS_cleaned.csv'), output_path=data_path('GPS_cleaned.csv')):
     try:
         # Read the CSV file
-        print("Reading GPS_withMatchday.csv...")
-        df = pd.read_csv('GPS_cleaned.csv')
-        
-        # Select only the specified columns
-        columns_to_keep = [
-            'Posicao',
-            'ATLETA',
-            'Presenca',
-            'DATA',
-            'EF',
-            'Disttotalm',
-            'Distaltaintensidadem',
-            'MinutosTotais',
-            'PSE',
-            'PSEXMIN',
-            'DES',
-            'ACE',
-            'Trimp',
-            'days_until_match'
-        ]
-        
+        print(f"Reading {input_path}...")
+        with step('read'):
+            df = pd.read_csv(input_path)
+        count_rows(rows_in=len(df))
+
         print("Cleaning data...")
-        # Create new dataframe with only the selected columns
-        cleaned_df = df[columns_to_keep]
-        
-        # Fill blank values in days_until_match with 0
-        cleaned_df['days_until_match'] = cleaned_df['days_until_match'].fillna(0)
-        
+        with step('transform'):
+            cleaned_df = select_columns(df)
+
         # Save the cleaned dataframe to a new CSV file
-        print("Saving cleaned data to GPS_cleaned.csv...")
-        cleaned_df.to_csv('GPS_cleaned.csv', index=False)
-        
+        print(f"Saving cleaned data to {output_path}...")
+        with step('write'):
+            cleaned_df.to_csv(output_path, index=False)
+        count_rows(rows_out=len(cleaned_df))
+
         print("Data cleaning completed successfully!")
         print(f"Number of rows processed: {len(cleaned_df)}")
-        print(f"Number of columns in cleaned file: {len(columns_to_keep)}")
-        
+        print(f"Number of columns in cleaned file: {len(COLUMNS_TO_KEEP)}")
+
     except FileNotFoundError:
-        print("Error: The file 'GPS_withMatchday.csv' was not found in the current directory.")
+        print(f"Error: The file '{input_path}' was not found in the current directory.")
+        raise
     except Exception as e:
         print(f"An error occurred: {str(e)}")
+        raise
+
+def partition_path(store_dir, date):
+    # Sessions are stored one file per day, grouped in one folder per season
+    # (Season=, as in the other datasets)
+    return os.path.join(partition_dir(store_dir, Season=date.year), f"{date:%Y-%m-%d}.parquet")
+
+def to_partition_frame(df):
+    # Typed columns, but plain strings instead of categoricals so every
+    # partition can be read back together with the others
+    df = apply_schema(df)
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('string')
+    return df
+
+# The watermark keeps every partition's version (bumped on each write) and
+# the pending partitions: written since a consumer last acknowledged them.
+# Ingests add to the pending set; only acknowledge_sessions removes from it.
+def read_watermark(store_dir=SESSION_STORE):
+    path = os.path.join(store_dir, WATERMARK_FILE)
+    if not os.path.exists(path):
+        return {'versions': {}, 'pending': [], 'ingested_at': None}
+    with open(path) as f:
+        return json.load(f)
+
+def write_watermark(store_dir, watermark):
+    def write(tmp):
+        with open(tmp, 'w') as f:
+            json.dump(watermark, f, indent=2, sort_keys=True)
+    write_atomically(os.path.join(store_dir, WATERMARK_FILE), write)
+
+def pending_sessions(store_dir=SESSION_STORE):
+    # {partition: version} of the partitions not acknowledged yet
+    watermark = read_watermark(store_dir)
+    return {p: watermark['versions'][p] for p in watermark['pending']}
+
+def acknowledge_sessions(partitions, store_dir=SESSION_STORE):
+    # Remove the consumed partitions ({partition: version}, as returned by
+    # pending_sessions) from the pending set. A partition written again
+    # since it was read stays pending.
+    watermark = read_watermark(store_dir)
+    consumed = {p for p, version in partitions.items() if watermark['versions'].get(p) == version}
+    watermark['pending'] = [p for p in watermark['pending'] if p not in consumed]
+    write_watermark(store_dir, watermark)
+    return watermark['pending']
+
+def ingest_sessions(input_path, store_dir=SESSION_STORE):
+    # Append the sessions of input_path to the partitioned store, touching
+    # only the days present in the new file and skipping sessions already stored
+    # Text columns are read as text so a file whose EF values all look
+    # numeric is keyed the same way as the rest of the store
+    with step('read'):
+        raw_df = pd.read_csv(input_path, dtype={col: str for col in CATEGORY_COLUMNS})
+    count_rows(rows_in=len(raw_df))
+    with step('transform'):
+        new_df = to_partition_frame(select_columns(raw_df))
+        new_df = new_df.drop_duplicates(subset=SESSION_KEY, keep='last')
+
+    watermark = read_watermark(store_dir)
+    changed = []
+    added_rows = 0
+
+    for date, day_df in new_df.groupby('DATA', sort=True):
+        path = partition_path(store_dir, date)
+        relative = os.path.relpath(path, store_dir)
+        stored_before = 0
+        if os.path.exists(path):
+            existing = pd.read_parquet(path)
+            stored_before = len(existing)
+            seen = day_df.merge(existing[SESSION_KEY].drop_duplicates(), on=SESSION_KEY,
+                                how='left', indicator=True)['_merge'].to_numpy() == 'both'
+            day_df = day_df[~seen]
+            if day_df.empty:
+                continue
+            day_df = pd.concat([existing, day_df], ignore_index=True)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        added_rows += len(day_df) - stored_before
+        with step('write'):
+            day_df.to_parquet(path, index=False)
+        watermark['versions'][relative] = watermark['versions'].get(relative, 0) + 1
+        changed.append(relative)
+
+    count_rows(rows_out=added_rows)
+    watermark['pending'] = sorted(set(watermark['pending']) | set(changed))
+    watermark['ingested_at'] = datetime.now().isoformat(timespec='seconds')
+    os.makedirs(store_dir, exist_ok=True)
+    write_watermark(store_dir, watermark)
+
+    print(f"Sessions read: {len(new_df)}")
+    print(f"New sessions stored: {added_rows}")
+    print(f"Partitions changed: {len(changed)} ({len(watermark['pending'])} pending)")
+    return changed
+
+def load_sessions(store_dir=SESSION_STORE, partitions=None, columns=None):
+    # Read the whole store, or only the given partitions (e.g. the
+    # pending ones)
+    if partitions is None:
+        paths = sorted(glob.glob(os.path.join(store_dir, 'Season=*', '*.parquet')))
+    else:
+        paths = [os.path.join(store_dir, p) for p in partitions]
+    if not paths:
+        return apply_schema(pd.DataFrame(columns=columns or COLUMNS_TO_KEEP))
+    frames = [pd.read_parquet(path, columns=columns) for path in paths]
+    return apply_schema(pd.concat(frames, ignore_index=True))
 
 if __name__ == "__main__":
-    clean_gps_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Clean GPS data or ingest new sessions")
+    parser.add_argument('--ingest', metavar='CSV', help="append the sessions of CSV to the partitioned store")
+    parser.add_argument('--store', default=SESSION_STORE, help="partitioned session store directory")
+    args = parser.parse_args()
+
+    if args.ingest:
+        run_main('ingest_sessions', ingest_sessions, input_path=args.ingest, store_dir=args.store)
+    else:
+        run_main('clean_gps', clean_gps_data)
@@ -1,57 +1,115 @@
+import numpy as np
 import pandas as pd
-from datetime import datetime
+from gps_store import save_gps_dataset, save_gps_store
+from instrumentation import count_rows, run_main, step
+from paths import data_path
+from star import save_star
 
-def add_coach_info():
+def load_coach_tenures(path=data_path('coach_tenures.csv'), club=None):
+    # One row per tenure: coach, club, start, end (both dates inclusive)
+    tenures = pd.read_csv(path, parse_dates=['start', 'end'])
+    if club is not None:
+        tenures = tenures[tenures['club'] == club]
+    return tenures.sort_values(['club', 'start']).reset_index(drop=True)
+
+def check_tenures(tenures):
+    # Report tenures of the same club that overlap or leave days uncovered.
+    # Each tenure is compared with the latest end among the tenures started
+    # before it, so one nested inside a longer tenure neither hides an
+    # overlap nor shows up as a gap.
+    problems = []
+    for club, periods in tenures.groupby('club', sort=False):
+        periods = periods.reset_index(drop=True)
+        running_end = periods['end'].cummax()
+        holder = pd.Series(np.where(periods['end'] == running_end, periods.index, np.nan)).ffill()
+        previous_end = running_end.shift()
+        previous_coach = periods['coach'].reindex(holder.shift()).set_axis(periods.index)
+        overlaps = periods[periods['start'] <= previous_end]
+        gaps = periods[periods['start'] > previous_end + pd.Timedelta(days=1)]
+        for i, row in overlaps.iterrows():
+            problems.append(f"{club}: {row['coach']} starts {row['start']:%Y-%m-%d} before "
+                            f"{previous_coach[i]} ends {previous_end[i]:%Y-%m-%d}")
+        for i, row in gaps.iterrows():
+            problems.append(f"{club}: no coach between {previous_end[i]:%Y-%m-%d} and "
+                            f"{row['start']:%Y-%m-%d}")
+        for _, row in periods[periods['end'] < periods['start']].iterrows():
+            problems.append(f"{club}: {row['coach']} ends before starting")
+    return problems
+
+def tenure_segments(tenures):
+    # Flatten the tenures into non-overlapping segments: one starts at every
+    # tenure start and on the day after every end, and is labelled with the
+    # most recently started tenure covering it (None where none does).
+    # Returns the segment starts (sorted) and their coaches.
+    tenures = tenures.sort_values('start', kind='stable')
+    starts = tenures['start'].to_numpy(dtype='datetime64[ns]')
+    ends = tenures['end'].to_numpy(dtype='datetime64[ns]') + np.timedelta64(1, 'D')
+    bounds = np.unique(np.concatenate([starts, ends]))
+    covers = (starts[None, :] <= bounds[:, None]) & (bounds[:, None] < ends[None, :])
+    latest = len(starts) - 1 - covers[:, ::-1].argmax(axis=1)
+    coaches = np.where(covers.any(axis=1), tenures['coach'].to_numpy(dtype=object)[latest], None)
+    return bounds, coaches
+
+def assign_coaches(dates, tenures):
+    # Label every date with its segment's coach, found with one binary search
+    # over the segment starts. Where tenures overlap (one nested in another
+    # included) the most recently started one wins, and a date past the end
+    # of a nested tenure falls back to the one around it.
+    dates = pd.to_datetime(dates).to_numpy(dtype='datetime64[ns]')
+    bounds, coaches = tenure_segments(tenures)
+    if len(bounds) == 0:
+        return np.full(len(dates), None, dtype=object)
+    idx = np.searchsorted(bounds, dates, side='right') - 1
+    return np.where(idx >= 0, coaches[np.clip(idx, 0, None)], None)
+
+def add_coach_info(club='América (MG)', competition='Série A', tenures_path=data_path('coach_tenures.csv'),
+                   input_path=data_path('GPS_with_matches.csv')):
     # Read the data
-    df = pd.read_csv('../DATA/GPS_with_matches.csv')
-    
+    with step('read'):
+        df = pd.read_csv(input_path)
+        tenures = load_coach_tenures(tenures_path, club)
+    count_rows(rows_in=len(df))
+
     # Convert DATA column to datetime
     df['DATA'] = pd.to_datetime(df['DATA'])
-    
-    # Define coach periods
-    coach_periods = [
-        {
-            'coach': 'Givanildo Oliveira',
-            'start': '2018-11-11',
-            'end': '2019-05-01'
-        },
-        {
-            'coach': 'Adilson Batista',
-            'start': '2018-07-24',
-            'end': '2018-11-10'
-        },
-        {
-            'coach': 'Ricardo Drubscky',
-            'start': '2018-06-20',
-            'end': '2018-07-23'
-        },
-        {
-            'coach': 'Enderson Moreira',
-            'start': '2016-07-20',
-            'end': '2018-06-19'
-        }
-    ]
-    
-    # Add coach column
-    df['Coach'] = None
-    
+
+    # Check coach periods before using them
+    for problem in check_tenures(tenures):
+        print(f"Warning: {problem}")
+
     # Assign coach based on date ranges
-    for period in coach_periods:
-        mask = (df['DATA'] >= pd.to_datetime(period['start'])) & (df['DATA'] <= pd.to_datetime(period['end']))
-        df.loc[mask, 'Coach'] = period['coach']
-    
+    with step('transform'):
+        df['Coach'] = assign_coaches(df['DATA'], tenures)
+
     # Save the modified dataframe
     print("Saving updated data to GPS_with_matches.csv...")
-    df.to_csv('../DATA/GPS_with_matches.csv', index=False)
-    
+    with step('write'):
+        df.to_csv(input_path, index=False)
+
+        # Save the typed columnar store read by the analytics scripts
+        print("Saving typed store to GPS_with_matches.parquet...")
+        save_gps_store(df, data_path('GPS_with_matches.parquet'))
+
+        # The star layout: session facts plus match and coach dimensions
+        sessions, matches, coaches = save_star(df)
+        print(f"Saved star layout: {len(sessions)} sessions, {len(matches)} matches, {len(coaches)} coaches")
+
+        # And the club's partitions of the season/competition/club dataset
+        written = save_gps_dataset(df, club, competition)
+        print(f"Saved {len(written)} partition(s) of the GPS dataset")
+    count_rows(rows_out=len(df))
+
     # Print summary of coach assignments
     print("\nCoach Assignment Summary:")
     print("=" * 50)
-    for period in coach_periods:
-        count = len(df[df['Coach'] == period['coach']])
-        print(f"{period['coach']}: {count} records")
-    
+    counts = df['Coach'].value_counts()
+    for coach in tenures['coach'].unique():
+        print(f"{coach}: {counts.get(coach, 0)} records")
+    unassigned = df['Coach'].isna().sum()
+    if unassigned:
+        print(f"No coach: {unassigned} records")
+
     print("\nData update completed successfully!")
 
 if __name__ == "__main__":
-    add_coach_info() 
\ No newline at end of file
+    run_main('coach_info', add_coach_info)
@@ -0,0 +1,107 @@
+import os
+import tempfile
+from paths import data_path
+
+# Fixtures and GPS sessions are kept as Hive-style partitioned Parquet
+# datasets under DATA/datasets:
+#   fixtures/Season=2018/Competition=Série A/fixtures.parquet
+#   gps/Season=2018/Competition=Série A/Club=América (MG)/sessions.parquet
+# Reads push the season/competition/club filters down to the directory
+# names, so only the matching partitions (and columns) are opened.
+DATASET_DIR = data_path('datasets')
+FIXTURES_DATASET = os.path.join(DATASET_DIR, 'fixtures')
+GPS_DATASET = os.path.join(DATASET_DIR, 'gps')
+
+PARTITION_COLUMNS = ['Season', 'Competition', 'Club']
+
+def parse_seasons(value):
+    # 2018, '2018', '2018-2019', '2018,2020' or a list -> list of ints (None = all)
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return [value]
+    if isinstance(value, (list, tuple, set)):
+        return sorted(int(v) for v in value)
+    seasons = []
+    for part in str(value).replace('–', '-').split(','):
+        if '-' in part:
+            start, end = part.split('-')
+            seasons.extend(range(int(start), int(end) + 1))
+        elif part.strip():
+            seasons.append(int(part))
+    return sorted(set(seasons))
+
+def _as_list(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return [v.strip() for v in value.split(',') if v.strip()]
+    return list(value)
+
+def partition_filters(season=None, competition=None, club=None):
+    filters = []
+    seasons = parse_seasons(season)
+    if seasons is not None:
+        filters.append(('Season', 'in', seasons))
+    if competition is not None:
+        filters.append(('Competition', 'in', _as_list(competition)))
+    if club is not None:
+        filters.append(('Club', 'in', _as_list(club)))
+    return filters
+
+def partition_dir(root, **values):
+    # Partition values are used verbatim as directory names
+    parts = []
+    for name in PARTITION_COLUMNS:
+        if name in values:
+            value = str(values[name])
+            if '/' in value or '=' in value:
+                raise ValueError(f"Invalid {name} partition value: {value!r}")
+            parts.append(f"{name}={value}")
+    return os.path.join(root, *parts)
+
+def write_atomically(path, write):
+    # Call write(tmp) on a uniquely named temp file next to path, then move it
+    # into place. Concurrent writers never share a temp file, and the leading
+    # dot keeps dataset readers from picking it up half-written.
+    folder, name = os.path.split(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix=f'.{name}.', suffix='.tmp')
+    os.close(fd)
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return path
+
+def write_partitions(df, root, partition_cols, file_name):
+    # Write one file per partition of df, replacing only those partitions
+    written = []
+    for values, part in df.groupby(partition_cols, sort=True, observed=True):
+        values = values if isinstance(values, tuple) else (values,)
+        folder = partition_dir(root, **dict(zip(partition_cols, values)))
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, file_name)
+        part = part.drop(columns=partition_cols)
+        written.append(write_atomically(path, lambda tmp: part.to_parquet(tmp, index=False)))
+    return written
+
+def read_partitions(root, columns=None, filters=None):
+    # Read the dataset at root, opening only the partitions matching filters.
+    # Partition columns come back as plain values, not categoricals.
+    # pandas is imported here so the CLI can build its options without it.
+    import pandas as pd
+    df = pd.read_parquet(root, columns=columns, filters=filters or None)
+    for col in PARTITION_COLUMNS:
+        if col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(df[col].cat.categories.dtype)
+    return df
+
+def add_filter_arguments(parser, team=None):
+    # --season/--competition/--team options shared by the analytics scripts
+    parser.add_argument('--season', help="season or range of seasons, e.g. 2018 or 2018-2019")
+    parser.add_argument('--competition', help="competition name(s), comma separated")
+    parser.add_argument('--team', default=team, help=f"club to analyse (default: {team or 'all'})")
+    return parser
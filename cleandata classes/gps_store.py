@@ -0,0 +1,79 @@
+import os
+import pandas as pd
+from datasets import GPS_DATASET, partition_filters, read_partitions, write_partitions
+from paths import data_path
+
+# Canonical schema of GPS_with_matches. Every script loads the data through
+# load_gps_store so the types are decided once here instead of re-inferred
+# from the CSV text on every read.
+CATEGORY_COLUMNS = ['Posicao', 'ATLETA', 'Presenca', 'EF', 'Horário', 'Dia',
+                    'Local', 'Oponente', 'Coach']
+LOAD_COLUMNS = ['Disttotalm', 'Distaltaintensidadem', 'MinutosTotais', 'PSE',
+                'PSEXMIN', 'DES', 'ACE', 'Trimp', 'days_until_match']
+MATCH_NUMBER_COLUMNS = ['GP', 'GC', 'Posse', 'Rodada']
+DATE_COLUMNS = ['DATA']
+
+SCHEMA = {}
+SCHEMA.update({col: 'category' for col in CATEGORY_COLUMNS})
+# The load metrics stay float64: the exports carry them with 15 significant
+# digits, which float32 would round in the published figures
+SCHEMA.update({col: 'float64' for col in LOAD_COLUMNS})
+SCHEMA.update({col: 'float32' for col in MATCH_NUMBER_COLUMNS})
+SCHEMA.update({col: 'datetime64[ns]' for col in DATE_COLUMNS})
+
+DEFAULT_STORE = data_path('GPS_with_matches.parquet')
+
+def apply_schema(df):
+    # Cast every known column to its canonical type, leaving unknown ones as
+    # they are. float32 values are widened through their text form, as in
+    # exact_float64.
+    df = df.copy(deep=False)
+    for col, dtype in SCHEMA.items():
+        if col not in df.columns or str(df[col].dtype) == dtype:
+            continue
+        if dtype == 'datetime64[ns]':
+            df[col] = pd.to_datetime(df[col]).astype(dtype)
+        elif dtype == 'category':
+            df[col] = df[col].astype('category')
+        else:
+            values = df[col].astype(str) if df[col].dtype == 'float32' else df[col]
+            df[col] = pd.to_numeric(values, errors='coerce').astype(dtype)
+    return df
+
+def exact_float64(df):
+    # The float32 columns as float64 through their shortest text form, so
+    # they are written back with the export's decimals (512.6, not 512.599976)
+    df = df.copy(deep=False)
+    for col in df.columns[df.dtypes == 'float32']:
+        df[col] = pd.to_numeric(df[col].astype(str))
+    return df
+
+def save_gps_store(df, path=DEFAULT_STORE):
+    df = apply_schema(df)
+    df.to_parquet(path, index=False)
+    return df
+
+def save_gps_dataset(df, club, competition, dataset=GPS_DATASET):
+    # Add the sessions of one club and competition to the partitioned dataset,
+    # one partition per season
+    df = apply_schema(df).assign(Season=lambda d: d['DATA'].dt.year, Competition=competition, Club=club)
+    return write_partitions(df, dataset, ['Season', 'Competition', 'Club'], 'sessions.parquet')
+
+def load_gps_store(path=DEFAULT_STORE, columns=None, season=None, competition=None, club=None):
+    # Read only the requested columns. Season, competition and club filters
+    # are answered from the partitioned dataset (the flat store has no
+    # partition columns), reading only the matching partitions.
+    filters = partition_filters(season, competition, club)
+    if filters or os.path.isdir(path):
+        root = path if os.path.isdir(path) else GPS_DATASET
+        return apply_schema(read_partitions(root, columns=columns, filters=filters))
+
+    # Falls back to the CSV twin of the store (same name, .csv extension)
+    # when the Parquet file has not been built yet.
+    if os.path.exists(path):
+        return apply_schema(pd.read_parquet(path, columns=columns))
+
+    csv_path = os.path.splitext(path)[0] + '.csv'
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(f"Neither {path} nor {csv_path} exists")
+    return apply_schema(pd.read_csv(csv_path, usecols=columns))
@@ -0,0 +1,151 @@
+import json
+import os
+import resource
+import sys
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+# Every cleandata and analytics entry point runs inside stage(): the time
+# spent in each step (read, transform, aggregate, plot, write), the peak RSS
+# and the rows going in and out are appended as one JSON line to the run log.
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+RUN_LOG_ENV = 'RUN_LOG'
+RUN_ID_ENV = 'PIPELINE_RUN_ID'
+# 'cprofile' or 'tracemalloc' (or both, comma separated)
+PROFILE_ENV = 'STAGE_PROFILE'
+DEFAULT_RUN_LOG = os.path.join(ROOT, 'logs', 'run_log.jsonl')
+PROFILE_DIR = os.path.join(ROOT, 'logs', 'profiles')
+
+_current = None
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+def run_log_path():
+    return os.environ.get(RUN_LOG_ENV) or DEFAULT_RUN_LOG
+
+def write_record(record, path=None):
+    path = path or run_log_path()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+def _add_time(record, name, seconds):
+    steps = record['steps'].setdefault(name, {'seconds': 0.0, 'peak_rss_mb': 0.0})
+    steps['seconds'] = round(steps['seconds'] + seconds, 4)
+    steps['peak_rss_mb'] = peak_rss_mb()
+
+@contextmanager
+def step(name):
+    # Time one step of the running stage; a no-op outside stage() and
+    # inside another step
+    record = _current
+    if record is None or record['_in_step']:
+        yield
+        return
+    record['_in_step'] = True
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record['_in_step'] = False
+        record['_lap'] = time.perf_counter()
+        _add_time(record, name, record['_lap'] - start)
+
+def lap(name):
+    # Charge the time since the previous lap or step (or the start of the
+    # stage) to name, for straight-line code that is not worth indenting
+    record = _current
+    if record is None or record['_in_step']:
+        return
+    now = time.perf_counter()
+    _add_time(record, name, now - record['_lap'])
+    record['_lap'] = now
+
+def count_rows(rows_in=None, rows_out=None):
+    # Add to the running stage's row counters
+    if _current is None:
+        return
+    if rows_in is not None:
+        _current['rows_in'] += int(rows_in)
+    if rows_out is not None:
+        _current['rows_out'] += int(rows_out)
+
+def _start_profilers(name):
+    wanted = {p.strip() for p in os.environ.get(PROFILE_ENV, '').lower().split(',') if p.strip()}
+    profilers = {}
+    if 'tracemalloc' in wanted:
+        import tracemalloc
+        tracemalloc.start()
+        profilers['tracemalloc'] = tracemalloc
+    if 'cprofile' in wanted:
+        import cProfile
+        profilers['cprofile'] = cProfile.Profile()
+        profilers['cprofile'].enable()
+    return profilers
+
+def _stop_profilers(profilers, name, record):
+    if 'cprofile' in profilers:
+        profile = profilers['cprofile']
+        profile.disable()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"{name}-{datetime.now():%Y%m%d-%H%M%S}.prof")
+        profile.dump_stats(path)
+        record['profile'] = os.path.relpath(path, ROOT)
+    if 'tracemalloc' in profilers:
+        tracemalloc = profilers['tracemalloc']
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        record['traced_peak_mb'] = round(peak / 1024 / 1024, 1)
+        record['top_allocations'] = [
+            {'where': str(stat.traceback[0]), 'mb': round(stat.size / 1024 / 1024, 2)}
+            for stat in snapshot.statistics('lineno')[:10]
+        ]
+
+@contextmanager
+def stage(name, **params):
+    # Record one run of a stage. Exceptions are logged and re-raised.
+    global _current
+    record = {
+        'run_id': os.environ.get(RUN_ID_ENV) or uuid.uuid4().hex[:12],
+        'stage': name,
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'params': {k: v for k, v in params.items() if v is not None},
+        'status': 'ok',
+        'steps': {},
+        'rows_in': 0,
+        'rows_out': 0,
+        '_in_step': False,
+        '_lap': time.perf_counter(),
+    }
+    previous, _current = _current, record
+    profilers = _start_profilers(name)
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record['status'] = 'failed'
+        record['error'] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current = previous
+        record['seconds'] = round(time.perf_counter() - start, 4)
+        _stop_profilers(profilers, name, record)
+        record['peak_rss_mb'] = peak_rss_mb()
+        del record['_in_step'], record['_lap']
+        write_record(record)
+
+def run_main(name, func, **params):
+    # Script entry point: run func inside stage() and exit with status 1
+    # when it fails, so pipelines and schedulers see the failure
+    try:
+        with stage(name, **params):
+            func(**params)
+    except Exception:
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,15 @@
+import os
+
+# Where the scripts read and write data and charts. Defaults to DATA/ and
+# graficos/ at the top of the repository, whatever the working directory;
+# the DATA_DIR and GRAPHICS_DIR environment variables (set by cli.py from
+# --data-dir/--graphics-dir) point them somewhere else.
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+DATA_DIR_ENV = 'DATA_DIR'
+GRAPHICS_DIR_ENV = 'GRAPHICS_DIR'
+
+DATA_DIR = os.path.abspath(os.environ.get(DATA_DIR_ENV) or os.path.join(ROOT, 'DATA'))
+GRAPHICS_DIR = os.path.abspath(os.environ.get(GRAPHICS_DIR_ENV) or os.path.join(ROOT, 'graficos'))
+
+def data_path(*parts):
+    return os.path.join(DATA_DIR, *parts)
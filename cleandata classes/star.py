@@ -0,0 +1,100 @@
+import os
+import numpy as np
+import pandas as pd
+from datasets import write_atomically
+from gps_store import apply_schema
+from paths import data_path
+from unify import MATCH_COLUMNS
+
+# Star layout of GPS_with_matches: the session fact table keeps the GPS
+# columns plus an integer Match_Key and Coach_Key (-1 when the session has
+# no match or coach), and the match and coach columns live once per match
+# and per coach in two small dimension tables. join_dimensions puts back
+# only the dimension columns a script asks for.
+STAR_DIR = data_path('star')
+COACH_COLUMNS = ['Coach']
+NO_KEY = -1
+
+def split_star(df):
+    # (sessions, matches, coaches) of a denormalized GPS frame. A match is
+    # one distinct set of match columns, dated by its first session.
+    df = apply_schema(df)
+    match_columns = [col for col in MATCH_COLUMNS if col in df.columns]
+    has_match = df[match_columns].notna().any(axis=1).to_numpy()
+    match_key = np.full(len(df), NO_KEY, dtype=np.int32)
+    match_key[has_match] = df.loc[has_match, match_columns].astype(object).groupby(
+        match_columns, dropna=False, sort=False).ngroup().to_numpy()
+
+    first = pd.Series(match_key).drop_duplicates()
+    first = first[first != NO_KEY]
+    matches = df.iloc[first.index][['DATA'] + match_columns].reset_index(drop=True)
+    matches.insert(0, 'Match_Key', first.to_numpy())
+
+    coach = df['Coach'].astype(object)
+    codes, names = pd.factorize(coach, sort=False)
+    dates = df['DATA'][codes >= 0].groupby(codes[codes >= 0])
+    coaches = pd.DataFrame({'Coach_Key': np.arange(len(names), dtype=np.int16), 'Coach': names.astype(str),
+                            'First_Date': dates.min().to_numpy(), 'Last_Date': dates.max().to_numpy()})
+
+    sessions = df.drop(columns=match_columns + COACH_COLUMNS)
+    sessions['Match_Key'] = match_key
+    sessions['Coach_Key'] = codes.astype(np.int16)
+    return sessions, matches.sort_values('DATA', kind='stable').reset_index(drop=True), coaches
+
+def save_star(df, star_dir=STAR_DIR):
+    sessions, matches, coaches = split_star(df)
+    os.makedirs(star_dir, exist_ok=True)
+    for name, table in [('sessions', sessions), ('matches', matches), ('coaches', coaches)]:
+        write_atomically(os.path.join(star_dir, f'{name}.parquet'), lambda tmp: table.to_parquet(tmp, index=False))
+    return sessions, matches, coaches
+
+def read_table(star_dir, name, columns=None):
+    path = os.path.join(star_dir, f'{name}.parquet')
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} does not exist; run add_coach_info to build the star layout")
+    return apply_schema(pd.read_parquet(path, columns=columns))
+
+def load_matches(star_dir=STAR_DIR, with_coach=False):
+    # One row per match, in date order, optionally with its coach
+    matches = read_table(star_dir, 'matches')
+    if with_coach:
+        keys = read_table(star_dir, 'sessions', ['Match_Key', 'Coach_Key']).drop_duplicates('Match_Key')
+        matches = join_dimensions(matches.merge(keys, on='Match_Key', how='left'),
+                                  coaches=load_coaches(star_dir)).drop(columns='Coach_Key')
+    return matches
+
+def load_coaches(star_dir=STAR_DIR):
+    return read_table(star_dir, 'coaches')
+
+def lookup(keys, table, key_column, columns):
+    # Rows of table for every key; NO_KEY (and unknown keys) give empty rows
+    positions = pd.Index(table[key_column]).get_indexer(np.asarray(keys))
+    padded = pd.concat([table[columns], table[columns].iloc[:0].reindex([len(table)])], ignore_index=True)
+    return padded.iloc[np.where(positions >= 0, positions, len(table))].reset_index(drop=True)
+
+def join_dimensions(sessions, matches=None, coaches=None, columns=None):
+    # The sessions with the requested match/coach columns (all of them when
+    # columns is None) taken from the dimension tables by key
+    sessions = sessions.reset_index(drop=True)
+    parts = [sessions]
+    if matches is not None and 'Match_Key' in sessions:
+        wanted = [col for col in matches.columns if col not in ('Match_Key', 'DATA')
+                  and (columns is None or col in columns)]
+        parts.append(lookup(sessions['Match_Key'], matches, 'Match_Key', wanted))
+    if coaches is not None and 'Coach_Key' in sessions:
+        wanted = [col for col in COACH_COLUMNS if columns is None or col in columns]
+        parts.append(lookup(sessions['Coach_Key'], coaches, 'Coach_Key', wanted))
+    return apply_schema(pd.concat(parts, axis=1))
+
+def load_star(star_dir=STAR_DIR, columns=None):
+    # Same frame as load_gps_store(columns=columns), joined from the star layout
+    if columns is None:
+        return join_dimensions(read_table(star_dir, 'sessions'), load_matches(star_dir), load_coaches(star_dir))
+    match_wanted = [col for col in columns if col in MATCH_COLUMNS]
+    coach_wanted = [col for col in columns if col in COACH_COLUMNS]
+    fact = [col for col in columns if col not in match_wanted + coach_wanted]
+    fact += ['Match_Key'] * bool(match_wanted) + ['Coach_Key'] * bool(coach_wanted)
+    sessions = read_table(star_dir, 'sessions', fact)
+    joined = join_dimensions(sessions, load_matches(star_dir) if match_wanted else None,
+                             load_coaches(star_dir) if coach_wanted else None, columns)
+    return joined[list(columns)]
@@ -1,43 +1,171 @@
+import argparse
+import numpy as np
 import pandas as pd
+from CleanGPS import SESSION_KEY, SESSION_STORE, acknowledge_sessions, load_sessions, pending_sessions
+from gps_store import exact_float64
+from instrumentation import count_rows, run_main, step
+from paths import data_path
 
-def merge_gps_with_matches():
+MATCH_COLUMNS = ['Horário', 'Dia', 'Local', 'GP', 'GC', 'Oponente', 'Posse', 'Rodada']
+
+def join_matches(gps_df, matches_df, tolerance_days=None):
+    # Keep one match per date (the first one, as the old row-by-row lookup did)
+    # and index it by date so every GPS row is resolved with a single lookup
+    matches = matches_df.drop_duplicates(subset=['Data'], keep='first')
+    matches = matches.set_index('Data').sort_index()
+
+    gps_dates = gps_df['DATA'].to_numpy(dtype='datetime64[ns]')
+    match_dates = matches.index.to_numpy(dtype='datetime64[ns]')
+
+    if tolerance_days is None:
+        # Exact date join
+        positions = matches.index.get_indexer(gps_dates)
+    elif len(match_dates) == 0:
+        positions = np.full(len(gps_dates), -1)
+    else:
+        # Nearest match within N days: binary search for the neighbours on
+        # both sides and keep the closer one (ties go to the earlier match)
+        right = np.searchsorted(match_dates, gps_dates, side='left')
+        left = np.clip(right - 1, 0, len(match_dates) - 1)
+        right = np.clip(right, 0, len(match_dates) - 1)
+        dist_left = np.abs(gps_dates - match_dates[left])
+        dist_right = np.abs(match_dates[right] - gps_dates)
+        positions = np.where(dist_left <= dist_right, left, right)
+        distance = np.minimum(dist_left, dist_right)
+        positions[distance > np.timedelta64(int(tolerance_days), 'D')] = -1
+        # NaT sorts after every date and its distances are NaT, which the
+        # comparisons above do not reject
+        positions[np.isnat(gps_dates)] = -1
+
+    # Position -1 (no game) points at a trailing all-empty row, so the
+    # lookup below fills every match column in one take
+    lookup = matches[MATCH_COLUMNS].reset_index(drop=True)
+    lookup = pd.concat([lookup, pd.DataFrame(np.nan, index=[len(lookup)], columns=MATCH_COLUMNS)])
+    match_info = lookup.iloc[positions].reset_index(drop=True)
+    match_info.index = gps_df.index
+
+    merged = gps_df.drop(columns=MATCH_COLUMNS, errors='ignore')
+    merged = pd.concat([merged, match_info], axis=1)
+
+    matched = positions >= 0
+    stats = {
+        'rows': len(merged),
+        'matched': int(matched.sum()),
+        'unmatched': int((~matched).sum()),
+        'match_dates': int(np.unique(positions[matched]).size),
+    }
+    return merged, stats
+
+def add_stored_sessions(gps_df, stored):
+    # The GPS rows plus the sessions ingested into the session store, the
+    # stored version winning when both have the same session
+    if stored.empty:
+        return gps_df
+    def keys(df):
+        return pd.MultiIndex.from_frame(df[SESSION_KEY].astype(str).assign(DATA=df['DATA'].dt.strftime('%Y-%m-%d')))
+    replaced = keys(gps_df).isin(keys(stored))
+    stored = exact_float64(stored[[col for col in gps_df.columns if col in stored.columns]])
+    return pd.concat([gps_df[~replaced], stored], ignore_index=True)
+
+def merge_gps_with_matches(gps_path=data_path('GPS_cleaned.csv'), matches_path=data_path('matches_clean.csv'),
+                           output_path=data_path('GPS_with_matches.csv'), tolerance_days=None,
+                           store_dir=SESSION_STORE):
     try:
-        # Read both CSV files
+        # Read both CSV files, and the sessions ingested so far
         print("Reading CSV files...")
-        gps_df = pd.read_csv('GPS_cleaned.csv')
-        matches_df = pd.read_csv('matches_clean.csv')
-        
+        with step('read'):
+            gps_df = pd.read_csv(gps_path)
+            matches_df = pd.read_csv(matches_path)
+            pending = pending_sessions(store_dir)
+            stored = load_sessions(store_dir)
+        count_rows(rows_in=len(gps_df) + len(matches_df) + len(stored))
+
         # Convert date columns to datetime
-        gps_df['DATA'] = pd.to_datetime(gps_df['DATA'])
-        matches_df['Data'] = pd.to_datetime(matches_df['Data'])
-        
-        # Create new columns in GPS dataframe to store match information
-        match_columns = ['Horário', 'Dia', 'Local', 'GP', 'GC', 'Oponente', 'Posse', 'Rodada']
-        for col in match_columns:
-            gps_df[col] = None
-            
-        # For each GPS entry, find matching match data
+        with step('transform'):
+            gps_df['DATA'] = pd.to_datetime(gps_df['DATA'])
+            matches_df['Data'] = pd.to_datetime(matches_df['Data'])
+            gps_df = add_stored_sessions(gps_df, stored)
+
+        # Attach match information to every GPS entry on the same date
+        # (or the nearest match within tolerance_days, when given)
         print("Merging data...")
-        for index, row in gps_df.iterrows():
-            # Find match with the same date
-            match_row = matches_df[matches_df['Data'] == row['DATA']]
-            if not match_row.empty:
-                # Fill match information
-                for col in match_columns:
-                    gps_df.at[index, col] = match_row.iloc[0][col]
-        
+        with step('transform'):
+            gps_df, stats = join_matches(gps_df, matches_df, tolerance_days)
+
         # Save the merged dataframe
         print("Saving merged data to GPS_with_matches.csv...")
-        gps_df.to_csv('GPS_with_matches.csv', index=False)
-        
+        with step('write'):
+            gps_df.to_csv(output_path, index=False)
+        count_rows(rows_out=len(gps_df))
+
         print("Data merging completed successfully!")
-        print(f"Number of rows processed: {len(gps_df)}")
+        print(f"Number of rows processed: {stats['rows']}")
         print(f"Number of matches found: {len(matches_df)}")
-        
+        print(f"Rows matched to a game: {stats['matched']} ({stats['match_dates']} match dates)")
+        print(f"Rows without a game: {stats['unmatched']}")
+
+        # Every stored session is in the output now
+        if pending:
+            acknowledge_sessions(pending, store_dir)
+        return stats
+
     except FileNotFoundError:
         print("Error: One or both of the required CSV files were not found.")
+        raise
     except Exception as e:
         print(f"An error occurred: {str(e)}")
+        raise
+
+def merge_pending_sessions(matches_path=data_path('matches_clean.csv'), output_path=data_path('GPS_with_matches.csv'),
+                           tolerance_days=None, store_dir=SESSION_STORE):
+    # Daily update: join only the session store's pending days with the
+    # matches and put them into output_path. Days after the last one already
+    # there are appended; a day already there (a corrected export) has its
+    # rows replaced, which rewrites the file.
+    try:
+        pending = pending_sessions(store_dir)
+        if not pending:
+            print("No pending sessions to merge")
+            return
+        with step('read'):
+            sessions = load_sessions(store_dir, sorted(pending))
+            matches_df = pd.read_csv(matches_path)
+            merged_dates = pd.to_datetime(pd.read_csv(output_path, usecols=['DATA'])['DATA'])
+            columns = pd.read_csv(output_path, nrows=0).columns
+        count_rows(rows_in=len(sessions))
+
+        with step('transform'):
+            matches_df['Data'] = pd.to_datetime(matches_df['Data'])
+            new_df, stats = join_matches(sessions, matches_df, tolerance_days)
+            new_df = exact_float64(new_df.reindex(columns=columns))
+
+        with step('write'):
+            if new_df['DATA'].min() > merged_dates.max():
+                new_df.to_csv(output_path, mode='a', header=False, index=False)
+            else:
+                merged = pd.read_csv(output_path)
+                merged = merged[~merged_dates.isin(new_df['DATA'])]
+                merged = pd.concat([merged.assign(DATA=pd.to_datetime(merged['DATA'])), new_df], ignore_index=True)
+                merged.to_csv(output_path, index=False)
+        count_rows(rows_out=len(new_df))
+        remaining = acknowledge_sessions(pending, store_dir)
+
+        print(f"Merged {len(pending)} pending day(s): {stats['rows']} sessions, {stats['matched']} matched to a game")
+        if remaining:
+            print(f"{len(remaining)} day(s) were ingested again meanwhile and are still pending")
+        return stats
+
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        raise
 
 if __name__ == "__main__":
-    merge_gps_with_matches()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Attach match information to the GPS sessions")
+    parser.add_argument('--pending', action='store_true', help="merge only the days ingested since the last merge")
+    parser.add_argument('--store', default=SESSION_STORE, help="partitioned session store directory")
+    args = parser.parse_args()
+
+    if args.pending:
+        run_main('merge_pending', merge_pending_sessions, store_dir=args.store)
+    else:
+        run_main('merge_matches', merge_gps_with_matches, store_dir=args.store)
@@ -0,0 +1,164 @@
+import argparse
+import importlib
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CLEANDATA = os.path.join(ROOT, 'cleandata classes')
+ANALYTICS = os.path.join(ROOT, 'analytics classes')
+sys.path[:0] = [CLEANDATA, ANALYTICS]
+
+# Same as paths.DATA_DIR_ENV/GRAPHICS_DIR_ENV and charts.NO_PLOTS_ENV. paths
+# reads them when first imported, so they are set before any project module
+# is loaded.
+DATA_DIR_ENV = 'DATA_DIR'
+GRAPHICS_DIR_ENV = 'GRAPHICS_DIR'
+NO_PLOTS_ENV = 'NO_PLOTS'
+
+# One subcommand per stage script. The module is only imported once its
+# command is chosen, so --help and the text-only commands never load
+# pandas/matplotlib for the other stages. Options left unset are not
+# passed, so the function's own defaults apply.
+#   stage:   name in the run log (same as the pipeline stage)
+#   filters: add --season/--competition/--team (the value is the default team)
+#   args:    extra argparse options, as (flags, kwargs) pairs
+#   plots:   the function takes plots=False for --no-plots
+COMMANDS = [
+    {'name': 'clean', 'module': 'CleanGPS', 'func': 'clean_gps_data', 'stage': 'clean_gps',
+     'help': "keep the GPS columns used downstream",
+     'args': [(['--input'], {'dest': 'input_path'}), (['--output'], {'dest': 'output_path'})]},
+    {'name': 'ingest', 'module': 'CleanGPS', 'func': 'ingest_sessions', 'stage': 'ingest_sessions',
+     'help': "append the sessions of a GPS export to the partitioned session store",
+     'args': [(['input_path'], {'metavar': 'CSV'}), (['--store'], {'dest': 'store_dir'})]},
+    {'name': 'merge', 'module': 'unify', 'func': 'merge_gps_with_matches', 'stage': 'merge_matches',
+     'help': "attach match information to the GPS sessions",
+     'args': [(['--tolerance-days'], {'type': int, 'help': "nearest match within this many days"})]},
+    {'name': 'merge-pending', 'module': 'unify', 'func': 'merge_pending_sessions', 'stage': 'merge_pending',
+     'help': "attach match information to the sessions ingested since the last merge",
+     'args': [(['--tolerance-days'], {'type': int, 'help': "nearest match within this many days"}),
+              (['--store'], {'dest': 'store_dir'})]},
+    {'name': 'coaches', 'module': 'add_coach_info', 'func': 'add_coach_info', 'stage': 'coach_info',
+     'help': "label sessions with the coach and write the GPS store",
+     'args': [(['--club'], {}), (['--competition'], {}), (['--tenures'], {'dest': 'tenures_path'})]},
+    {'name': 'location', 'module': 'analyze_location', 'func': 'analyze_home_away_performance',
+     'stage': 'location', 'help': "home vs away match performance", 'filters': None,
+     'args': [(['--chunksize'], {'type': int, 'help': "GPS rows read at a time"})]},
+    {'name': 'coach-performance', 'module': 'analyze_coach_performance', 'func': 'analyze_coach_performance',
+     'stage': 'coach_performance', 'help': "match performance by coach", 'filters': None,
+     'args': [(['--chunksize'], {'type': int, 'help': "GPS rows read at a time"})]},
+    {'name': 'player-report', 'module': 'player_report', 'func': 'generate_player_report',
+     'stage': 'player_report', 'help': "player performance report", 'filters': None, 'plots': True,
+     'args': [(['--workers'], {'type': int, 'help': "processes drawing the charts"})]},
+    {'name': 'player-profiles', 'module': 'player_profiles', 'func': 'build_player_profiles',
+     'stage': 'player_profiles', 'help': "player load profiles, clusters and most similar teammates",
+     'filters': None, 'plots': True,
+     'args': [(['--clusters'], {'type': int, 'help': "number of k-means clusters"}),
+              (['--by-season'], {'action': 'store_true', 'default': None, 'help': "one profile per athlete and season"})]},
+    {'name': 'workload', 'module': 'workload', 'func': 'compute_workload', 'stage': 'workload',
+     'help': "daily acute:chronic workload per athlete", 'filters': None},
+    {'name': 'microcycle-load', 'module': 'microcycle_load', 'func': 'analyze_microcycle_load',
+     'stage': 'microcycle_load', 'help': "training load by microcycle and day to match", 'filters': None},
+    {'name': 'load-cube', 'module': 'load_cube', 'func': 'build_load_cube', 'stage': 'load_cube',
+     'help': "rollup cube of the GPS load by athlete, position, coach, venue and day to match", 'filters': None,
+     'args': [(['--rebuild'], {'action': 'store_true', 'default': None, 'help': "build the cube again"})]},
+    {'name': 'fixtures', 'module': 'fixtures', 'func': 'build_fixtures_dataset', 'stage': 'fixtures',
+     'help': "parse the fixtures CSVs that changed into the fixtures dataset"},
+    {'name': 'team-performance', 'module': 'analyze_team_performance', 'func': 'analyze_team_performance',
+     'stage': 'team_performance', 'help': "league table and home/away statistics for every team",
+     'args': [(['--season'], {'help': "season or range of seasons, e.g. 2018 or 2018-2019"}),
+              (['--competition'], {'help': "competition name(s), comma separated"})]},
+    {'name': 'compare', 'module': 'compare_america_mg', 'func': 'compare_america_mg',
+     'stage': 'compare_america_mg', 'help': "compare a team with the league average",
+     'args': [(['--team'], {'help': "club to compare (default: América (MG))"})]},
+    {'name': 'compare-league', 'module': 'compare_america_mg', 'func': 'compare_all_teams',
+     'stage': 'compare_league', 'help': "compare every team with the league average", 'plots': True,
+     'args': [(['--workers'], {'type': int, 'help': "processes drawing the team profiles"})]},
+    {'name': 'sessions', 'module': 'session_index', 'func': 'query_sessions', 'stage': 'sessions',
+     'help': "per-athlete sessions and load over the last days", 'filters': None,
+     'args': [(['--athlete'], {'action': 'append', 'dest': 'athletes', 'help': "athlete (repeat for several)"}),
+              (['--days'], {'type': int, 'help': "window length in days (default: 28)"}),
+              (['--end'], {'help': "last day of the window (default: last session)"})]},
+    {'name': 'serve', 'module': 'query_server', 'func': 'serve', 'stage': 'serve',
+     'help': "local JSON query server over the GPS and fixtures data",
+     'args': [(['--host'], {}), (['--port'], {'type': int}),
+              (['--refresh'], {'type': float, 'help': "seconds between checks for changed data"})]},
+    {'name': 'ratings', 'module': 'ratings', 'func': 'compute_ratings', 'stage': 'ratings',
+     'help': "Elo ratings over the fixtures and the opponents' strength", 'filters': 'América (MG)',
+     'args': [(['--rebuild'], {'action': 'store_true', 'default': None, 'help': "rate the whole history again"})]},
+    {'name': 'microcycles', 'module': 'analyze_microcycles', 'func': 'analyze_microcycles',
+     'stage': 'microcycles', 'help': "team performance by microcycle length", 'filters': 'América (MG)'},
+    {'name': 'home-away-microcycles', 'module': 'analyze_home_away_microcycles',
+     'func': 'analyze_home_away_microcycles', 'stage': 'home_away_microcycles',
+     'help': "home vs away team performance by microcycle length", 'filters': 'América (MG)'},
+]
+
+def run_command(command, args):
+    from instrumentation import run_main
+    module = importlib.import_module(command['module'])
+    params = {dest: getattr(args, dest) for dest in args.params if getattr(args, dest) is not None}
+    if command.get('plots') and args.no_plots:
+        params['plots'] = False
+    run_main(command['stage'], getattr(module, command['func']), **params)
+    return 0
+
+def run_pipeline_command(args):
+    from pipeline import run_pipeline
+    summary = run_pipeline(args.stages, force=args.force, jobs=args.jobs, verbose=args.verbose)
+    return 1 if summary['failed'] else 0
+
+def add_global_arguments(parser, default=None):
+    # Also given to every subcommand (with default=argparse.SUPPRESS, so an
+    # option before the subcommand is not reset by the subcommand's default)
+    parser.add_argument('--data-dir', default=default, help="data directory (default: DATA next to this file)")
+    parser.add_argument('--graphics-dir', default=default, help="chart directory (default: graficos next to this file)")
+    parser.add_argument('--no-plots', action='store_true', default=default or False,
+                        help="compute and write the statistics without drawing charts")
+    return parser
+
+def apply_global_arguments(options):
+    if options.data_dir:
+        os.environ[DATA_DIR_ENV] = os.path.abspath(options.data_dir)
+    if options.graphics_dir:
+        os.environ[GRAPHICS_DIR_ENV] = os.path.abspath(options.graphics_dir)
+    if options.no_plots:
+        os.environ[NO_PLOTS_ENV] = '1'
+
+def build_parser():
+    from datasets import add_filter_arguments
+    from pipeline import add_pipeline_arguments
+    parser = add_global_arguments(argparse.ArgumentParser(
+        description="Clean, merge and analyse the GPS and match data"))
+    commands = parser.add_subparsers(dest='command', required=True, metavar='command')
+    global_options = add_global_arguments(argparse.ArgumentParser(add_help=False), default=argparse.SUPPRESS)
+
+    for command in COMMANDS:
+        sub = commands.add_parser(command['name'], help=command['help'], description=command['help'],
+                                  parents=[global_options])
+        before = {action.dest for action in sub._actions}
+        if 'filters' in command:
+            add_filter_arguments(sub, team=command['filters'])
+        for flags, kwargs in command.get('args', []):
+            sub.add_argument(*flags, **kwargs)
+        sub.set_defaults(command_spec=command,
+                         params=[action.dest for action in sub._actions if action.dest not in before])
+
+    sub = add_pipeline_arguments(commands.add_parser(
+        'pipeline', help="run every stage whose inputs changed",
+        description="Run the cleandata and analytics stages, skipping unchanged ones", parents=[global_options]))
+    sub.set_defaults(command_spec=None)
+    return parser
+
+def main(argv=None):
+    # The global options go to the environment first, so every module (and
+    # every pipeline child process) sees the same data and chart directories.
+    # They may come before or after the subcommand.
+    options, _ = add_global_arguments(argparse.ArgumentParser(add_help=False)).parse_known_args(argv)
+    apply_global_arguments(options)
+    args = build_parser().parse_args(argv)
+
+    if args.command_spec is None:
+        return run_pipeline_command(args)
+    return run_command(args.command_spec, args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,358 @@
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import uuid
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CLEANDATA = os.path.join(ROOT, 'cleandata classes')
+ANALYTICS = os.path.join(ROOT, 'analytics classes')
+STATE_FILE = os.path.join(ROOT, '.pipeline_state.json')
+
+sys.path.append(CLEANDATA)
+from paths import DATA_DIR as DATA, GRAPHICS_DIR as GRAPHICS
+
+# Same as charts.NO_PLOTS_ENV: with it set the stages draw no charts, so
+# their chart outputs are not expected
+NO_PLOTS_ENV = 'NO_PLOTS'
+
+# Every stage is one of the existing scripts, with optional command-line
+# args. Inputs and outputs are paths relative to DATA (charts are given as
+# paths under GRAPHICS);
+# code lists the files (besides SHARED_CODE) whose changes must also
+# trigger a re-run. The order of this list is a valid execution order: a
+# stage depends on the latest earlier stage that writes one of its inputs.
+STAGES = [
+    {
+        'name': 'clean_gps',
+        'script': os.path.join(CLEANDATA, 'CleanGPS.py'),
+        'cwd': DATA,
+        'inputs': ['GPS_cleaned.csv'],
+        'outputs': ['GPS_cleaned.csv'],
+        'code': [],
+    },
+    {
+        'name': 'merge_matches',
+        'script': os.path.join(CLEANDATA, 'unify.py'),
+        'cwd': DATA,
+        'inputs': ['GPS_cleaned.csv', 'matches_clean.csv', 'gps_sessions'],
+        'outputs': ['GPS_with_matches.csv'],
+        'code': [os.path.join(CLEANDATA, 'CleanGPS.py')],
+    },
+    {
+        'name': 'coach_info',
+        'script': os.path.join(CLEANDATA, 'add_coach_info.py'),
+        'cwd': CLEANDATA,
+        'inputs': ['GPS_with_matches.csv', 'coach_tenures.csv'],
+        'outputs': ['GPS_with_matches.csv', 'GPS_with_matches.parquet', 'datasets/gps',
+                    os.path.join('star', 'sessions.parquet'), os.path.join('star', 'matches.parquet'),
+                    os.path.join('star', 'coaches.parquet')],
+        'code': [os.path.join(CLEANDATA, 'gps_store.py'), os.path.join(CLEANDATA, 'datasets.py'),
+                 os.path.join(CLEANDATA, 'star.py'), os.path.join(CLEANDATA, 'unify.py')],
+    },
+    {
+        'name': 'location',
+        'script': os.path.join(ANALYTICS, 'analyze_location.py'),
+        'cwd': ANALYTICS,
+        'inputs': ['GPS_with_matches.parquet'],
+        'outputs': [os.path.join(GRAPHICS, 'home_away_analysis.png')],
+        'code': [os.path.join(ANALYTICS, 'resampling.py'), os.path.join(ANALYTICS, 'charts.py'),
+                 os.path.join(ANALYTICS, 'match_days.py'), os.path.join(CLEANDATA, 'gps_store.py'),
+                 os.path.join(CLEANDATA, 'datasets.py')],
+    },
+    {
+        'name': 'coach_performance',
+        'script': os.path.join(ANALYTICS, 'analyze_coach_performance.py'),
+        'cwd': ANALYTICS,
+        'inputs': ['GPS_with_matches.parquet'],
+        'outputs': [os.path.join(GRAPHICS, 'coach_performance_analysis.png')],
+        'code': [os.path.join(ANALYTICS, 'resampling.py'), os.path.join(ANALYTICS, 'charts.py'),
+                 os.path.join(ANALYTICS, 'match_days.py'), os.path.join(CLEANDATA, 'gps_store.py'),
+                 os.path.join(CLEANDATA, 'datasets.py')],
+    },
+    {
+        'name': 'player_report',
+        'script': os.path.join(ANALYTICS, 'player_report.py'),
+        'cwd': ANALYTICS,
+        'inputs': ['GPS_with_matches.parquet'],
+        'outputs': ['player_performance_report.txt', 'player_performance_report.json',
+                    os.path.join(GRAPHICS, 'player_profiles_analysis.png')],
+        'code': [os.path.join(ANALYTICS, 'charts.py'), os.path.join(CLEANDATA, 'gps_store.py'),
+                 os.path.join(CLEANDATA, 'datasets.py')],
+    },
+    {
+        'name': 'player_profiles',
+        'script': os.path.join(ANALYTICS, 'player_profiles.py'),
+        'cwd': ANALYTICS,
+        'inputs': ['GPS_with_matches.parquet'],
+        'outputs': ['player_profiles.csv', os.path.join(GRAPHICS, 'player_profiles_clusters.png')],
+        'code': [os.path.join(ANALYTICS, 'player_report.py'), os.path.join(ANALYTICS, 'charts.py'),
+                 os.path.join(CLEANDATA, 'gps_store.py'), os.path.join(CLEANDATA, 'datasets.py')],
+    },
+    {
+        'name': 'workload',
+        'script': os.path.join(ANALYTICS, 'workload.py'),
+        'cwd': ANALYTICS,
+        'inputs': ['GPS_with_matches.parquet'],
+        'outputs': ['workload_daily.parquet'],
+        'code': [os.path.join(CLEANDATA, 'gps_store.py'),
+                 os.path.join(CLEANDATA, 'datasets.py')],
+    },
+    {
+        'name': 'load_cube',
+        'script': os.path.join(ANALYTICS, 'load_cube.py'),
+        'cwd': ANALYTICS,
+        'inputs': ['GPS_with_matches.parquet'],
+        'outputs': ['load_cube.parquet', 'load_cube_days'],
+        'code': [os.path.join(CLEANDATA, 'gps_store.py'), os.path.join(CLEANDATA, 'datasets.py')],
+    },
+    {
+        'name': 'microcycle_load',
+        'script': os.path.join(ANALYTICS, 'microcycle_load.py'),
+        'cwd': ANALYTICS,
+        'inputs': ['GPS_with_matches.parquet', os.path.join('star', 'matches.parquet')],
+        'outputs': ['microcycle_load_athletes.parquet', 'microcycle_load_squad.csv',
+                    'microcycle_load_shape.csv'],
+        'code': [os.path.join(CLEANDATA, 'gps_store.py'), os.path.join(CLEANDATA, 'star.py'),
+                 os.path.join(CLEANDATA, 'datasets.py')],
+    },
+    {
+        'name': 'fixtures',
+        'script': os.path.join(ANALYTICS, 'fixtures.py'),
+        'cwd': ANALYTICS,
+        'inputs': ['allMatchs.csv', 'fixture_sources.csv'],
+        'outputs': [os.path.join('datasets', 'fixtures')],
+        'code': [os.path.join(CLEANDATA, 'datasets.py')],
+    },
+    {
+        'name': 'team_performance',
+        'script': os.path.join(ANALYTICS, 'analyze_team_performance.py'),
+        'cwd': ANALYTICS,
+        'inputs': [os.path.join('datasets', 'fixtures')],
+        'outputs': ['team_performance_stats.csv',
+                    os.path.join(GRAPHICS, 'team_performance_analysis.png')],
+        'code': [os.path.join(ANALYTICS, 'charts.py'), os.path.join(ANALYTICS, 'fixtures.py'),
+                 os.path.join(CLEANDATA, 'datasets.py')],
+    },
+    {
+        'name': 'compare_america_mg',
+        'script': os.path.join(ANALYTICS, 'compare_america_mg.py'),
+        'cwd': ANALYTICS,
+        'inputs': ['team_performance_stats.csv'],
+        'outputs': ['america_mg_comparison.csv', os.path.join(GRAPHICS, 'america_mg_win_rates.png'),
+                    os.path.join(GRAPHICS, 'america_mg_away_goals.png'),
+                    os.path.join(GRAPHICS, 'america_mg_goal_difference.png'),
+                    os.path.join(GRAPHICS, 'america_mg_away_losses.png')],
+        'code': [os.path.join(ANALYTICS, 'charts.py')],
+    },
+    {
+        'name': 'compare_league',
+        'script': os.path.join(ANALYTICS, 'compare_america_mg.py'),
+        'args': ['--all-teams'],
+        'cwd': ANALYTICS,
+        'inputs': ['team_performance_stats.csv'],
+        'outputs': ['league_comparison.csv', os.path.join(GRAPHICS, 'league_comparison')],
+        'code': [os.path.join(ANALYTICS, 'charts.py')],
+    },
+    {
+        'name': 'ratings',
+        'script': os.path.join(ANALYTICS, 'ratings.py'),
+        'cwd': ANALYTICS,
+        'inputs': [os.path.join('datasets', 'fixtures')],
+        'outputs': ['elo_ratings.csv', 'america_mg_opponent_strength.csv'],
+        'code': [os.path.join(ANALYTICS, 'fixtures.py'), os.path.join(CLEANDATA, 'datasets.py')],
+    },
+    {
+        'name': 'microcycles',
+        'script': os.path.join(ANALYTICS, 'analyze_microcycles.py'),
+        'cwd': ANALYTICS,
+        'inputs': [os.path.join('datasets', 'fixtures')],
+        'outputs': ['america_mg_microcycle_performance.csv',
+                    os.path.join(GRAPHICS, 'america_mg_microcycle_performance.png')],
+        'code': [os.path.join(ANALYTICS, 'resampling.py'), os.path.join(ANALYTICS, 'charts.py'),
+                 os.path.join(ANALYTICS, 'fixtures.py'), os.path.join(CLEANDATA, 'datasets.py')],
+    },
+    {
+        'name': 'home_away_microcycles',
+        'script': os.path.join(ANALYTICS, 'analyze_home_away_microcycles.py'),
+        'cwd': ANALYTICS,
+        'inputs': [os.path.join('datasets', 'fixtures')],
+        'outputs': ['america_mg_home_away_microcycle_performance.csv',
+                    os.path.join(GRAPHICS, 'america_mg_home_away_microcycle_performance.png')],
+        'code': [os.path.join(ANALYTICS, 'resampling.py'), os.path.join(ANALYTICS, 'charts.py'),
+                 os.path.join(ANALYTICS, 'fixtures.py'), os.path.join(CLEANDATA, 'datasets.py')],
+    },
+]
+
+# Modules every stage script imports; a change to them re-runs every stage
+SHARED_CODE = [os.path.join(CLEANDATA, 'instrumentation.py'), os.path.join(CLEANDATA, 'paths.py')]
+
+def file_hash(path):
+    # A directory (a partitioned dataset) hashes the names and contents of
+    # its files, skipping the hidden ones (temp files, caches)
+    digest = hashlib.sha256()
+    if os.path.isdir(path):
+        for folder, dirs, files in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+            for name in sorted(f for f in files if not f.startswith('.')):
+                digest.update(os.path.relpath(os.path.join(folder, name), path).encode())
+                digest.update(file_hash(os.path.join(folder, name)).encode())
+        return digest.hexdigest()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def stage_fingerprint(stage):
+    # Content hash of the script, its extra code, the shared modules and
+    # every input file. A run without charts is marked too, so the next
+    # run that draws them runs the stage again.
+    digest = hashlib.sha256()
+    files = [stage['script']] + SHARED_CODE + stage['code'] + [os.path.join(DATA, p) for p in stage['inputs']]
+    for path in files:
+        digest.update(os.path.relpath(path, ROOT).encode())
+        digest.update(file_hash(path).encode() if os.path.exists(path) else b'missing')
+    if os.environ.get(NO_PLOTS_ENV) and len(expected_outputs(stage)) < len(stage['outputs']):
+        digest.update(b'no plots')
+    return digest.hexdigest()
+
+def build_graph(stages):
+    # Map each stage to the stages producing its inputs
+    deps = {}
+    for i, stage in enumerate(stages):
+        deps[stage['name']] = set()
+        for path in stage['inputs']:
+            for producer in reversed(stages[:i]):
+                if path in producer['outputs']:
+                    deps[stage['name']].add(producer['name'])
+                    break
+    return deps
+
+def select_stages(stages, deps, targets):
+    # Restrict the run to the requested stages and everything upstream of them
+    if not targets:
+        return stages
+    unknown = set(targets) - {s['name'] for s in stages}
+    if unknown:
+        raise ValueError(f"Unknown stage(s): {', '.join(sorted(unknown))}")
+    wanted = set()
+    pending = list(targets)
+    while pending:
+        name = pending.pop()
+        if name not in wanted:
+            wanted.add(name)
+            pending.extend(deps[name])
+    return [s for s in stages if s['name'] in wanted]
+
+def load_state():
+    if os.path.exists(STATE_FILE):
+        with open(STATE_FILE) as f:
+            return json.load(f)
+    return {}
+
+def save_state(state):
+    tmp = STATE_FILE + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp, STATE_FILE)
+
+def expected_outputs(stage):
+    outputs = [os.path.join(DATA, p) for p in stage['outputs']]
+    if os.environ.get(NO_PLOTS_ENV):
+        outputs = [p for p in outputs if os.path.commonpath([p, GRAPHICS]) != GRAPHICS]
+    return outputs
+
+def is_up_to_date(stage, fingerprint, state):
+    if state.get(stage['name']) != fingerprint:
+        return False
+    return all(os.path.exists(p) for p in expected_outputs(stage))
+
+def run_stage(stage, run_id=None):
+    # Stages of one pipeline run share a run id in the run log
+    env = dict(os.environ)
+    if run_id:
+        env['PIPELINE_RUN_ID'] = run_id
+    result = subprocess.run([sys.executable, stage['script']] + stage.get('args', []), cwd=stage['cwd'],
+                            capture_output=True, text=True, env=env)
+    return result.returncode, result.stdout + result.stderr
+
+def run_pipeline(targets=None, force=False, jobs=None, verbose=False):
+    deps = build_graph(STAGES)
+    stages = select_stages(STAGES, deps, targets)
+    state = load_state()
+
+    selected = {s['name'] for s in stages}
+    remaining = {s['name']: s for s in stages}
+    done, failed = set(), set()
+    summary = {'ran': [], 'skipped': [], 'failed': []}
+    run_id = uuid.uuid4().hex[:12]
+
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+        running = {}
+        while remaining or running:
+            # Launch every stage whose upstream stages have all finished
+            for name, stage in list(remaining.items()):
+                upstream = deps[name] & selected
+                if upstream & failed:
+                    print(f"[skip] {name}: upstream stage failed")
+                    failed.add(name)
+                    summary['failed'].append(name)
+                    del remaining[name]
+                    continue
+                if not upstream <= done:
+                    continue
+                del remaining[name]
+                fingerprint = stage_fingerprint(stage)
+                if not force and is_up_to_date(stage, fingerprint, state):
+                    print(f"[up to date] {name}")
+                    done.add(name)
+                    summary['skipped'].append(name)
+                    continue
+                print(f"[run] {name}")
+                running[pool.submit(run_stage, stage, run_id)] = stage
+
+            if not running:
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage = running.pop(future)
+                name = stage['name']
+                returncode, output = future.result()
+                if verbose or returncode != 0:
+                    print(output)
+                if returncode != 0:
+                    print(f"[failed] {name} (exit code {returncode})")
+                    failed.add(name)
+                    summary['failed'].append(name)
+                    state.pop(name, None)
+                else:
+                    print(f"[done] {name}")
+                    done.add(name)
+                    summary['ran'].append(name)
+                    # Fingerprint after the run, so stages that rewrite one
+                    # of their own inputs are not re-run next time
+                    state[name] = stage_fingerprint(stage)
+                save_state(state)
+
+    print(f"\nPipeline finished: {len(summary['ran'])} ran, "
+          f"{len(summary['skipped'])} up to date, {len(summary['failed'])} failed")
+    return summary
+
+def add_pipeline_arguments(parser):
+    parser.add_argument('stages', nargs='*', help="stages to run (default: all); upstream stages are included")
+    parser.add_argument('--force', action='store_true', help="re-run stages even if their inputs are unchanged")
+    parser.add_argument('--jobs', type=int, default=None, help="number of stages to run concurrently")
+    parser.add_argument('--verbose', action='store_true', help="print the output of every stage")
+    return parser
+
+if __name__ == "__main__":
+    parser = add_pipeline_arguments(argparse.ArgumentParser(
+        description="Run the cleandata and analytics stages, skipping unchanged ones"))
+    args = parser.parse_args()
+
+    summary = run_pipeline(args.stages, force=args.force, jobs=args.jobs, verbose=args.verbose)
+    sys.exit(1 if summary['failed'] else 0)
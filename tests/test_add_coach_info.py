@@ -0,0 +1,36 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cleandata classes'))
+from add_coach_info import assign_coaches, check_tenures
+
+def make_tenures(rows):
+    return pd.DataFrame(rows, columns=['coach', 'club', 'start', 'end']).astype(
+        {'start': 'datetime64[ns]', 'end': 'datetime64[ns]'})
+
+def test_nested_tenure_falls_back_to_the_outer_one():
+    tenures = make_tenures([('A', 'X', '2018-01-01', '2018-12-31'), ('B', 'X', '2018-03-01', '2018-04-30')])
+    coaches = assign_coaches(pd.to_datetime(['2018-02-01', '2018-03-15', '2018-06-01', '2019-01-01']), tenures)
+    assert coaches.tolist() == ['A', 'B', 'A', None]
+
+def test_check_tenures_compares_with_the_latest_end():
+    tenures = make_tenures([('A', 'X', '2018-01-01', '2018-12-31'), ('B', 'X', '2018-03-01', '2018-04-30'),
+                            ('C', 'X', '2018-06-01', '2019-06-30'), ('D', 'X', '2019-08-01', '2019-12-31')])
+    problems = check_tenures(tenures)
+    # B and C both start inside A; nothing is reported between B's end and C's start
+    assert problems == ["X: B starts 2018-03-01 before A ends 2018-12-31",
+                        "X: C starts 2018-06-01 before A ends 2018-12-31",
+                        "X: no coach between 2019-06-30 and 2019-08-01"]
+
+def test_assignment_matches_a_per_tenure_scan():
+    rng = np.random.default_rng(0)
+    starts = pd.Timestamp('2018-01-01') + pd.to_timedelta(rng.integers(0, 300, 12), unit='D')
+    ends = starts + pd.to_timedelta(rng.integers(0, 120, 12), unit='D')
+    tenures = make_tenures([(f'C{i}', 'X', start, end) for i, (start, end) in enumerate(zip(starts, ends))])
+    dates = pd.date_range('2017-12-01', '2019-03-01').append(pd.DatetimeIndex([pd.NaT]))
+    expected = np.full(len(dates), None, dtype=object)
+    for _, row in tenures.sort_values('start', kind='stable').iterrows():
+        expected[(dates >= row['start']) & (dates <= row['end'])] = row['coach']
+    assert assign_coaches(dates, tenures).tolist() == expected.tolist()
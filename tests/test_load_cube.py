@@ -0,0 +1,65 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'analytics classes'))
+from load_cube import DIMENSIONS, build_cells, read_day_cells, rollup, slice_stats, update_cube, write_day_cells
+
+METRICS = ['Trimp', 'Disttotalm']
+
+def make_sessions(seed, dates):
+    rng = np.random.default_rng(seed)
+    rows = len(dates) * 6
+    sessions = pd.DataFrame({
+        'DATA': pd.to_datetime(np.repeat(dates, 6)),
+        'ATLETA': rng.choice(['A', 'B', 'C'], rows),
+        'Posicao': rng.choice(['Zagueiro', 'Meia'], rows),
+        'Coach': rng.choice(['X', 'Y', None], rows),
+        'Local': rng.choice(['Em casa', 'Visitante', None], rows),
+        'days_until_match': rng.integers(0, 4, rows).astype('float64'),
+        'Trimp': rng.normal(300, 40, rows),
+        'Disttotalm': rng.normal(9000, 800, rows),
+    })
+    sessions.loc[::7, 'Trimp'] = np.nan
+    return sessions
+
+def sorted_cube(cube):
+    keys = cube[DIMENSIONS].astype(object).fillna('-').astype(str)
+    return cube.assign(**keys).sort_values(DIMENSIONS).reset_index(drop=True)
+
+def test_incremental_update_matches_full_build(tmp_path):
+    dates = pd.date_range('2018-05-01', periods=5).strftime('%Y-%m-%d').tolist()
+    sessions = make_sessions(0, dates)
+    cube, day_cells = update_cube(None, sessions, dates, [], tmp_path, METRICS)
+    write_day_cells(day_cells, dates, tmp_path)
+
+    # 05-02 is corrected (new loads and a coach relabel), 05-04 is gone
+    # and 05-06 is new
+    changed = make_sessions(1, ['2018-05-02', '2018-05-06'])
+    changed['Coach'] = 'Z'
+    updated = pd.concat([sessions[~sessions['DATA'].isin(pd.to_datetime(['2018-05-02', '2018-05-04']))], changed],
+                        ignore_index=True)
+    cube, day_cells = update_cube(cube, updated, ['2018-05-02', '2018-05-06'], ['2018-05-04'], tmp_path, METRICS)
+    write_day_cells(day_cells, ['2018-05-02', '2018-05-06', '2018-05-04'], tmp_path)
+    stored = read_day_cells(pd.date_range('2018-05-01', periods=6).strftime('%Y-%m-%d').tolist(), tmp_path)
+    assert sorted(stored['DATA'].dt.strftime('%Y-%m-%d').unique()) == ['2018-05-01', '2018-05-02', '2018-05-03',
+                                                                      '2018-05-05', '2018-05-06']
+
+    full = sorted_cube(rollup(build_cells(updated, METRICS), DIMENSIONS, METRICS))
+    cube = sorted_cube(cube)
+    assert len(cube) == len(full)
+    assert cube[DIMENSIONS].equals(full[DIMENSIONS])
+    for metric in METRICS:
+        for part in ['Count', 'Sum', 'M2']:
+            col = f'{metric}_{part}'
+            assert np.allclose(cube[col].astype(float), full[col].astype(float))
+
+def test_slice_stats_match_pandas():
+    sessions = make_sessions(2, ['2018-05-01', '2018-05-02', '2018-05-03'])
+    cube = rollup(build_cells(sessions, METRICS), DIMENSIONS, METRICS)
+    stats = slice_stats(cube, ['ATLETA'], ['Trimp'], days_until_match=[0.0, 1.0]).set_index('ATLETA')
+    expected = sessions[sessions['days_until_match'] <= 1].groupby('ATLETA')['Trimp'].agg(['count', 'mean', 'std'])
+    assert np.allclose(stats['Trimp_Count'], expected['count'])
+    assert np.allclose(stats['Trimp_Mean'], expected['mean'])
+    assert np.allclose(stats['Trimp_Std'], expected['std'], equal_nan=True)
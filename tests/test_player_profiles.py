@@ -0,0 +1,52 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'analytics classes'))
+from player_profiles import feature_matrix, kmeans, nearest_neighbours, pca, squared_distances
+
+def make_sessions(seed=0):
+    # Five athletes with 25 sessions each (E only 10, below MIN_SESSIONS)
+    rng = np.random.default_rng(seed)
+    counts = {'A': 25, 'B': 25, 'C': 25, 'D': 25, 'E': 10}
+    athletes = np.repeat(list(counts), list(counts.values()))
+    rows = len(athletes)
+    days = rng.integers(0, 5, rows).astype(float)
+    return pd.DataFrame({
+        'ATLETA': athletes,
+        'Posicao': np.where(np.isin(athletes, ['A', 'B']), 'ZAGUEIRO', 'MEIA'),
+        'DATA': pd.Timestamp('2018-04-01') + pd.to_timedelta(np.arange(rows) % 60, unit='D'),
+        'days_until_match': days,
+        'Local': np.where(days == 0, rng.choice(['Em casa', 'Visitante'], rows), None),
+        **{metric: rng.normal(300, 50, rows) for metric in ['Disttotalm', 'Distaltaintensidadem', 'MinutosTotais',
+                                                             'DES', 'ACE', 'Trimp', 'PSEXMIN']},
+    })
+
+def test_feature_matrix():
+    X, profiles, features = feature_matrix(make_sessions())
+    assert profiles['ATLETA'].tolist() == ['A', 'B', 'C', 'D']
+    assert profiles['Sessions'].tolist() == [25] * 4
+    assert profiles['Posicao'].tolist() == ['ZAGUEIRO', 'ZAGUEIRO', 'MEIA', 'MEIA']
+    assert X.shape == (4, len(features)) and X.dtype == np.float32
+    assert np.allclose(X.mean(axis=0), 0, atol=1e-5)
+
+def test_kmeans_finds_separated_clusters():
+    rng = np.random.default_rng(0)
+    X = np.vstack([rng.normal(0, 0.1, (10, 3)), rng.normal(5, 0.1, (10, 3))]).astype(np.float32)
+    labels, centers, inertia = kmeans(X, k=2, seed=1)
+    assert len(set(labels[:10])) == 1 and len(set(labels[10:])) == 1 and labels[0] != labels[10]
+    assert np.isclose(inertia, squared_distances(X, centers).min(axis=1).sum(), rtol=1e-4)
+
+def test_pca_and_nearest_neighbours():
+    X = np.array([[0, 0], [1, 0], [10, 0], [10, 1]], dtype=np.float32)
+    scores, explained = pca(X, 2)
+    assert explained[0] > 0.95
+    assert np.allclose(np.abs(scores[:, 0]).round(1), np.abs(X[:, 0] - X[:, 0].mean()).round(1), atol=0.2)
+
+    nearest, distance = nearest_neighbours(X)
+    assert nearest.tolist() == [1, 0, 3, 2]
+    assert np.allclose(distance, [1, 1, 1, 1])
+    nearest, distance = nearest_neighbours(X, groups=['X', 'Y', 'X', None])
+    assert nearest.tolist() == [2, -1, 0, -1]
+    assert np.isnan(distance[1])
@@ -0,0 +1,105 @@
+import asyncio
+import json
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'analytics classes'))
+from fixtures import update_fixtures_dataset
+from gps_store import LOAD_COLUMNS, save_gps_store
+from load_cube import DIMENSIONS, build_cells, rollup
+from query_server import QueryServer
+
+FIXTURES = """Sem,Dia,Data,Horário,Em casa,Resultado,Visitante
+1,sáb,2018-04-14,16:00,América (MG),2–0,Team B
+2,sáb,2018-04-21,16:00,Team C,1–1,América (MG)
+3,qua,2018-04-25,19:00,América (MG),0–1,Team D
+4,sáb,2018-05-05,16:00,Team B,1–0,Team C
+"""
+
+# (date, venue, coach, goals for, goals against); 04-13 is a training day
+DAYS = [('2018-04-13', None, 'X', np.nan, np.nan), ('2018-04-14', 'Em casa', 'X', 2, 0),
+        ('2018-04-21', 'Visitante', 'X', 1, 1), ('2018-04-25', 'Em casa', 'Y', 0, 1)]
+
+def make_sessions():
+    rows = []
+    for i, (date, venue, coach, goals_for, goals_against) in enumerate(DAYS):
+        for athlete, position in [('A', 'MEIA'), ('B', 'ZAGUEIRO')]:
+            rows.append({'ATLETA': athlete, 'Posicao': position, 'DATA': date, 'Local': venue, 'Coach': coach,
+                         'GP': goals_for, 'GC': goals_against, 'Posse': 50.0,
+                         'Oponente': None if venue is None else f'Team {i}',
+                         'days_until_match': 1.0 if venue is None else 0.0})
+    sessions = pd.DataFrame(rows)
+    for j, col in enumerate(col for col in LOAD_COLUMNS if col != 'days_until_match'):
+        sessions[col] = np.arange(len(sessions), dtype=float) * 10 + j
+    sessions['DATA'] = pd.to_datetime(sessions['DATA'])
+    return sessions
+
+def make_server(tmp_path):
+    sessions = make_sessions()
+    gps_path = str(tmp_path / 'gps.parquet')
+    save_gps_store(sessions, gps_path)
+
+    (tmp_path / 'matches.csv').write_text(FIXTURES, encoding='utf-8')
+    (tmp_path / 'sources.csv').write_text("file,season,competition\nmatches.csv,2018,Série A\n", encoding='utf-8')
+    fixtures_path = str(tmp_path / 'fixtures')
+    update_fixtures_dataset(str(tmp_path / 'sources.csv'), fixtures_path)
+
+    cube_path = str(tmp_path / 'cube.parquet')
+    metrics = [col for col in LOAD_COLUMNS if col != 'days_until_match']
+    rollup(build_cells(sessions, metrics), DIMENSIONS, metrics).to_parquet(cube_path, index=False)
+    return QueryServer(gps_path, fixtures_path, cube_path=cube_path, cache_dir=str(tmp_path / 'cache'))
+
+def rows(server, path, **params):
+    status, payload = server.respond('GET', path, params)
+    assert status == 200, payload
+    return payload['rows']
+
+def test_answers(tmp_path):
+    server = make_server(tmp_path)
+
+    venue = {row['Local']: row for row in rows(server, '/venue')}
+    assert (venue['Em casa']['Games'], venue['Em casa']['Wins'], venue['Em casa']['Losses']) == (2, 1, 1)
+    assert (venue['Visitante']['Games'], venue['Visitante']['Draws']) == (1, 1)
+    assert [row['Coach'] for row in rows(server, '/coaches', venue='home')] == ['X', 'Y']
+
+    # Days until the next match: 04-14 -> 04-21 -> 04-25, the last one has none
+    microcycles = {row['Microcycle']: row for row in rows(server, '/microcycles')}
+    assert sorted(microcycles) == [4, 7]
+    assert (microcycles[7]['Wins'], microcycles[4]['Draws']) == (1, 1)
+
+    assert rows(server, '/players', athlete='A')[0]['Games'] == 3
+    sessions = rows(server, '/sessions', athlete='A,B', start='2018-04-13', end='2018-04-14')
+    assert [row['Sessions'] for row in sessions] == [2, 2]
+
+    load = {row['Local']: row for row in rows(server, '/load', by='Local', athlete='A', days='0')}
+    assert (load['Em casa']['Trimp_Count'], load['Visitante']['Trimp_Count']) == (2, 1)
+
+def test_errors(tmp_path):
+    server = make_server(tmp_path)
+    assert server.respond('GET', '/venue', {'venue': 'moon'})[0] == 400
+    assert server.respond('GET', '/load', {'by': 'Club'})[0] == 400
+    assert server.respond('GET', '/sessions', {'athlete': 'Z'})[0] == 404
+    assert server.respond('GET', '/nope', {})[0] == 404
+    assert server.respond('POST', '/venue', {})[0] == 405
+
+def test_http(tmp_path):
+    server = make_server(tmp_path)
+
+    async def get(target):
+        listener = await asyncio.start_server(server.handle, '127.0.0.1', 0)
+        port = listener.sockets[0].getsockname()[1]
+        async with listener:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(f"GET {target} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode('latin-1'))
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+        head, body = response.split(b'\r\n\r\n', 1)
+        return head.split(b'\r\n')[0].decode(), json.loads(body)
+
+    status, payload = asyncio.run(get('/players?athlete=B'))
+    assert status == 'HTTP/1.1 200 OK'
+    assert payload['rows'][0]['ATLETA'] == 'B'
+    assert asyncio.run(get('/venue?venue=moon'))[0] == 'HTTP/1.1 400 Error'
@@ -0,0 +1,50 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'analytics classes'))
+from ratings import BASE_RATING, load_state, update_ratings
+
+def make_fixtures(rows):
+    fixtures = pd.DataFrame(rows, columns=['Data', 'Em casa', 'Visitante', 'Home_Goals', 'Away_Goals'])
+    fixtures['Data'] = pd.to_datetime(fixtures['Data'])
+    return fixtures.assign(Season=2018, Competition='Série A')
+
+ROUNDS = [('2018-04-14', 'A', 'B', 2, 0), ('2018-04-14', 'C', 'D', 1, 1),
+          ('2018-04-21', 'B', 'C', 0, 3), ('2018-04-21', 'D', 'A', 1, 0),
+          ('2018-04-28', 'A', 'C', 2, 2), ('2018-04-28', 'B', 'D', np.nan, np.nan)]
+
+def test_incremental_update_matches_rebuild(tmp_path):
+    state_path, history_path = str(tmp_path / 'state.json'), str(tmp_path / 'history.parquet')
+    history, rated = update_ratings(make_fixtures(ROUNDS[:2]), state_path, history_path)
+    assert rated == 2
+    history, rated = update_ratings(make_fixtures(ROUNDS), state_path, history_path)
+    assert rated == 3
+    incremental = load_state(state_path)['ratings']
+
+    rebuilt, _ = update_ratings(make_fixtures(ROUNDS), str(tmp_path / 'full.json'), str(tmp_path / 'full.parquet'))
+    full = load_state(str(tmp_path / 'full.json'))['ratings']
+    assert incremental == full
+    assert sorted(os.listdir(tmp_path)) == ['full.json', 'full.parquet', 'history.parquet', 'state.json']
+    assert len(history) == len(rebuilt) == 10
+    # Ratings only move between teams
+    assert np.isclose(sum(full.values()), 4 * BASE_RATING)
+
+def test_changed_parameters_rebuild(tmp_path):
+    state_path, history_path = str(tmp_path / 'state.json'), str(tmp_path / 'history.parquet')
+    update_ratings(make_fixtures(ROUNDS), state_path, history_path)
+    first = load_state(state_path)['ratings']
+    history, rated = update_ratings(make_fixtures(ROUNDS), state_path, history_path, k_factor=40.0)
+    state = load_state(state_path)
+    assert rated == 5
+    assert len(history) == 10
+    assert state['k_factor'] == 40.0
+    assert state['ratings'] != first
+
+def test_older_fixture_rebuilds(tmp_path):
+    state_path, history_path = str(tmp_path / 'state.json'), str(tmp_path / 'history.parquet')
+    update_ratings(make_fixtures(ROUNDS[2:5]), state_path, history_path)
+    history, rated = update_ratings(make_fixtures(ROUNDS), state_path, history_path)
+    assert rated == 5
+    assert history['Data'].is_monotonic_increasing
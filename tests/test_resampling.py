@@ -0,0 +1,38 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'analytics classes'))
+from resampling import bootstrap_ci, match_values, permutation_pvalues, resample_stats
+
+def test_match_values():
+    values = match_values([2, 1, 0, np.nan], [0, 1, 3, np.nan])
+    assert values[:, 0].tolist() == [100, 0, 0, 0]
+    assert values[:, 1].tolist() == [3, 1, 0, 0]
+    assert values[:, 2].tolist() == [2, 0, -3, 0]
+
+def test_constant_group_has_a_point_interval():
+    values = match_values([1, 1, 1, 1], [0, 0, 0, 0])
+    low, high = bootstrap_ci(values, resamples=200, rng=0)
+    assert low.tolist() == high.tolist() == [100, 3, 4]
+
+def test_permutation_pvalues_separate_groups():
+    # Group 0 wins every match and group 1 loses every one
+    values = match_values([2] * 8 + [0] * 8, [0] * 8 + [2] * 8)
+    codes = np.repeat([0, 1], 8)
+    pvalues = permutation_pvalues(values, codes, resamples=2000, rng=0)
+    assert (pvalues < 0.01).all()
+    same = permutation_pvalues(match_values([1] * 16, [1] * 16), codes, resamples=200, rng=0)
+    assert (same == 1).all()
+
+def test_resample_stats_is_reproducible():
+    matches = pd.DataFrame({'Venue': ['Home', 'Away'] * 6, 'Goals_For': [2, 0, 1, 1, 3, 0, 0, 2, 1, 1, 2, 0],
+                            'Goals_Against': [0, 1, 1, 2, 0, 0, 1, 2, 0, 3, 2, 1]})
+    first = resample_stats(matches, ['Venue'], resamples=500)
+    assert first['Venue'].tolist() == ['Away', 'Home']
+    pd.testing.assert_frame_equal(first, resample_stats(matches, ['Venue'], resamples=500))
+    home = first.set_index('Venue').loc['Home']
+    win_rate = 4 / 6 * 100
+    assert home['Win_Rate_CI_Low'] <= win_rate <= home['Win_Rate_CI_High']
+    assert resample_stats(matches.assign(Venue=np.nan), ['Venue']).empty
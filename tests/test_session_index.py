@@ -0,0 +1,57 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'analytics classes'))
+from session_index import SessionIndex
+
+def make_sessions(seed=0, rows=300):
+    rng = np.random.default_rng(seed)
+    sessions = pd.DataFrame({
+        'ATLETA': rng.choice(['A', 'B', 'C', None], rows),
+        'DATA': pd.Timestamp('2018-04-01') + pd.to_timedelta(rng.integers(0, 60, rows), unit='D'),
+        'Trimp': rng.normal(300, 50, rows),
+    })
+    sessions.loc[::11, 'Trimp'] = np.nan
+    return sessions
+
+def scan(sessions, athlete, start, end):
+    # The same window by a plain filter over every row
+    mask = sessions['ATLETA'] == athlete
+    if start is not None:
+        mask &= sessions['DATA'] >= pd.Timestamp(start)
+    if end is not None:
+        mask &= sessions['DATA'] <= pd.Timestamp(end)
+    return sessions[mask]
+
+def test_windows_match_a_scan():
+    sessions = make_sessions()
+    index = SessionIndex(sessions)
+    assert len(index) == sessions['ATLETA'].notna().sum()
+    for start, end in [(None, None), ('2018-04-10', '2018-04-20'), ('2018-05-01', None),
+                       (None, '2018-04-01'), ('2018-04-20', '2018-04-10'), ('2019-01-01', None)]:
+        for athlete in ['A', 'B', 'C']:
+            expected = scan(sessions, athlete, start, end)
+            window = index.window(athlete, start, end)
+            assert len(window) == len(expected)
+            assert window['DATA'].is_monotonic_increasing
+            assert np.isclose(window['Trimp'].sum(), expected['Trimp'].sum())
+
+def test_window_totals_match_a_scan():
+    sessions = make_sessions(1)
+    index = SessionIndex(sessions)
+    totals = index.window_totals(['Trimp'], ['C', 'A'], '2018-04-15', '2018-05-15').set_index('ATLETA')
+    for athlete in ['A', 'C']:
+        expected = scan(sessions, athlete, '2018-04-15', '2018-05-15')
+        assert totals.loc[athlete, 'Sessions'] == len(expected)
+        assert np.isclose(totals.loc[athlete, 'Trimp'], expected['Trimp'].sum())
+
+def test_per_athlete_dates_and_unknown_athletes():
+    index = SessionIndex(make_sessions(2))
+    windows = index.windows(['A', 'B'], start=['2018-04-05', '2018-05-05'], column='Trimp')
+    lo, hi = index.bounds(['A', 'B'], start=['2018-04-05', '2018-05-05'])
+    assert [len(windows['A']), len(windows['B'])] == (hi - lo).tolist()
+    with pytest.raises(KeyError):
+        index.window('Z')
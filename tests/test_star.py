@@ -0,0 +1,48 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cleandata classes'))
+from gps_store import apply_schema
+from star import NO_KEY, load_matches, load_star, save_star
+from unify import MATCH_COLUMNS
+
+def make_gps():
+    # Two athletes over four days: two match days (one per coach), a training
+    # day before each and no coach on the first one
+    df = pd.DataFrame({
+        'DATA': pd.to_datetime(np.repeat(['2018-04-13', '2018-04-14', '2018-04-20', '2018-04-21'], 2)),
+        'ATLETA': ['A', 'B'] * 4,
+        'Trimp': [80.5, 75.25, 300.1, 250.0, 90.0, 85.5, 320.75, np.nan],
+        'Coach': [None, None, 'X', 'X', 'Y', 'Y', 'Y', 'Y'],
+    })
+    for col in MATCH_COLUMNS:
+        df[col] = pd.Series(np.nan, index=df.index, dtype=object)
+    match_days = df['DATA'].isin(pd.to_datetime(['2018-04-14', '2018-04-21'])).to_numpy()
+    df.loc[match_days, 'Oponente'] = np.where(df.loc[match_days, 'DATA'] == '2018-04-14', 'Team 1', 'Team 2')
+    df.loc[match_days, 'Local'] = 'Em casa'
+    df.loc[match_days, 'GP'] = 2
+    df.loc[match_days, 'GC'] = 1
+    return df
+
+def test_round_trip(tmp_path):
+    df = make_gps()
+    sessions, matches, coaches = save_star(df, str(tmp_path))
+    assert len(matches) == 2
+    assert len(coaches) == 2
+    assert (sessions['Match_Key'] == NO_KEY).sum() == 4
+    assert sorted(os.listdir(tmp_path)) == ['coaches.parquet', 'matches.parquet', 'sessions.parquet']
+
+    expected = apply_schema(df)
+    loaded = load_star(str(tmp_path))[expected.columns]
+    pd.testing.assert_frame_equal(loaded, expected, check_categorical=False)
+
+    columns = ['DATA', 'ATLETA', 'Oponente', 'Coach']
+    pd.testing.assert_frame_equal(load_star(str(tmp_path), columns), expected[columns], check_categorical=False)
+
+def test_matches_with_coach(tmp_path):
+    save_star(make_gps(), str(tmp_path))
+    matches = load_matches(str(tmp_path), with_coach=True)
+    assert matches['Oponente'].astype(str).tolist() == ['Team 1', 'Team 2']
+    assert matches['Coach'].astype(str).tolist() == ['X', 'Y']
@@ -0,0 +1,69 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cleandata classes'))
+from CleanGPS import COLUMNS_TO_KEEP, ingest_sessions
+from gps_store import apply_schema
+from unify import MATCH_COLUMNS, join_matches, merge_pending_sessions
+
+def make_matches(dates):
+    matches = pd.DataFrame({'Data': pd.to_datetime(dates)})
+    for col in MATCH_COLUMNS:
+        matches[col] = np.nan
+    matches['Oponente'] = [f'Team {i}' for i in range(len(dates))]
+    return matches
+
+def test_exact_join():
+    gps = pd.DataFrame({'DATA': pd.to_datetime(['2018-05-01', '2018-05-02', '2018-05-05'])})
+    merged, stats = join_matches(gps, make_matches(['2018-05-02', '2018-05-05']))
+    assert pd.isna(merged['Oponente'].iloc[0])
+    assert merged['Oponente'].tolist()[1:] == ['Team 0', 'Team 1']
+    assert stats['matched'] == 2
+    assert stats['match_dates'] == 2
+
+def test_tolerance_picks_nearest_match():
+    gps = pd.DataFrame({'DATA': pd.to_datetime(['2018-05-01', '2018-05-04', '2018-05-20'])})
+    merged, stats = join_matches(gps, make_matches(['2018-05-02', '2018-05-05']), tolerance_days=1)
+    assert merged['Oponente'].tolist()[:2] == ['Team 0', 'Team 1']
+    assert pd.isna(merged['Oponente'].iloc[2])
+    assert stats['unmatched'] == 1
+
+def test_tolerance_leaves_missing_dates_unmatched():
+    gps = pd.DataFrame({'DATA': pd.to_datetime(['2018-05-05', None])})
+    merged, stats = join_matches(gps, make_matches(['2018-05-02', '2018-05-05']), tolerance_days=3)
+    assert merged['Oponente'].iloc[0] == 'Team 1'
+    assert pd.isna(merged['Oponente'].iloc[1])
+    assert stats['matched'] == 1
+    assert stats['unmatched'] == 1
+
+def test_appended_sessions_keep_the_export_values(tmp_path):
+    header = ','.join(COLUMNS_TO_KEEP)
+    export = tmp_path / 'export.csv'
+    export.write_text(f"{header}\n"
+                      "MEIA,A,P,2018-05-10,Treino,5123.6,512.6,95.5,7,665,41,12,77.4333333333333,1\n"
+                      "ZAGUEIRO,B,P,2018-05-10,Treino,4407.55555555556,298.583333333333,90,6,540,33,9,61.8666666666667,1\n",
+                      encoding='utf-8')
+    output = tmp_path / 'merged.csv'
+    output.write_text(','.join(COLUMNS_TO_KEEP + MATCH_COLUMNS) + '\n'
+                      + 'MEIA,A,P,2018-05-01,Treino,5000,500,90,5,450,40,10,70,3' + ',' * len(MATCH_COLUMNS) + '\n',
+                      encoding='utf-8')
+    matches = make_matches(['2018-05-11'])
+    matches.to_csv(tmp_path / 'matches.csv', index=False)
+
+    store = str(tmp_path / 'store')
+    ingest_sessions(str(export), store)
+    merge_pending_sessions(str(tmp_path / 'matches.csv'), str(output), store_dir=store)
+
+    source = export.read_text(encoding='utf-8').splitlines()[1:]
+    appended = output.read_text(encoding='utf-8').splitlines()[2:]
+    columns = slice(COLUMNS_TO_KEEP.index('Disttotalm'), COLUMNS_TO_KEEP.index('days_until_match'))
+    # Same numbers as the export (a float32 detour would write 512.599976)
+    assert [[float(v) for v in row.split(',')[columns]] for row in appended] == \
+        [[float(v) for v in row.split(',')[columns]] for row in source]
+    assert '512.6,' in appended[0]
+
+def test_float32_values_widen_to_their_decimals():
+    df = apply_schema(pd.DataFrame({'Trimp': np.array([512.6, 77.43], dtype='float32')}))
+    assert df['Trimp'].tolist() == [512.6, 77.43]
@@ -0,0 +1,31 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'analytics classes'))
+from workload import workload_table
+
+def make_sessions():
+    # A trains 05-01..05-10 every other day, B only 05-05 and 05-06
+    return pd.DataFrame({
+        'DATA': pd.to_datetime(['2018-05-01', '2018-05-03', '2018-05-05', '2018-05-07', '2018-05-09',
+                                '2018-05-10', '2018-05-05', '2018-05-06']),
+        'ATLETA': ['A'] * 6 + ['B'] * 2,
+        'Trimp': [100.0, 200.0, 300.0, 400.0, 500.0, 600.0, 50.0, 70.0],
+    })
+
+def test_one_row_per_active_day():
+    table = workload_table(make_sessions(), ['Trimp'], acute=2, chronic=4)
+    assert len(table) == 10 + 2
+    assert table['Trimp'].notna().all()
+    spans = table.groupby('ATLETA')['DATA'].agg(['min', 'max'])
+    assert spans.loc['B', 'min'] == pd.Timestamp('2018-05-05')
+    assert spans.loc['B', 'max'] == pd.Timestamp('2018-05-06')
+
+def test_rest_days_count_as_zero_load():
+    table = workload_table(make_sessions(), ['Trimp'], acute=2, chronic=4).set_index(['ATLETA', 'DATA'])
+    assert table.loc[('A', pd.Timestamp('2018-05-02')), 'Trimp'] == 0
+    assert table.loc[('A', pd.Timestamp('2018-05-03')), 'Trimp_Acute_RA'] == 100
+    assert np.isclose(table.loc[('A', pd.Timestamp('2018-05-04')), 'Trimp_Chronic_RA'], 75)
+    assert np.isnan(table.loc[('B', pd.Timestamp('2018-05-06')), 'Trimp_Chronic_RA'])